@@ -0,0 +1 @@
+"""Benchmarks for SmartShot's ingest and search paths."""
@@ -0,0 +1,80 @@
+"""Micro-benchmark the screenshot categorizer on long OCR texts.
+
+Generates deterministic pseudo-OCR texts of increasing length from the
+synthetic word list and reports the time per text for ``categorize`` and
+``categorize_batch``.
+
+Usage:
+    python -m benchmarks.categorize [--sizes 100 1000 10000] [--output results.json]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from smartshot.utils.categorize import ScreenshotCategorizer
+
+from .synthetic import WORDS
+
+
+def make_texts(words: int, count: int, seed: int = 0):
+    """Build count texts of the given word count, wrapped into OCR-like lines."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        tokens = [rng.choice(WORDS) for _ in range(words)]
+        lines = [" ".join(tokens[i:i + 10]) for i in range(0, len(tokens), 10)]
+        texts.append("\n".join(lines))
+    return texts
+
+
+def run(sizes, count: int, repeat: int) -> dict:
+    categorizer = ScreenshotCategorizer()
+    results = {}
+    for size in sizes:
+        texts = make_texts(size, count)
+        single, batch = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text in texts:
+                categorizer.categorize(text)
+            single.append((time.perf_counter() - start) / count * 1e6)
+
+            start = time.perf_counter()
+            categorizer.categorize_batch(texts)
+            batch.append((time.perf_counter() - start) / count * 1e6)
+        results[str(size)] = {
+            'words': size,
+            'texts': count,
+            'categorize_us': statistics.median(single),
+            'categorize_batch_us': statistics.median(batch),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+                        help='Words per OCR text')
+    parser.add_argument('--count', type=int, default=50, help='Texts per size')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per size (median is reported)')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.count, args.repeat)
+    for result in results.values():
+        print(f"{result['words']:>7} words: categorize {result['categorize_us']:9.1f} us/text, "
+              f"batch {result['categorize_batch_us']:9.1f} us/text", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
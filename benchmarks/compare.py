@@ -0,0 +1,92 @@
+"""Compare two benchmark reports and flag regressions.
+
+Every number present in both reports is compared. Whether higher or
+lower is better is taken from its name: rates, throughput, accuracy and
+recall should go up; times (``_ms``, ``_us``, ``_s``) should go down;
+other numbers (counts, sizes) are shown but never flagged.
+
+Usage:
+    python -m benchmarks.compare baseline.json new.json [--threshold 10]
+
+Exits with status 1 if anything got worse by more than the threshold.
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Optional
+
+HIGHER_IS_BETTER = re.compile(r'(per_s|_per_minute|accuracy|recall)')
+LOWER_IS_BETTER = re.compile(r'(_ms|_us|_s)(_|$)|(^|\.)(p50|p95|p99)$')
+
+# Environment fields that make two reports incomparable when they differ
+ENVIRONMENT_KEYS = ('cpu', 'cpu_count', 'machine', 'python', 'sqlite')
+
+
+def flatten(value, prefix: str = '') -> Dict[str, float]:
+    """Numbers in nested dictionaries, keyed by dotted path."""
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def direction(path: str) -> Optional[int]:
+    """+1 if higher is better, -1 if lower is better, None if neither."""
+    name = path.rsplit('.', 1)[-1]
+    if HIGHER_IS_BETTER.search(name):
+        return 1
+    if LOWER_IS_BETTER.search(name) or LOWER_IS_BETTER.search(path):
+        return -1
+    return None
+
+
+def compare(baseline: dict, new: dict, threshold: float):
+    """Yield (path, old, new, percent change, verdict) for shared numbers."""
+    old_values = flatten(baseline.get('results', baseline))
+    new_values = flatten(new.get('results', new))
+    for path in sorted(old_values.keys() & new_values.keys()):
+        old, value = old_values[path], new_values[path]
+        change = (value - old) / old * 100 if old else 0.0
+        sign = direction(path)
+        verdict = ''
+        if sign is not None and abs(change) > threshold:
+            verdict = 'better' if change * sign > 0 else 'WORSE'
+        yield path, old, value, change, verdict
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline', type=Path)
+    parser.add_argument('new', type=Path)
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent change below which differences count as noise')
+    parser.add_argument('--all', action='store_true', help='Show unchanged numbers too')
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    new = json.loads(args.new.read_text())
+    old_env, new_env = baseline.get('environment', {}), new.get('environment', {})
+    for key in ENVIRONMENT_KEYS:
+        if old_env.get(key) != new_env.get(key):
+            print(f"Warning: {key} differs ({old_env.get(key)} vs {new_env.get(key)}); "
+                  f"results may not be comparable", file=sys.stderr)
+    if old_env.get('commit') or new_env.get('commit'):
+        print(f"Comparing {old_env.get('commit')} -> {new_env.get('commit')}")
+
+    regressions = 0
+    for path, old, value, change, verdict in compare(baseline, new, args.threshold):
+        if verdict or args.all:
+            print(f"{verdict:<7}{path:<70}{old:>14.4g}{value:>14.4g}{change:>+9.1f}%")
+        regressions += verdict == 'WORSE'
+    print(f"{regressions} regression(s) beyond {args.threshold:g}%")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark file hashing throughput per algorithm.
+
+Writes incompressible files of several sizes and hashes each one with
+every available algorithm (``hash_file``, as used for duplicate
+detection). Files are read once before timing, so the numbers measure
+hashing from the page cache rather than the disk.
+
+Usage:
+    python -m benchmarks.hashing [--sizes 1 8 64] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from smartshot.utils.hashing import available_algorithms, hash_file
+
+
+def run(sizes_mb, algorithms, repeat: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='smartshot_bench_') as tmp:
+        for size_mb in sizes_mb:
+            path = Path(tmp) / f"{size_mb}mb.bin"
+            path.write_bytes(os.urandom(size_mb * 2**20))
+            results[f"{size_mb}mb"] = row = {'size_mb': size_mb}
+            for algorithm in algorithms:
+                hash_file(path, algorithm)  # warm the page cache
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    hash_file(path, algorithm)
+                    timings.append(time.perf_counter() - start)
+                row[f'{algorithm}_mb_per_s'] = size_mb / statistics.median(timings)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1, 8, 64], help='File sizes in MB')
+    parser.add_argument('--algorithms', nargs='+', default=available_algorithms(),
+                        choices=available_algorithms())
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per file (median is reported)')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.algorithms, args.repeat)
+    for result in results.values():
+        rates = ", ".join(f"{a} {result[f'{a}_mb_per_s']:.0f}" for a in args.algorithms)
+        print(f"{result['size_mb']:>5} MB: {rates} MB/s", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
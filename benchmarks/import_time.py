@@ -0,0 +1,105 @@
+"""Check CLI startup against an import-time budget.
+
+Runs each command under ``python -X importtime`` in a fresh interpreter
+and fails if its imports take longer than the budget or load a module
+the command has no use for (a model runtime, OCR, imaging or the
+database). Run it after touching imports anywhere under smartshot/;
+startup regressions usually come from a new module-level import.
+
+Usage:
+    python -m benchmarks.import_time [--repeat 5] [--output results.json]
+
+Exits with status 1 if any command is over budget.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Backends that only the watcher and indexer use
+HEAVY_MODULES = ('transformers', 'torch', 'sentence_transformers', 'pytesseract', 'tesserocr',
+                 'numpy', 'PIL', 'pygetwindow', 'psutil', 'watchdog')
+
+# command -> (budget in ms of total import time, modules it must not import).
+# Budgets are about 3x the time measured on a laptop, to absorb slower
+# machines and cold caches while still catching an eager heavy import.
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    'version': (250, HEAVY_MODULES + ('sqlalchemy', 'smartshot.db', 'smartshot.watcher')),
+    '--help': (250, HEAVY_MODULES + ('sqlalchemy', 'smartshot.db', 'smartshot.watcher')),
+    # Control commands only talk to the running watcher
+    'status --help': (250, HEAVY_MODULES + ('sqlalchemy', 'smartshot.db', 'smartshot.watcher')),
+    'search --help': (1200, HEAVY_MODULES + ('smartshot.watcher',)),
+    'search stats --pipeline': (1200, HEAVY_MODULES + ('smartshot.watcher',)),
+}
+
+LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[str]]:
+    """Total import time in ms and the names of all modules imported."""
+    total_us, modules = 0, []
+    for match in LINE.finditer(stderr):
+        _, cumulative, indent, name = match.groups()
+        modules.append(name)
+        # Top-level imports include the time of everything they import
+        if len(indent) == 1:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def measure(command: str, repeat: int) -> Tuple[float, List[str]]:
+    """Fastest of several runs (the least disturbed by other processes)."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'smartshot.main', *command.split()],
+            capture_output=True, text=True, cwd=Path(__file__).parent.parent
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"`smartshot {command}` exited with {proc.returncode}: {proc.stderr[-500:]}")
+        runs.append(parse_importtime(proc.stderr))
+    return min(runs, key=lambda run: run[0])
+
+
+def run(repeat: int) -> dict:
+    results = {}
+    for command, (budget_ms, forbidden) in BUDGETS.items():
+        import_ms, modules = measure(command, repeat)
+        loaded = sorted({m for m in modules if m.split('.')[0] in forbidden or m in forbidden})
+        results[command] = {
+            'import_ms': import_ms,
+            'budget_ms': budget_ms,
+            'modules': len(modules),
+            'forbidden_imports': loaded,
+            'ok': import_ms <= budget_ms and not loaded,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per command (the fastest is used)')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    for command, r in results.items():
+        status = 'ok' if r['ok'] else 'FAIL'
+        line = f"{status:<5}smartshot {command:<26}{r['import_ms']:7.0f} ms (budget {r['budget_ms']:.0f} ms)"
+        if r['forbidden_imports']:
+            line += f", imports {', '.join(r['forbidden_imports'][:5])}"
+        print(line, file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+    sys.exit(0 if all(r['ok'] for r in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
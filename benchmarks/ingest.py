@@ -0,0 +1,111 @@
+"""Benchmark end-to-end ingest throughput through ScreenshotHandler.
+
+Renders a corpus of synthetic screenshots (random resolutions, themes and
+text densities), then feeds it to a fresh ScreenshotHandler per worker
+count, exactly as the watcher does once a file is complete: hashing,
+OCR, categorization, summarization, thumbnails, rename, move and the
+database commit. The result cache is off, so every run does all the
+work. Per-stage latencies come from the pipeline metrics.
+
+Usage:
+    python -m benchmarks.ingest [--count 40] [--workers 1 2 4] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from smartshot.utils.metrics import METRICS
+from smartshot.utils.summarize import BACKENDS
+from smartshot.watcher.event_handler import ScreenshotHandler
+
+from .synthetic import generate_corpus, random_specs
+
+CONTEXT = {'app': 'Benchmark', 'title': 'Synthetic screenshot'}
+
+
+def run_once(corpus, workers: int, tmp: Path, ocr: bool, rename: bool, summarizer: str) -> dict:
+    watch_dir = tmp / f"watch_{workers}"
+    watch_dir.mkdir()
+    paths = [Path(shutil.copy2(path, watch_dir)) for path, _ in corpus]
+    total_mb = sum(p.stat().st_size for p in paths) / 2**20
+
+    METRICS.reset()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        handler = ScreenshotHandler(
+            watch_dir, enable_ocr=ocr, enable_rename=rename, db_path=str(tmp / f"bench_{workers}.db"),
+            workers=workers, summarizer=summarizer, warm_up=False, result_cache_bytes=0,
+        )
+        handler.start()
+        if rename:
+            handler.summarizer.warm_up(background=False)
+        start = time.perf_counter()
+        for path in paths:
+            handler.enqueue(path, CONTEXT)
+        handler.wait_for_jobs()
+        handler.stop(wait=True)
+        elapsed = time.perf_counter() - start
+
+    snapshot = METRICS.snapshot()
+    stages = {
+        name: {key: h[key] * 1000 for key in ('p50', 'p95', 'p99')}
+        for name, h in snapshot['stages'].items()
+    }
+    return {
+        'workers': workers,
+        'screenshots': len(paths),
+        'stored': snapshot['counters'].get('screenshots', {}).get('stored', 0),
+        'elapsed_s': elapsed,
+        'screenshots_per_s': len(paths) / elapsed,
+        'mb_per_s': total_mb / elapsed,
+        'stage_ms': stages,
+    }
+
+
+def run(count: int, workers_list, ocr: bool = True, rename: bool = True,
+        summarizer: str = 'extractive', seed: int = 0) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='smartshot_bench_') as tmp:
+        tmp = Path(tmp)
+        corpus = generate_corpus(tmp / "corpus", random_specs(count, seed), seed)
+        for workers in workers_list:
+            results[f"workers_{workers}"] = run_once(corpus, workers, tmp, ocr, rename, summarizer)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=40, help='Screenshots per run')
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 2, 4],
+                        help='Worker thread counts to compare')
+    parser.add_argument('--no-ocr', action='store_true', help='Skip OCR')
+    parser.add_argument('--no-rename', action='store_true', help='Skip summarization and renaming')
+    parser.add_argument('--summarizer', choices=list(BACKENDS), default='extractive',
+                        help='Summarization backend (model load time is not included)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic corpus')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.count, args.workers, not args.no_ocr, not args.no_rename,
+                  args.summarizer, args.seed)
+    for r in results.values():
+        slowest = sorted(((s['p50'], name) for name, s in r['stage_ms'].items() if name != 'total'),
+                         reverse=True)[:3]
+        print(f"{r['workers']} workers: {r['screenshots_per_s']:6.2f} screenshots/s "
+              f"({r['mb_per_s']:.1f} MB/s, {r['stored']:.0f}/{r['screenshots']} stored); slowest p50: "
+              + ", ".join(f"{name} {ms:.0f} ms" for ms, name in slowest), file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark OCR latency and accuracy with and without preprocessing.
+
+Renders the fixed synthetic corpus (or uses --corpus DIR with image files
+next to .txt ground truth), then runs OCR once per preprocessing profile.
+
+Usage:
+    python -m benchmarks.ocr_preprocess [--corpus DIR] [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import Image
+
+from smartshot.utils.ocr import OCREngine
+from smartshot.utils.preprocess import PROFILES, preprocess_image
+
+from .synthetic import char_accuracy, generate_corpus
+
+
+def load_corpus(corpus_dir: Path):
+    """Load (image, truth) pairs from a directory of images with .txt ground truth."""
+    corpus = []
+    for image_path in sorted(corpus_dir.iterdir()):
+        truth_path = image_path.with_suffix('.txt')
+        if image_path.suffix.lower() in ('.png', '.jpg', '.jpeg') and truth_path.exists():
+            corpus.append((image_path, truth_path.read_text(encoding='utf-8')))
+    return corpus
+
+
+def run(corpus, profiles, repeat: int = 1) -> dict:
+    results = {}
+    for name in profiles:
+        profile = PROFILES[name]
+        engine = OCREngine(profile=name, use_tesserocr=False)
+        ocr_available = engine.available
+        rows = []
+        for image_path, truth in corpus:
+            row = {'image': image_path.name}
+            if profile is not None:
+                start = time.perf_counter()
+                prepared = preprocess_image(image_path, profile)
+                row['preprocess_ms'] = (time.perf_counter() - start) * 1000
+                row['ocr_pixels'] = prepared.width * prepared.height
+            else:
+                row['preprocess_ms'] = 0.0
+                with Image.open(image_path) as image:
+                    row['ocr_pixels'] = image.width * image.height
+
+            if ocr_available:
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    text = engine.extract(image_path)
+                    timings.append((time.perf_counter() - start) * 1000)
+                row['ocr_ms'] = statistics.median(timings)
+                row['char_accuracy'] = char_accuracy(text, truth)
+            rows.append(row)
+
+        summary = {
+            'images': len(rows),
+            'preprocess_ms_mean': statistics.mean(r['preprocess_ms'] for r in rows),
+            'ocr_pixels_total': sum(r['ocr_pixels'] for r in rows),
+        }
+        if ocr_available:
+            summary['ocr_ms_mean'] = statistics.mean(r['ocr_ms'] for r in rows)
+            summary['ocr_ms_p95'] = sorted(r['ocr_ms'] for r in rows)[int(0.95 * (len(rows) - 1))]
+            summary['char_accuracy_mean'] = statistics.mean(r['char_accuracy'] for r in rows)
+        else:
+            summary['ocr'] = 'skipped: Tesseract not available'
+        results[name] = {'summary': summary, 'images': rows}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', type=Path, help='Directory of images with .txt ground truth')
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--repeat', type=int, default=1, help='OCR runs per image (median is reported)')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='smartshot_bench_') as tmp:
+        corpus = load_corpus(args.corpus) if args.corpus else generate_corpus(Path(tmp))
+        results = run(corpus, args.profiles, args.repeat)
+
+    for name, result in results.items():
+        summary = result['summary']
+        line = (f"{name:>9}: preprocess {summary['preprocess_ms_mean']:7.1f} ms/img, "
+                f"{summary['ocr_pixels_total'] / 1e6:6.1f} MP to OCR")
+        if 'ocr_ms_mean' in summary:
+            line += (f", OCR {summary['ocr_ms_mean']:7.1f} ms/img (p95 {summary['ocr_ms_p95']:.1f}), "
+                     f"accuracy {summary['char_accuracy_mean']:.3f}")
+        print(line, file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
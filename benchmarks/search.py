@@ -0,0 +1,157 @@
+"""Benchmark search latency on databases of increasing size.
+
+Fills a database with synthetic screenshot rows (pseudo-OCR text,
+categories, applications and dates spread over a year) through the same
+schema, indexes and triggers the application uses, then times
+``search_screenshots`` and the first ``search_page`` for typical queries.
+Sizes are filled incrementally in one database, so --sizes 10000 100000
+1000000 inserts a million rows in total.
+
+Usage:
+    python -m benchmarks.search [--sizes 10000 100000 1000000] [--output results.json]
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from smartshot.db import Database
+
+from .synthetic import WORDS
+
+CATEGORIES = ('Code', 'Errors', 'Documents', 'Chat', 'Design', 'Browser', 'Terminal', 'Uncategorized')
+APPS = ('Chrome', 'Code', 'Terminal', 'Slack', 'Figma', 'Firefox', 'Notion', 'Zoom')
+
+# Rare words are only in a few rows, so they test selective full-text lookups
+RARE_WORDS = ('kubernetes', 'segfault', 'invoice', 'flamegraph')
+
+# name -> search_screenshots keyword arguments (min_date is relative to now)
+QUERIES = {
+    'recent': {},
+    'keyword_common': {'query': 'error'},
+    'keyword_rare': {'query': 'segfault'},
+    'phrase': {'query': '"connection refused"'},
+    'prefix': {'query': 'deplo*'},
+    'keyword_and_category': {'query': 'timeout', 'category': 'Errors'},
+    'category': {'category': 'Code'},
+    'app_last_7_days': {'app_name': 'Slack', 'min_date': 7},
+}
+
+INSERT_BATCH = 10000
+
+
+def make_rows(start: int, count: int, seed: int = 0):
+    """Screenshot rows start .. start+count-1, deterministic for a seed."""
+    rng = random.Random(seed + start)
+    now = datetime.utcnow()
+    for i in range(start, start + count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 200))]
+        if rng.random() < 0.001:
+            words.insert(rng.randrange(len(words)), rng.choice(RARE_WORDS))
+        app = rng.choice(APPS)
+        yield (
+            f"/bench/screenshot_{i}.png", f"screenshot_{i}.png", rng.randint(50_000, 5_000_000),
+            f"{rng.getrandbits(256):064x}", rng.choice(CATEGORIES), app,
+            f"{app} - {' '.join(words[:4])}",
+            str(now - timedelta(seconds=rng.randint(0, 365 * 86400))), " ".join(words), 0.9,
+        )
+
+
+def fill(db_path: Path, start: int, count: int):
+    """Insert rows with the sqlite3 module, in large transactions."""
+    conn = sqlite3.connect(db_path)
+    # Throwaway database: durability only costs time here
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    try:
+        for offset in range(start, start + count, INSERT_BATCH):
+            with conn:
+                conn.executemany(
+                    "INSERT INTO screenshots (file_path, file_name, file_size, file_hash, category, "
+                    "app_name, window_title, created_at, ocr_text, ocr_confidence) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    make_rows(offset, min(INSERT_BATCH, start + count - offset))
+                )
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def time_queries(db: Database, repeat: int, limit: int) -> dict:
+    results = {}
+    for name, kwargs in QUERIES.items():
+        kwargs = dict(kwargs)
+        if 'min_date' in kwargs:
+            kwargs['min_date'] = datetime.utcnow() - timedelta(days=kwargs['min_date'])
+        full, page = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            found = db.search_screenshots(limit=limit, **kwargs)
+            full.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            db.search_page(limit=20, **kwargs)
+            page.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'results': len(found),
+            'search_ms_median': statistics.median(full),
+            'search_ms_p95': sorted(full)[int(0.95 * (len(full) - 1))],
+            'page_ms_median': statistics.median(page),
+        }
+    return results
+
+
+def run(sizes, repeat: int, limit: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='smartshot_bench_') as tmp:
+        db_path = Path(tmp) / "bench.db"
+        Database(str(db_path)).engine.dispose()
+        rows = 0
+        for size in sorted(sizes):
+            start = time.perf_counter()
+            fill(db_path, rows, size - rows)
+            fill_s = time.perf_counter() - start
+            inserted, rows = size - rows, size
+            # A fresh connection per size, as a newly started CLI or server would have
+            db = Database(str(db_path))
+            results[str(size)] = {
+                'rows': size,
+                'insert_rows_per_s': inserted / fill_s if fill_s else None,
+                'db_mb': db_path.stat().st_size / 2**20,
+                'queries': time_queries(db, repeat, limit),
+            }
+            db.engine.dispose()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000],
+                        help='Number of rows (e.g. 10000 100000 1000000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per query (median is reported)')
+    parser.add_argument('--limit', type=int, default=50, help='Results per search')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.limit)
+    for result in results.values():
+        print(f"{result['rows']:>8} rows ({result['db_mb']:.0f} MB, "
+              f"inserted at {result['insert_rows_per_s'] or 0:.0f} rows/s):", file=sys.stderr)
+        for name, q in result['queries'].items():
+            print(f"  {name:<22} {q['search_ms_median']:8.2f} ms (p95 {q['search_ms_p95']:.2f}), "
+                  f"page {q['page_ms_median']:6.2f} ms, {q['results']} results", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
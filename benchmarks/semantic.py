@@ -0,0 +1,159 @@
+"""Benchmark semantic search: index latency/recall and model retrieval quality.
+
+Index: random clustered unit vectors (shaped like sentence embeddings) are
+stored in a VectorIndex, and its float16 brute-force results are compared
+with exact float32 search (recall@k) while timing each query.
+
+Model (only with sentence-transformers installed): paraphrased queries such
+as "connection refused" are run against OCR-like texts that say e.g.
+ECONNREFUSED, hidden among synthetic distractors, and the rank of the
+expected text is compared with keyword matching.
+
+Usage:
+    python -m benchmarks.semantic [--sizes 10000 100000] [--output results.json]
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from smartshot.db.vectors import VectorIndex
+from smartshot.utils.embeddings import DEFAULT_MODEL, HAS_SENTENCE_TRANSFORMERS, Embedder
+
+from .synthetic import WORDS
+
+# (query, text the query should find) pairs that share few or no words
+PARAPHRASES = [
+    ("connection refused", "Error: connect ECONNREFUSED 127.0.0.1:5432 at TCPConnectWrapper.afterConnect"),
+    ("out of memory crash", "java.lang.OutOfMemoryError: Java heap space at java.util.Arrays.copyOf"),
+    ("null pointer bug", "TypeError: Cannot read properties of undefined (reading 'map') at Dashboard.jsx:42"),
+    ("disk is full", "OSError: [Errno 28] No space left on device: '/var/lib/docker/overlay2'"),
+    ("permission problem", "EACCES: access denied, open '/etc/hosts' - operation not permitted"),
+    ("flight booking", "Your itinerary: SFO to JFK, departs 08:15, seat 14C, confirmation code QX7P2L"),
+    ("weather forecast", "Tomorrow: 18 C, light rain in the afternoon, wind 12 km/h from the south west"),
+    ("team standup notes", "Daily sync - yesterday: finished login page; today: API review; blockers: none"),
+    ("invoice payment", "Amount due: $1,240.00 - Due date: March 3 - Pay by bank transfer to account 0042"),
+    ("merge conflict", "CONFLICT (content): Automatic merge failed in src/app.py; fix conflicts and then commit"),
+]
+
+
+def random_vectors(count: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    """Unit vectors grouped around cluster centres, like embeddings of similar texts."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run_index(sizes, dim: int, queries: int, k: int) -> dict:
+    results = {}
+    for size in sizes:
+        vectors = random_vectors(size, dim)
+        query_vectors = random_vectors(queries, dim, seed=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = VectorIndex(Path(tmp) / "bench.vectors", dim, "benchmark")
+            index.add(range(size), vectors)
+
+            start = time.perf_counter()
+            len(index)  # first read: map the file and convert it
+            load_ms = (time.perf_counter() - start) * 1e3
+
+            latencies, recalls = [], []
+            for query in query_vectors:
+                start = time.perf_counter()
+                hits = index.search(query, k)
+                latencies.append((time.perf_counter() - start) * 1e3)
+                exact = set(np.argsort(-(vectors @ query))[:k].tolist())
+                recalls.append(len(exact & {row_id for row_id, _ in hits}) / k)
+            file_bytes = index.path.stat().st_size
+        results[str(size)] = {
+            'vectors': size,
+            'dim': dim,
+            'file_mb': file_bytes / 2**20,
+            'load_ms': load_ms,
+            'query_ms_median': statistics.median(latencies),
+            'query_ms_p95': sorted(latencies)[int(len(latencies) * 0.95) - 1],
+            f'recall_at_{k}': statistics.mean(recalls),
+        }
+    return results
+
+
+def make_distractors(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(40)) for _ in range(count)]
+
+
+def keyword_rank(query: str, texts, target: int):
+    """Rank of the target under keyword matching (None if it does not match every word)."""
+    words = query.lower().split()
+    matches = [i for i, text in enumerate(texts) if all(w in text.lower() for w in words)]
+    return matches.index(target) + 1 if target in matches else None
+
+
+def run_model(model: str, distractors: int) -> dict:
+    embedder = Embedder(model)
+    texts = make_distractors(distractors) + [text for _, text in PARAPHRASES]
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    embed_s = time.perf_counter() - start
+
+    semantic_ranks, keyword_hits = [], 0
+    for i, (query, _) in enumerate(PARAPHRASES):
+        target = distractors + i
+        scores = vectors @ embedder.embed([query])[0]
+        semantic_ranks.append(int((scores > scores[target]).sum()) + 1)
+        keyword_hits += keyword_rank(query, texts, target) is not None
+    return {
+        'model': model,
+        'texts': len(texts),
+        'embed_texts_per_s': len(texts) / embed_s,
+        'semantic_recall_at_1': sum(r <= 1 for r in semantic_ranks) / len(PARAPHRASES),
+        'semantic_recall_at_10': sum(r <= 10 for r in semantic_ranks) / len(PARAPHRASES),
+        'keyword_recall': keyword_hits / len(PARAPHRASES),
+        'semantic_ranks': semantic_ranks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000],
+                        help='Number of stored vectors')
+    parser.add_argument('--dim', type=int, default=384, help='Vector dimensions')
+    parser.add_argument('--queries', type=int, default=50, help='Queries per size')
+    parser.add_argument('-k', type=int, default=10, help='Results per query')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='Embedding model for the retrieval test')
+    parser.add_argument('--distractors', type=int, default=2000,
+                        help='Synthetic texts the paraphrase targets are hidden among')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = {'index': run_index(args.sizes, args.dim, args.queries, args.k)}
+    for r in results['index'].values():
+        print(f"{r['vectors']:>8} vectors: {r['query_ms_median']:6.1f} ms/query "
+              f"(p95 {r['query_ms_p95']:.1f}), recall@{args.k} {r[f'recall_at_{args.k}']:.3f}, "
+              f"{r['file_mb']:.1f} MB, first load {r['load_ms']:.0f} ms", file=sys.stderr)
+
+    if HAS_SENTENCE_TRANSFORMERS:
+        results['model'] = run_model(args.model, args.distractors)
+        m = results['model']
+        print(f"{m['model']}: {m['embed_texts_per_s']:.0f} texts/s, "
+              f"semantic recall@1 {m['semantic_recall_at_1']:.2f}, @10 {m['semantic_recall_at_10']:.2f}, "
+              f"keyword recall {m['keyword_recall']:.2f}", file=sys.stderr)
+    else:
+        print("sentence-transformers not installed; skipping the retrieval test", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Run the whole benchmark suite and write one JSON report.
+
+Runs hashing, categorization, summarization, OCR preprocessing, ingest,
+search and vector search benchmarks with fixed seeds, and records the
+environment (commit, Python, CPU, package versions) next to the results,
+so reports from the same machine can be compared with benchmarks.compare.
+
+Usage:
+    python -m benchmarks.suite [--preset quick|default|full] [--only search ingest] --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+# Arguments of each benchmark's run() per preset
+PRESETS = {
+    'quick': {
+        'hashing': {'sizes_mb': [1, 8], 'repeat': 3},
+        'categorize': {'sizes': [100, 1000], 'count': 20, 'repeat': 3},
+        'summarize': {'sizes': [20, 100, 500], 'count': 10, 'threads': 4},
+        'ocr': {'repeat': 1},
+        'ingest': {'count': 16, 'workers_list': [1, 2]},
+        'search': {'sizes': [10000], 'repeat': 10, 'limit': 50},
+        'vectors': {'sizes': [10000], 'dim': 384, 'queries': 20, 'k': 10},
+    },
+    'default': {
+        'hashing': {'sizes_mb': [1, 8, 64], 'repeat': 5},
+        'categorize': {'sizes': [100, 1000, 10000], 'count': 50, 'repeat': 5},
+        'summarize': {'sizes': [20, 100, 500], 'count': 20, 'threads': 4},
+        'ocr': {'repeat': 1},
+        'ingest': {'count': 40, 'workers_list': [1, 2, 4]},
+        'search': {'sizes': [10000, 100000], 'repeat': 20, 'limit': 50},
+        'vectors': {'sizes': [10000, 100000], 'dim': 384, 'queries': 50, 'k': 10},
+    },
+    'full': {
+        'hashing': {'sizes_mb': [1, 8, 64, 256], 'repeat': 5},
+        'categorize': {'sizes': [100, 1000, 10000], 'count': 50, 'repeat': 5},
+        'summarize': {'sizes': [20, 100, 500], 'count': 50, 'threads': 8},
+        'ocr': {'repeat': 3},
+        'ingest': {'count': 100, 'workers_list': [1, 2, 4, 8]},
+        'search': {'sizes': [10000, 100000, 1000000], 'repeat': 20, 'limit': 50},
+        'vectors': {'sizes': [10000, 100000, 1000000], 'dim': 384, 'queries': 50, 'k': 10},
+    },
+}
+
+BENCHMARKS = tuple(PRESETS['default'])
+
+# Packages whose versions change the numbers
+PACKAGES = ('Pillow', 'numpy', 'SQLAlchemy', 'pytesseract', 'tesserocr', 'opencv-python',
+            'transformers', 'torch', 'sentence-transformers', 'xxhash', 'watchdog')
+
+
+def environment() -> dict:
+    """Describe the machine and software the benchmarks ran on."""
+    env = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'packages': {},
+    }
+    try:
+        env['commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=Path(__file__).parent, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        env['commit'] = None
+    try:
+        for line in Path('/proc/cpuinfo').read_text().splitlines():
+            if line.startswith('model name'):
+                env['cpu'] = line.split(':', 1)[1].strip()
+                break
+        meminfo = Path('/proc/meminfo').read_text().split()
+        env['memory_gb'] = int(meminfo[meminfo.index('MemTotal:') + 1]) / 2**20
+    except (OSError, ValueError):
+        pass
+    for package in PACKAGES:
+        try:
+            env['packages'][package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            pass
+    return env
+
+
+def run_benchmark(name: str, args: dict) -> dict:
+    # Imported here so --only does not pay for unrelated imports
+    if name == 'hashing':
+        from . import hashing
+        from smartshot.utils.hashing import available_algorithms
+        return hashing.run(algorithms=available_algorithms(), **args)
+    if name == 'categorize':
+        from . import categorize
+        return categorize.run(**args)
+    if name == 'summarize':
+        from . import summarize
+        from smartshot.utils.summarize import BACKENDS, HAS_TRANSFORMERS
+        return summarize.run(list(BACKENDS) if HAS_TRANSFORMERS else ['extractive'], **args)
+    if name == 'ocr':
+        from . import ocr_preprocess
+        from .synthetic import generate_corpus
+        from smartshot.utils.preprocess import PROFILES
+        with tempfile.TemporaryDirectory(prefix='smartshot_bench_') as tmp:
+            results = ocr_preprocess.run(generate_corpus(Path(tmp)), list(PROFILES), **args)
+        # Per-image rows are for investigating, not comparing
+        return {profile: result['summary'] for profile, result in results.items()}
+    if name == 'ingest':
+        from . import ingest
+        return ingest.run(**args)
+    if name == 'search':
+        from . import search
+        return search.run(**args)
+    if name == 'vectors':
+        from . import semantic
+        return semantic.run_index(**args)
+    raise ValueError(f"Unknown benchmark: {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--preset', choices=list(PRESETS), default='default',
+                        help='quick takes about a minute; full includes 1M-row search')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run only these benchmarks')
+    parser.add_argument('--output', type=Path, help='Write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    report = {'environment': environment(), 'preset': args.preset, 'results': {}, 'seconds': {}}
+    for name in args.only or BENCHMARKS:
+        print(f"Running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        try:
+            report['results'][name] = run_benchmark(name, PRESETS[args.preset][name])
+        except Exception as e:
+            print(f"{name} failed: {e}", file=sys.stderr)
+            report['results'][name] = {'error': str(e)}
+        report['seconds'][name] = time.perf_counter() - start
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+        print(f"Wrote {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark summarization latency per backend.
+
+Summarizes deterministic pseudo-OCR texts of several lengths one at a
+time (latency of a single screenshot) and from several threads at once
+(throughput with the summarizer's micro-batching). Model backends are
+only run when transformers is installed; their load time is reported
+separately.
+
+Usage:
+    python -m benchmarks.summarize [--backends extractive distilbart] [--output results.json]
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from smartshot.utils.summarize import BACKENDS, HAS_TRANSFORMERS, Summarizer
+
+from .categorize import make_texts
+
+
+def run(backends, sizes, count: int, threads: int) -> dict:
+    results = {}
+    for name in backends:
+        summarizer = Summarizer(name, idle_timeout=0)
+        start = time.perf_counter()
+        summarizer.warm_up(background=False)
+        result = results[name] = {'load_s': time.perf_counter() - start}
+        for size in sizes:
+            texts = make_texts(size, count)
+            latencies = []
+            for text in texts:
+                start = time.perf_counter()
+                summarizer.summarize(text)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                list(executor.map(summarizer.summarize, texts))
+            elapsed = time.perf_counter() - start
+            result[str(size)] = {
+                'words': size,
+                'texts': count,
+                'latency_ms_median': statistics.median(latencies),
+                'latency_ms_p95': sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+                f'concurrent_{threads}_texts_per_s': count / elapsed,
+            }
+        summarizer.close()
+    return results
+
+
+def main(argv=None):
+    default = list(BACKENDS) if HAS_TRANSFORMERS else ['extractive']
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=default, choices=list(BACKENDS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[20, 100, 500],
+                        help='Words per OCR text')
+    parser.add_argument('--count', type=int, default=20, help='Texts per size')
+    parser.add_argument('--threads', type=int, default=4, help='Concurrent callers for the throughput run')
+    parser.add_argument('--output', type=Path, help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.sizes, args.count, args.threads)
+    for name, result in results.items():
+        print(f"{name}: loaded in {result['load_s']:.1f} s", file=sys.stderr)
+        for size in args.sizes:
+            r = result[str(size)]
+            print(f"  {size:>5} words: {r['latency_ms_median']:8.1f} ms/text "
+                  f"(p95 {r['latency_ms_p95']:.1f}), "
+                  f"{r[f'concurrent_{args.threads}_texts_per_s']:.1f} texts/s concurrently", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,11 @@ const express = require('express')
 const cors = require('cors')
 const path = require('path')
 const fs = require('fs').promises
+const { createReadStream, openSync, watchFile } = require('fs')
 const sqlite3 = require('sqlite3').verbose()
 const WebSocket = require('ws')
 const http = require('http')
-const chokidar = require('chokidar')
+const { execFile } = require('child_process')
 
 const app = express()
 const server = http.createServer(app)
@@ -17,10 +18,18 @@ app.use(express.json())
 app.use(express.static('dist'))
 
 // Database setup
-const db = new sqlite3.Database('smartshot.db')
+const DB_PATH = 'smartshot.db'
+const db = new sqlite3.Database(DB_PATH)
+// Wait for the watcher's short write transactions instead of failing with SQLITE_BUSY
+db.configure('busyTimeout', 5000)
 
 // Initialize database tables
 db.serialize(() => {
+  // WAL lets these reads run while the Python watcher writes (and vice versa)
+  db.run('PRAGMA journal_mode=WAL')
+  db.run('PRAGMA synchronous=NORMAL')
+  db.run('PRAGMA mmap_size=268435456')
+
   db.run(`
     CREATE TABLE IF NOT EXISTS screenshots (
       id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -94,43 +103,367 @@ app.get('/api/screenshots/recent', (req, res) => {
   )
 })
 
+// Thumbnails are packed into one append-only file next to the database by
+// the Python side (smartshot/db/thumbnails.py); the thumbnails table holds
+// each one's offset and length. A thumbnail never changes for a given
+// content hash, so ?v=<file_hash> URLs can be cached forever.
+const THUMBNAIL_PACK = DB_PATH.replace(/\.db$/, '') + '.thumbs'
+const THUMBNAIL_SIZES = ['small', 'medium']
+let thumbnailFd = null
+
+// One descriptor shared by all requests: each stream reads its own range
+// with positioned reads, straight from the page cache to the socket
+const getThumbnailFd = () => {
+  if (thumbnailFd === null) thumbnailFd = openSync(THUMBNAIL_PACK, 'r')
+  return thumbnailFd
+}
+
+// GET /api/thumbnails/:id?size=small|medium&v=<file_hash>
+app.get('/api/thumbnails/:id', (req, res) => {
+  const size = THUMBNAIL_SIZES.includes(req.query.size) ? req.query.size : 'small'
+  db.get(
+    `SELECT t.offset, t.length, t.mime, s.file_hash
+     FROM screenshots s JOIN thumbnails t ON t.file_hash = s.file_hash
+     WHERE s.id = ? AND t.size = ?`,
+    [parseInt(req.params.id), size],
+    (err, row) => {
+      // No thumbnails table yet counts as no thumbnail
+      if (err && !/no such table/.test(err.message)) {
+        res.status(500).json({ error: err.message })
+        return
+      }
+      if (!row) {
+        res.status(404).json({ error: 'No thumbnail for this screenshot' })
+        return
+      }
+
+      const etag = `"${row.file_hash}-${size}"`
+      res.set('ETag', etag)
+      res.set('Cache-Control', req.query.v === row.file_hash
+        ? 'public, max-age=31536000, immutable'
+        : 'no-cache')
+      if (req.get('If-None-Match') === etag) {
+        res.status(304).end()
+        return
+      }
+
+      let fd
+      try {
+        fd = getThumbnailFd()
+      } catch (openErr) {
+        res.status(404).json({ error: 'Thumbnail pack not found' })
+        return
+      }
+      res.set('Content-Type', row.mime)
+      res.set('Content-Length', String(row.length))
+      createReadStream(null, { fd, start: row.offset, end: row.offset + row.length - 1, autoClose: false })
+        .on('error', () => res.destroy())
+        .pipe(res)
+    }
+  )
+})
+
+// OCR lines are stored per content hash by the Python side in the packed
+// format of smartshot/utils/ocr_lines.py: a header (version, width,
+// height) followed by each line's box, confidence in percent, text length
+// and UTF-8 text, all little-endian.
+const OCR_LINES_VERSION = 1
+
+const decodeOcrLines = (buffer) => {
+  if (buffer.readUInt8(0) !== OCR_LINES_VERSION) {
+    throw new Error(`Unknown OCR line format version: ${buffer.readUInt8(0)}`)
+  }
+  const width = buffer.readUInt32LE(1)
+  const height = buffer.readUInt32LE(5)
+  const lines = []
+  let offset = 9
+  while (offset < buffer.length) {
+    const length = buffer.readUInt16LE(offset + 13)
+    lines.push({
+      left: buffer.readUInt32LE(offset),
+      top: buffer.readUInt32LE(offset + 4),
+      width: buffer.readUInt16LE(offset + 8),
+      height: buffer.readUInt16LE(offset + 10),
+      confidence: buffer.readUInt8(offset + 12) / 100,
+      text: buffer.toString('utf8', offset + 15, offset + 15 + length)
+    })
+    offset += 15 + length
+  }
+  return { width, height, lines }
+}
+
+// GET /api/screenshots/:id/lines?query=<terms>
+// Lines containing any of the query terms are flagged with match: true so
+// the dashboard can highlight them on the image
+app.get('/api/screenshots/:id/lines', (req, res) => {
+  db.get(
+    `SELECT o.data FROM screenshots s JOIN ocr_lines o ON o.file_hash = s.file_hash
+     WHERE s.id = ?`,
+    [parseInt(req.params.id)],
+    (err, row) => {
+      // No ocr_lines table yet counts as no lines
+      if (err && !/no such table/.test(err.message)) {
+        res.status(500).json({ error: err.message })
+        return
+      }
+      if (!row) {
+        res.status(404).json({ error: 'No OCR lines for this screenshot' })
+        return
+      }
+
+      let result
+      try {
+        result = decodeOcrLines(row.data)
+      } catch (decodeErr) {
+        res.status(500).json({ error: decodeErr.message })
+        return
+      }
+      const terms = String(req.query.query || '').toLowerCase().split(/\s+/).filter(Boolean)
+      result.lines = result.lines.map(line => ({
+        ...line,
+        match: terms.length > 0 && terms.some(term => line.text.toLowerCase().includes(term))
+      }))
+      res.json(result)
+    }
+  )
+})
+
 // Search screenshots
-app.get('/api/search', (req, res) => {
-  const { query, category, app, days } = req.query
-  let sql = 'SELECT * FROM screenshots WHERE 1=1'
+// bm25 weights for the FTS5 columns: file_name, window_title, ocr_text
+const FTS_WEIGHTS = '5.0, 3.0, 1.0'
+
+// The FTS5 index is created and backfilled by the Python side
+// (smartshot/db/schema.py); fall back to LIKE scans until it exists.
+let hasFts = false
+const checkFts = () => new Promise(resolve => {
+  db.get(
+    "SELECT 1 AS found FROM sqlite_master WHERE type = 'table' AND name = 'screenshots_fts'",
+    (err, row) => {
+      hasFts = !err && !!row
+      resolve(hasFts)
+    }
+  )
+})
+
+// Turn free text into an FTS5 query that matches all of its words
+const quoteFtsQuery = (query) => {
+  const words = query.match(/\w+\*?/g) || []
+  return words.map(w => w.endsWith('*') ? `"${w.slice(0, -1)}"*` : `"${w}"`).join(' ') || '""'
+}
+
+// Columns /api/search can return (?fields=a,b,c); "snippet" is the highlighted
+// match, or the start of the OCR text, so the full text is not sent by default
+const SEARCH_FIELDS = [
+  'id', 'file_path', 'file_name', 'file_size', 'category', 'app_name',
+  'window_title', 'created_at', 'ocr_confidence', 'summary', 'ocr_text',
+  'snippet', 'rank'
+]
+const DEFAULT_SEARCH_FIELDS = ['id', 'file_path', 'file_name', 'category', 'app_name', 'created_at', 'snippet']
+const MAX_PAGE_SIZE = 200
+// count=estimate counts at most this many rows and reports a lower bound beyond it
+const ESTIMATE_CAP = 10000
+const PREVIEW_CHARS = 120
+
+// Cursors are base64url JSON arrays of the last row's sort key:
+// [created_at, id], or [rank, created_at, id] for full-text queries.
+// The format is shared with Database.search_page in smartshot/db.
+const encodeCursor = (values) => Buffer.from(JSON.stringify(values)).toString('base64url')
+const decodeCursor = (cursor) => {
+  let values
+  try {
+    values = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'))
+  } catch (err) {
+    values = null
+  }
+  if (!Array.isArray(values) || (values.length !== 2 && values.length !== 3)) {
+    const err = new Error('Invalid cursor')
+    err.status = 400
+    throw err
+  }
+  return values
+}
+
+const parseFields = (fields) => {
+  if (!fields) return DEFAULT_SEARCH_FIELDS
+  const requested = [...new Set(fields.split(',').map(f => f.trim()).filter(Boolean))]
+  const unknown = requested.filter(f => !SEARCH_FIELDS.includes(f))
+  if (unknown.length) {
+    const err = new Error(`Unknown fields: ${unknown.join(', ')}`)
+    err.status = 400
+    throw err
+  }
+  return requested
+}
+
+const dbAll = (sql, params) => new Promise((resolve, reject) => {
+  db.all(sql, params, (err, rows) => err ? reject(err) : resolve(rows))
+})
+
+const dbGet = (sql, params) => new Promise((resolve, reject) => {
+  db.get(sql, params, (err, row) => err ? reject(err) : resolve(row))
+})
+
+const runSearch = async (query, filters, ftsQuery, page) => {
+  const { category, app, days } = filters
+  const { fields, limit, after, count } = page
+  const useFts = !!(query && ftsQuery)
   const params = []
-  
-  if (query) {
-    sql += ' AND (ocr_text LIKE ? OR file_name LIKE ? OR window_title LIKE ?)'
-    params.push(`%${query}%`, `%${query}%`, `%${query}%`)
+
+  // The sort key is always selected so the next cursor can be built
+  const columns = fields
+    .filter(f => f !== 'snippet' && f !== 'rank')
+    .map(f => `s.${f}`)
+    .concat(['s.created_at AS _created_at', 's.id AS _id'])
+  let sql
+
+  if (useFts) {
+    columns.push(`bm25(screenshots_fts, ${FTS_WEIGHTS}) AS rank`)
+    if (fields.includes('snippet')) {
+      columns.push("snippet(screenshots_fts, -1, '<mark>', '</mark>', '...', 12) AS snippet")
+    }
+    sql = `SELECT ${columns.join(', ')}
+           FROM screenshots_fts
+           JOIN screenshots s ON s.id = screenshots_fts.rowid
+           WHERE screenshots_fts MATCH ?`
+    params.push(ftsQuery)
+  } else {
+    if (fields.includes('snippet')) {
+      columns.push(`substr(s.ocr_text, 1, ${PREVIEW_CHARS}) AS snippet`)
+    }
+    sql = `SELECT ${columns.join(', ')} FROM screenshots s WHERE 1=1`
+    if (query) {
+      sql += ' AND (s.ocr_text LIKE ? OR s.file_name LIKE ? OR s.window_title LIKE ?)'
+      params.push(`%${query}%`, `%${query}%`, `%${query}%`)
+    }
   }
   
   if (category) {
-    sql += ' AND category = ?'
+    sql += ' AND s.category = ?'
     params.push(category)
   }
   
   if (app) {
-    sql += ' AND app_name = ?'
+    sql += ' AND s.app_name = ?'
     params.push(app)
   }
   
   if (days) {
-    sql += ' AND created_at >= datetime("now", "-" || ? || " days")'
+    sql += ' AND s.created_at >= datetime("now", "-" || ? || " days")'
     params.push(days)
   }
-  
-  sql += ' ORDER BY created_at DESC LIMIT 50'
-  
-  db.all(sql, params, (err, rows) => {
+
+  let total = null
+  let totalIsEstimate = false
+  if (count === 'exact') {
+    total = (await dbGet(`SELECT COUNT(*) AS n FROM (${sql})`, params)).n
+  } else if (count === 'estimate') {
+    total = (await dbGet(`SELECT COUNT(*) AS n FROM (${sql} LIMIT ${ESTIMATE_CAP + 1})`, params)).n
+    if (total > ESTIMATE_CAP) {
+      total = ESTIMATE_CAP
+      totalIsEstimate = true
+    }
+  }
+
+  const pageParams = [...params]
+  if (useFts) {
+    // bm25 cannot be filtered on directly; page over the ranked matches
+    sql = `SELECT * FROM (${sql}) ranked`
+    if (after) {
+      sql += ' WHERE (rank > ? OR (rank = ? AND (_created_at, _id) < (?, ?)))'
+      pageParams.push(after[0], after[0], after[1], after[2])
+    }
+    sql += ' ORDER BY rank, _created_at DESC, _id DESC'
+  } else {
+    if (after) {
+      sql += ' AND (s.created_at, s.id) < (?, ?)'
+      pageParams.push(...after.slice(-2))
+    }
+    sql += ' ORDER BY s.created_at DESC, s.id DESC'
+  }
+  // One extra row tells whether there is a next page
+  sql += ' LIMIT ?'
+  pageParams.push(limit + 1)
+
+  let rows = await dbAll(sql, pageParams)
+  let nextCursor = null
+  if (rows.length > limit) {
+    rows = rows.slice(0, limit)
+    const last = rows[rows.length - 1]
+    const key = [last._created_at, last._id]
+    nextCursor = encodeCursor(useFts ? [last.rank, ...key] : key)
+  }
+  const results = rows.map(row => Object.fromEntries(
+    fields.filter(f => f in row).map(f => [f, row[f]])
+  ))
+  return { results, nextCursor, total, totalIsEstimate }
+}
+
+// GET /api/search?query=&category=&app=&days=&limit=&cursor=&fields=&count=
+// Returns { results, nextCursor, total, totalIsEstimate }. Pass nextCursor
+// back as ?cursor= for the next page; count is none (default), estimate or exact.
+// Semantic search needs the embedding model, which only the Python side
+// has; run its CLI (the vector index lives next to the database)
+const PYTHON = process.env.SMARTSHOT_PYTHON || 'python3'
+
+const runSemanticSearch = (query, filters, limit) => new Promise((resolve, reject) => {
+  const args = ['-m', 'smartshot.cli.search', 'semantic', query, '--json',
+    '--limit', String(limit), '--db', DB_PATH]
+  if (filters.category) args.push('--category', filters.category)
+  if (filters.app) args.push('--app', filters.app)
+  if (parseInt(filters.days)) args.push('--days', String(parseInt(filters.days)))
+  execFile(PYTHON, args, { timeout: 120000, maxBuffer: 16 * 1024 * 1024 }, (err, stdout, stderr) => {
     if (err) {
-      res.status(500).json({ error: err.message })
+      const message = (stderr || '').trim().split('\n').pop() || err.message
+      reject(Object.assign(new Error(message), { status: 503 }))
       return
     }
-    res.json({ results: rows })
+    try {
+      resolve(JSON.parse(stdout.trim().split('\n').pop()))
+    } catch (parseErr) {
+      reject(parseErr)
+    }
   })
 })
 
+app.get('/api/search', async (req, res) => {
+  const { query } = req.query
+
+  if (req.query.mode === 'semantic' && query) {
+    try {
+      const limit = Math.min(Math.max(parseInt(req.query.limit) || 50, 1), MAX_PAGE_SIZE)
+      const results = await runSemanticSearch(query, req.query, limit)
+      res.json({ results, nextCursor: null, total: null, totalIsEstimate: false })
+    } catch (err) {
+      res.status(err.status || 500).json({ error: err.message })
+    }
+    return
+  }
+
+  try {
+    const page = {
+      fields: parseFields(req.query.fields),
+      limit: Math.min(Math.max(parseInt(req.query.limit) || 50, 1), MAX_PAGE_SIZE),
+      after: req.query.cursor ? decodeCursor(req.query.cursor) : null,
+      count: ['estimate', 'exact'].includes(req.query.count) ? req.query.count : 'none'
+    }
+    if (query && !hasFts) await checkFts()
+    let result
+    if (query && hasFts) {
+      try {
+        result = await runSearch(query, req.query, query, page)
+      } catch (err) {
+        // Not valid FTS5 syntax: search for the individual words instead
+        result = await runSearch(query, req.query, quoteFtsQuery(query), page)
+      }
+    } else {
+      result = await runSearch(query, req.query, null, page)
+    }
+    res.json(result)
+  } catch (err) {
+    res.status(err.status || 500).json({ error: err.message })
+  }
+})
+
 // Get filter options
 app.get('/api/filters', (req, res) => {
   const queries = [
@@ -155,32 +488,121 @@ app.get('/api/filters', (req, res) => {
   })
 })
 
+// Statistics are read from rollup tables that triggers keep current
+// (smartshot/db/schema.py), so serving them never scans the screenshots
+// table. Until the Python side has created them, equivalent aggregates
+// over the screenshots table stand in for each rollup.
+// created_at is UTC; like the rollups, days and hours are local time
+const dayOf = "COALESCE(date(created_at, 'localtime'), '')"
+const STATS_FALLBACK = {
+  stats_totals: `SELECT 1 AS id, COUNT(*) AS screenshots, COALESCE(SUM(file_size), 0) AS total_bytes,
+    COALESCE(SUM(ocr_text IS NOT NULL AND ocr_text != ''), 0) AS ocr_processed,
+    COALESCE(SUM(category IS NOT NULL AND category != 'Uncategorized'), 0) AS categorized
+    FROM screenshots`,
+  stats_categories: `SELECT COALESCE(category, '') AS category, COUNT(*) AS count,
+    COALESCE(SUM(file_size), 0) AS total_bytes FROM screenshots GROUP BY 1`,
+  stats_apps: `SELECT COALESCE(app_name, '') AS app_name, COUNT(*) AS count,
+    COALESCE(SUM(file_size), 0) AS total_bytes FROM screenshots GROUP BY 1`,
+  stats_daily: `SELECT ${dayOf} AS day, COUNT(*) AS count,
+    COALESCE(SUM(file_size), 0) AS total_bytes FROM screenshots GROUP BY 1`,
+  stats_hourly: `SELECT COALESCE(strftime('%H', created_at, 'localtime'), '') AS hour, COUNT(*) AS count
+    FROM screenshots GROUP BY 1`,
+  stats_daily_categories: `SELECT ${dayOf} AS day, COALESCE(category, '') AS category, COUNT(*) AS count
+    FROM screenshots GROUP BY 1, 2`,
+  stats_daily_apps: `SELECT ${dayOf} AS day, COALESCE(app_name, '') AS app_name, COUNT(*) AS count
+    FROM screenshots GROUP BY 1, 2`
+}
+
+let hasStats = false
+const checkStats = () => new Promise(resolve => {
+  db.get(
+    "SELECT 1 AS found FROM sqlite_master WHERE type = 'table' AND name = 'stats_totals'",
+    (err, row) => {
+      hasStats = !err && !!row
+      resolve(hasStats)
+    }
+  )
+})
+
+const statsTable = (name) => hasStats ? name : `(${STATS_FALLBACK[name]}) AS ${name}`
+
+const WEEKDAYS = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+const formatBytes = (bytes) => {
+  const units = ['B', 'KB', 'MB', 'GB', 'TB']
+  let value = bytes || 0
+  let unit = 0
+  while (value >= 1024 && unit < units.length - 1) {
+    value /= 1024
+    unit++
+  }
+  return `${unit ? value.toFixed(1) : value} ${units[unit]}`
+}
+
+// Change from the previous window to the recent one, e.g. '+12%'
+const formatTrend = (recent, previous) => {
+  const change = previous ? Math.round((recent - previous) * 100 / previous) : (recent ? 100 : 0)
+  return `${change >= 0 ? '+' : ''}${change}%`
+}
+
+const getTotals = async () => {
+  if (!hasStats) await checkStats()
+  return (await dbGet(`SELECT screenshots, total_bytes, ocr_processed, categorized
+    FROM ${statsTable('stats_totals')} WHERE id = 1`)) ||
+    { screenshots: 0, total_bytes: 0, ocr_processed: 0, categorized: 0 }
+}
+
 // Get statistics
-const getStats = () => {
-  return new Promise((resolve, reject) => {
-    const queries = [
-      'SELECT COUNT(*) as total FROM screenshots',
-      'SELECT COUNT(*) as ocr_processed FROM screenshots WHERE ocr_text IS NOT NULL AND ocr_text != ""',
-      'SELECT COUNT(*) as categorized FROM screenshots WHERE category IS NOT NULL AND category != "Uncategorized"',
-      'SELECT COUNT(DISTINCT category) as categories FROM screenshots WHERE category IS NOT NULL'
-    ]
-    
-    Promise.all(queries.map(query => 
-      new Promise((resolve, reject) => {
-        db.get(query, (err, row) => {
-          if (err) reject(err)
-          else resolve(row)
-        })
-      })
-    )).then(([total, ocrProcessed, categorized, categories]) => {
-      resolve({
-        totalScreenshots: total.total,
-        ocrProcessed: ocrProcessed.ocr_processed,
-        categorized: categorized.categorized,
-        categories: categories.categories
-      })
-    }).catch(reject)
+// The watcher writes its pipeline metrics next to the database every few
+// seconds (smartshot/utils/metrics.py): JSON, and Prometheus text in .prom
+const METRICS_PATH = DB_PATH.replace(/\.db$/, '') + '.metrics.json'
+const PROMETHEUS_PATH = DB_PATH.replace(/\.db$/, '') + '.metrics.prom'
+
+const readPipelineMetrics = async () => {
+  try {
+    const metrics = JSON.parse(await fs.readFile(METRICS_PATH, 'utf8'))
+    // A snapshot that stopped updating means the watcher is gone
+    const age = Date.now() / 1000 - metrics.updated
+    metrics.running = !!metrics.running && age < 3 * (metrics.interval || 2)
+    return metrics
+  } catch (err) {
+    return null
+  }
+}
+
+// The parts of the metrics the dashboard shows, with times in milliseconds
+const summarizePipeline = (metrics) => {
+  if (!metrics) return { running: false }
+  const ms = (seconds) => seconds === null ? null : Math.round(seconds * 10000) / 10
+  const stages = {}
+  Object.entries(metrics.stages).forEach(([name, h]) => {
+    stages[name] = { count: h.count, p50: ms(h.p50), p95: ms(h.p95), p99: ms(h.p99) }
   })
+  const counters = metrics.counters
+  return {
+    running: metrics.running,
+    queueDepth: metrics.gauges.queue_depth || 0,
+    pendingFiles: metrics.gauges.pending_files || 0,
+    peakRssMb: metrics.gauges.peak_rss_bytes ? Math.round(metrics.gauges.peak_rss_bytes / 2 ** 20) : null,
+    throughputPerMinute: Math.round(metrics.throughput.per_minute * 10) / 10,
+    stored: (counters.screenshots || {}).stored || 0,
+    duplicates: (counters.screenshots || {}).duplicate || 0,
+    errors: Object.values(counters.errors || {}).reduce((sum, n) => sum + n, 0),
+    stages
+  }
+}
+
+const getStats = async () => {
+  const totals = await getTotals()
+  const categories = await dbGet(`SELECT COUNT(*) AS categories FROM ${statsTable('stats_categories')}
+    WHERE count > 0 AND category != ''`)
+  return {
+    totalScreenshots: totals.screenshots,
+    ocrProcessed: totals.ocr_processed,
+    categorized: totals.categorized,
+    categories: categories.categories,
+    pipeline: summarizePipeline(await readPipelineMetrics())
+  }
 }
 
 app.get('/api/stats/overview', async (req, res) => {
@@ -192,69 +614,83 @@ app.get('/api/stats/overview', async (req, res) => {
   }
 })
 
+// Full pipeline metrics snapshot (stage histograms, counters, gauges)
+app.get('/api/metrics', async (req, res) => {
+  const metrics = await readPipelineMetrics()
+  if (!metrics) {
+    res.status(404).json({ error: 'No pipeline metrics; is the watcher running?' })
+    return
+  }
+  res.json(metrics)
+})
+
+// Prometheus scrape endpoint
+app.get('/metrics', async (req, res) => {
+  try {
+    res.type('text/plain; version=0.0.4').send(await fs.readFile(PROMETHEUS_PATH, 'utf8'))
+  } catch (err) {
+    res.status(404).type('text/plain').send('# no pipeline metrics; is the watcher running?\n')
+  }
+})
+
+// Per-category or per-app counts with their trend over two `days` windows
+const getBreakdown = async (name, rollup, daily, total, days) => {
+  const rows = await dbAll(`SELECT ${name} AS name, count FROM ${statsTable(rollup)}
+    WHERE count > 0 AND ${name} != '' ORDER BY count DESC`)
+  const windows = await dbAll(`SELECT ${name} AS name,
+    SUM(CASE WHEN day >= date('now', 'localtime', ?) THEN count ELSE 0 END) AS recent,
+    SUM(CASE WHEN day < date('now', 'localtime', ?) THEN count ELSE 0 END) AS previous
+    FROM ${statsTable(daily)} WHERE day >= date('now', 'localtime', ?) GROUP BY ${name}`,
+  [`-${days - 1} days`, `-${days - 1} days`, `-${2 * days - 1} days`])
+  const trends = new Map(windows.map(w => [w.name, w]))
+  return rows.map(row => {
+    const window = trends.get(row.name) || { recent: 0, previous: 0 }
+    return {
+      name: row.name,
+      count: row.count,
+      percentage: total ? Math.round(row.count * 1000 / total) / 10 : 0,
+      trend: formatTrend(window.recent, window.previous)
+    }
+  })
+}
+
 // Get detailed statistics
-app.get('/api/stats/detailed', (req, res) => {
-  const days = parseInt(req.query.days) || 30
-  
-  const queries = [
-    // Overview stats
-    'SELECT COUNT(*) as total FROM screenshots',
-    'SELECT COUNT(*) as ocr_processed FROM screenshots WHERE ocr_text IS NOT NULL',
-    'SELECT COUNT(*) as categorized FROM screenshots WHERE category IS NOT NULL AND category != "Uncategorized"',
-    
-    // Category breakdown
-    `SELECT category, COUNT(*) as count, 
-     ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM screenshots), 1) as percentage
-     FROM screenshots 
-     WHERE category IS NOT NULL 
-     GROUP BY category 
-     ORDER BY count DESC`,
-    
-    // App breakdown
-    `SELECT app_name, COUNT(*) as count,
-     ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM screenshots), 1) as percentage
-     FROM screenshots 
-     WHERE app_name IS NOT NULL 
-     GROUP BY app_name 
-     ORDER BY count DESC`
-  ]
-  
-  Promise.all(queries.map(query => 
-    new Promise((resolve, reject) => {
-      if (query.includes('GROUP BY')) {
-        db.all(query, (err, rows) => {
-          if (err) reject(err)
-          else resolve(rows)
-        })
-      } else {
-        db.get(query, (err, row) => {
-          if (err) reject(err)
-          else resolve(row)
-        })
-      }
-    })
-  )).then(([total, ocrProcessed, categorized, categories, apps]) => {
+app.get('/api/stats/detailed', async (req, res) => {
+  const days = Math.max(parseInt(req.query.days) || 30, 1)
+  try {
+    const totals = await getTotals()
+    const [categories, applications, daily, hourly, weekday] = await Promise.all([
+      getBreakdown('category', 'stats_categories', 'stats_daily_categories', totals.screenshots, days),
+      getBreakdown('app_name', 'stats_apps', 'stats_daily_apps', totals.screenshots, days),
+      dbAll(`SELECT day AS date, count FROM ${statsTable('stats_daily')}
+        WHERE day >= date('now', 'localtime', ?) AND count > 0 ORDER BY day`, [`-${days - 1} days`]),
+      dbAll(`SELECT hour, count FROM ${statsTable('stats_hourly')} WHERE hour != ''`),
+      dbGet(`SELECT CAST(strftime('%w', day) AS INTEGER) AS weekday FROM ${statsTable('stats_daily')}
+        WHERE day != '' GROUP BY 1 HAVING SUM(count) > 0 ORDER BY SUM(count) DESC LIMIT 1`)
+    ])
+    const recent = daily.reduce((sum, d) => sum + d.count, 0)
+    const hours = new Map(hourly.map(h => [h.hour, h.count]))
     res.json({
       overview: {
-        totalScreenshots: total.total,
-        ocrProcessed: ocrProcessed.ocr_processed,
-        categorized: categorized.categorized,
-        totalSize: '45.2 MB', // Mock data
-        avgPerDay: Math.round((total.total / days) * 10) / 10,
-        mostActiveDay: 'Friday' // Mock data
+        totalScreenshots: totals.screenshots,
+        ocrProcessed: totals.ocr_processed,
+        categorized: totals.categorized,
+        totalSize: formatBytes(totals.total_bytes),
+        totalBytes: totals.total_bytes,
+        avgPerDay: Math.round((recent / days) * 10) / 10,
+        mostActiveDay: weekday ? WEEKDAYS[weekday.weekday] : null
       },
-      categories: categories.map(cat => ({
-        ...cat,
-        trend: '+' + Math.floor(Math.random() * 20) + '%' // Mock trend data
-      })),
-      applications: apps.map(app => ({
-        ...app,
-        trend: '+' + Math.floor(Math.random() * 25) + '%' // Mock trend data
-      }))
+      categories,
+      applications,
+      dailyActivity: daily,
+      hourlyDistribution: Array.from({ length: 24 }, (_, h) => {
+        const hour = String(h).padStart(2, '0')
+        return { hour, count: hours.get(hour) || 0 }
+      })
     })
-  }).catch(err => {
+  } catch (err) {
     res.status(500).json({ error: err.message })
-  })
+  }
 })
 
 // Settings endpoints
@@ -296,49 +732,87 @@ app.post('/api/settings', (req, res) => {
   })
 })
 
-// File watcher (mock implementation)
-const watchPath = path.join(process.env.HOME || process.env.USERPROFILE || '.', 'Pictures', 'Screenshots')
+// Pipeline events. The Python watcher appends a row to the events table
+// (smartshot/db/__init__.py) as each screenshot is queued, OCRed and
+// committed; polling it for new ids relays real progress, with the stored
+// row id, instead of watching the screenshot folder a second time here.
+const EVENT_POLL_INTERVAL = 500
+const EVENT_BATCH = 200
+// A burst of screenshots triggers one stats_update per interval at most
+const STATS_UPDATE_INTERVAL = 2000
 
-try {
-  const watcher = chokidar.watch(watchPath, {
-    ignored: /^\./, 
-    persistent: true,
-    ignoreInitial: true
-  })
-  
-  watcher.on('add', (filePath) => {
-    const fileName = path.basename(filePath)
-    if (/\.(png|jpg|jpeg|gif|bmp)$/i.test(fileName)) {
-      console.log('New screenshot detected:', fileName)
-      
-      // Broadcast new screenshot event
+let lastEventId = null
+let statsTimer = null
+let lastStatsUpdate = 0
+
+const scheduleStatsUpdate = () => {
+  if (statsTimer || clients.size === 0) return
+  const delay = Math.max(0, lastStatsUpdate + STATS_UPDATE_INTERVAL - Date.now())
+  statsTimer = setTimeout(() => {
+    lastStatsUpdate = Date.now()
+    getStats().then(stats => {
       broadcast({
-        type: 'new_screenshot',
-        payload: {
-          id: Date.now(),
-          type: 'screenshot_processed',
-          message: 'New screenshot processed',
-          details: fileName,
-          timestamp: new Date().toISOString(),
-          status: 'success'
-        }
+        type: 'stats_update',
+        payload: stats
       })
-      
-      // Update stats
-      getStats().then(stats => {
-        broadcast({
-          type: 'stats_update',
-          payload: stats
-        })
-      })
-    }
-  })
-  
-  console.log(`Watching for screenshots in: ${watchPath}`)
-} catch (error) {
-  console.log('File watcher not available:', error.message)
+    }).catch(err => console.log('Stats update failed:', err.message))
+      .finally(() => { statsTimer = null })
+  }, delay)
 }
 
+const toActivity = (event) => ({
+  id: event.id,
+  type: event.type,
+  message: event.message,
+  details: [event.file_name, event.details].filter(Boolean).join(' - '),
+  // Stored as naive UTC
+  timestamp: new Date(String(event.created_at).replace(' ', 'T') + 'Z').toISOString(),
+  status: event.status,
+  screenshotId: event.screenshot_id
+})
+
+const pollEvents = async () => {
+  // Nobody to tell: start from the newest event once someone connects
+  if (clients.size === 0) {
+    lastEventId = null
+    return
+  }
+  if (lastEventId === null) {
+    lastEventId = (await dbGet('SELECT COALESCE(MAX(id), 0) AS id FROM events')).id
+    return
+  }
+  const events = await dbAll('SELECT * FROM events WHERE id > ? ORDER BY id LIMIT ?',
+    [lastEventId, EVENT_BATCH])
+  if (events.length === 0) return
+  lastEventId = events[events.length - 1].id
+  for (const event of events) {
+    broadcast({
+      type: event.type === 'screenshot_processed' ? 'new_screenshot' : 'activity_update',
+      payload: toActivity(event)
+    })
+  }
+  if (events.some(event => event.type === 'screenshot_processed')) {
+    scheduleStatsUpdate()
+  }
+}
+
+const pollEventsLoop = () => {
+  pollEvents()
+    .catch(err => {
+      // The table appears once the watcher has run
+      if (!/no such table/.test(err.message)) console.log('Event poll failed:', err.message)
+    })
+    .finally(() => setTimeout(pollEventsLoop, EVENT_POLL_INTERVAL))
+}
+pollEventsLoop()
+
+// Every new metrics snapshot (one every few seconds while the watcher runs)
+// pushes fresh counts and pipeline metrics to the dashboards
+watchFile(METRICS_PATH, { interval: 2000 }, (curr, prev) => {
+  if (curr.mtimeMs === prev.mtimeMs) return
+  scheduleStatsUpdate()
+})
+
 // Serve React app for all other routes
 app.get('*', (req, res) => {
   res.sendFile(path.join(__dirname, 'dist', 'index.html'))
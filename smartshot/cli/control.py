@@ -0,0 +1,112 @@
+"""Command-line interface for controlling a running watcher."""
+import json
+import os
+import signal
+import time
+from typing import Optional
+
+import click
+
+from smartshot.utils.control import (
+    ControlError, NotRunning, default_pid_path, default_socket_path, read_pid, request
+)
+
+
+def _request(db: str, command: str, **args):
+    """Send a command to the watcher on db, turning failures into CLI errors."""
+    try:
+        return request(default_socket_path(db), command, **args)
+    except NotRunning as e:
+        raise click.ClickException(str(e))
+    except ControlError as e:
+        raise click.ClickException(f"{command} failed: {e}")
+
+
+def _alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+@click.command()
+@click.option('--db', default='smartshot.db', help='Database file path of the watcher')
+@click.option('--timeout', type=click.FloatRange(min=0), default=120, show_default=True,
+              help='Seconds to wait for queued screenshots to be finished')
+def stop(db: str, timeout: float):
+    """Stop the running watcher."""
+    pid_path = default_pid_path(db)
+    try:
+        pid = request(default_socket_path(db), 'stop')['pid']
+    except NotRunning:
+        # No control socket, e.g. it was deleted: fall back to the PID file
+        pid = read_pid(pid_path)
+        if not _alive(pid):
+            pid_path.unlink(missing_ok=True)
+            raise click.ClickException("No watcher is running")
+        os.kill(pid, signal.SIGTERM)
+    except ControlError as e:
+        raise click.ClickException(f"stop failed: {e}")
+
+    click.echo(f"Stopping watcher (pid {pid}), finishing running jobs...")
+    # The PID file is removed once everything queued is written
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not pid_path.exists() or not _alive(pid):
+            click.echo("Watcher stopped")
+            return
+        time.sleep(0.2)
+    raise click.ClickException(f"The watcher (pid {pid}) is still finishing after {timeout:.0f}s")
+
+
+@click.command()
+@click.option('--db', default='smartshot.db', help='Database file path of the watcher')
+@click.option('--json', 'as_json', is_flag=True, help='Print the status as JSON')
+def status(db: str, as_json: bool):
+    """Show the state of the running watcher."""
+    info = _request(db, 'status')
+    if as_json:
+        click.echo(json.dumps(info, indent=2))
+        return
+
+    uptime = int(info['uptime'])
+    click.echo(f"SmartShot v{info['version']} running (pid {info['pid']}) for "
+               f"{uptime // 3600}h {uptime // 60 % 60}m {uptime % 60}s")
+    click.echo(f"Watching:   {info['watch_path']}")
+    click.echo(f"Database:   {info['db_path']}")
+    click.echo(f"Queue:      {info['queue_depth'] or 0} in flight, "
+               f"{info['pending_files'] or 0} files being written")
+    jobs = info.get('jobs') or {}
+    click.echo(f"Jobs:       {jobs.get('queued', 0)} queued, {jobs.get('running', 0)} running, "
+               f"{jobs.get('failed', 0)} failed")
+    click.echo(f"Throughput: {info['throughput_per_minute']:.1f} screenshots/min")
+    if info.get('peak_rss_bytes') is not None:
+        click.echo(f"Memory:     {info['peak_rss_bytes'] / 2**20:.0f} MB peak")
+    screenshots = info['counters'].get('screenshots', {})
+    if screenshots:
+        click.echo("Screenshots: " + ", ".join(f"{count:g} {label}" for label, count in sorted(screenshots.items())))
+    click.echo(f"Categories: {info['categories']}")
+
+    models = info['models']
+    if models['ocr'] is not None:
+        click.echo(f"OCR:        {'available' if models['ocr'] else 'unavailable'}")
+    for name in ('summarizer', 'embedder'):
+        model = models.get(name)
+        if model:
+            label = model.get('backend') or model.get('model')
+            click.echo(f"{name.capitalize() + ':':<12}{label} ({'loaded' if model['loaded'] else 'not loaded'})")
+
+
+@click.command('reload-categories')
+@click.option('--db', default='smartshot.db', help='Database file path of the watcher')
+def reload_categories(db: str):
+    """Make the running watcher re-read its categories file."""
+    result = _request(db, 'reload-categories')
+    click.echo(f"Reloaded {len(result['categories'])} categories: {', '.join(result['categories'])}")
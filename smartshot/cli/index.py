@@ -0,0 +1,83 @@
+"""Command-line interface for indexing existing screenshots."""
+import click
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+from smartshot.utils.hashing import available_algorithms, DEFAULT_ALGORITHM
+from smartshot.utils.preprocess import PROFILES, DEFAULT_PROFILE
+from smartshot.utils.result_cache import DEFAULT_MAX_BYTES
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL
+if TYPE_CHECKING:
+    from smartshot.watcher.backfill import IndexStats
+
+
+def _format_progress(stats: "IndexStats") -> str:
+    return (
+        f"{stats.processed}/{stats.total_files} files "
+        f"({stats.indexed} indexed, {stats.duplicates} duplicates, {stats.errors} errors) "
+        f"- {stats.files_per_second:.1f} files/s, {stats.mb_per_second:.2f} MB/s"
+    )
+
+
+@click.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=None,
+              help='Number of worker processes (default: CPU count)')
+@click.option('--batch-size', type=click.IntRange(min=1), default=200,
+              help='Rows written per database transaction')
+@click.option('--no-ocr', is_flag=True, help='Disable OCR processing')
+@click.option('--no-categorize', is_flag=True, help='Disable automatic categorization')
+@click.option('--hash', 'hash_algorithm', type=click.Choice(available_algorithms()),
+              default=DEFAULT_ALGORITHM, show_default=True,
+              help='Hash used to detect duplicate files')
+@click.option('--ocr-profile', type=click.Choice(list(PROFILES)), default=DEFAULT_PROFILE,
+              show_default=True, help='Image preprocessing before OCR')
+@click.option('--cache-size', type=click.IntRange(min=0), default=DEFAULT_MAX_BYTES // 2**20,
+              show_default=True, help='Size limit in MB of the OCR result cache (0 disables)')
+@click.option('--semantic', is_flag=True,
+              help='Embed screenshot text for semantic search (needs sentence-transformers)')
+@click.option('--embedding-model', default=DEFAULT_EMBEDDING_MODEL, show_default=True,
+              help='sentence-transformers model used by --semantic')
+@click.option('--db', default='smartshot.db', help='Path to database file')
+def index(path: Path, workers: Optional[int], batch_size: int,
+          no_ocr: bool, no_categorize: bool, hash_algorithm: str, ocr_profile: str,
+          cache_size: int, semantic: bool, embedding_model: str, db: str):
+    """Index screenshots that already exist under PATH.
+
+    Walks PATH recursively. Files already recorded with the same size and
+    modification time, or with identical content, are skipped, so an
+    interrupted run can simply be started again.
+    """
+    from smartshot.watcher.backfill import ScreenshotIndexer
+
+    def report(stats: "IndexStats"):
+        click.echo(f"\r{_format_progress(stats)}", nl=False)
+
+    try:
+        indexer = ScreenshotIndexer(
+            db_path=db,
+            workers=workers,
+            batch_size=batch_size,
+            enable_ocr=not no_ocr,
+            enable_categorize=not no_categorize,
+            hash_algorithm=hash_algorithm,
+            ocr_profile=ocr_profile,
+            result_cache_bytes=cache_size * 2**20,
+            semantic=semantic,
+            embedding_model=embedding_model,
+            on_progress=report
+        )
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Scanning {path.expanduser().absolute()}...")
+    stats = indexer.run(path)
+    click.echo()
+
+    if stats.interrupted:
+        click.echo("Interrupted. Run the same command again to resume.")
+    click.echo(
+        f"Done: {stats.indexed} indexed, {stats.unchanged} unchanged, "
+        f"{stats.duplicates} duplicates, {stats.errors} errors "
+        f"in {stats.elapsed:.1f}s"
+    )
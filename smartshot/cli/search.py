@@ -4,96 +4,320 @@ from pathlib import Path
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from smartshot.db import Database
+from smartshot.db import Database, SearchPage, SEARCH_FIELDS, DEFAULT_SEARCH_FIELDS, COUNT_MODES, PREVIEW_CHARS
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL
+from smartshot.utils.metrics import default_metrics_path, read_metrics
 
 @click.group()
 def cli():
     """Search and manage screenshots in the database."""
     pass
 
+def _ask_watcher(db_path: str, command: str, **args):
+    """Run a command in the watcher running on db_path (see smartshot.utils.control).
+    
+    The watcher has the database open and its models loaded, so this is
+    much faster than starting them here.
+    
+    Returns:
+        The command's result, or None if no watcher is running or it did
+        not answer in time
+        
+    Raises:
+        ControlError: If the command failed in the watcher
+    """
+    from smartshot.utils.control import NoReply, NotRunning, default_socket_path, request
+    try:
+        return request(default_socket_path(db_path), command, **args)
+    except NotRunning:
+        return None
+    except NoReply as e:
+        click.echo(f"{e}; searching the database directly", err=True)
+        return None
+
 @cli.command()
 @click.argument('query', required=False)
 @click.option('--category', '-c', help='Filter by category')
 @click.option('--app', '-a', help='Filter by application name')
 @click.option('--days', type=int, help='Filter by last N days')
 @click.option('--limit', '-l', type=int, default=20, help='Maximum number of results')
+@click.option('--cursor', help='Continue from a previous page (printed after each page)')
+@click.option('--fields', help=f"Comma-separated columns to show ({', '.join(SEARCH_FIELDS)})")
+@click.option('--count', 'count_mode', type=click.Choice(COUNT_MODES), default='estimate',
+              show_default=True, help='How to count the total number of matches')
 @click.option('--db', default='smartshot.db', help='Path to database file')
 def search(query: Optional[str], category: Optional[str], 
-          app: Optional[str], days: Optional[int], limit: int, db: str):
-    """Search for screenshots in the database."""
-    db = Database(db)
+          app: Optional[str], days: Optional[int], limit: int,
+          cursor: Optional[str], fields: Optional[str], count_mode: str, db: str):
+    """Search for screenshots in the database.
+    
+    QUERY supports full-text syntax: prefixes (pyth*), phrases
+    ("connection refused") and boolean operators (error NOT warning).
+    """
+    from smartshot.utils.control import ControlError, InvalidRequest
     
-    # Apply date filter if specified
-    min_date = None
-    if days:
-        min_date = datetime.now() - timedelta(days=days)
+    columns = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
     
-    # Execute search
-    results = db.search_screenshots(
-        query=query,
-        category=category,
-        app_name=app,
-        min_date=min_date,
-        limit=limit
-    )
+    try:
+        page = _ask_watcher(db, 'search', query=query, category=category, app=app, days=days,
+                            limit=limit, cursor=cursor, fields=columns or DEFAULT_SEARCH_FIELDS,
+                            count=count_mode)
+    except InvalidRequest as e:
+        raise click.BadParameter(str(e))
+    except ControlError as e:
+        # E.g. the watcher's database is busy: search it here instead
+        click.echo(f"The watcher could not search ({e}); searching the database directly", err=True)
+        page = None
+    if page is not None:
+        page = SearchPage(**page)
+        for screenshot in page.results:
+            if screenshot.get('created_at'):
+                screenshot['created_at'] = datetime.fromisoformat(screenshot['created_at'])
+    else:
+        # No watcher running: open the database here
+        db = Database(db)
+        
+        # Apply date filter if specified
+        min_date = None
+        if days:
+            min_date = datetime.now() - timedelta(days=days)
+        
+        # Execute search
+        try:
+            page = db.search_page(
+                query=query,
+                category=category,
+                app_name=app,
+                min_date=min_date,
+                limit=limit,
+                cursor=cursor,
+                fields=columns or DEFAULT_SEARCH_FIELDS,
+                count=count_mode
+            )
+        except ValueError as e:
+            raise click.BadParameter(str(e))
     
     # Display results
-    if not results:
+    if not page.results:
         click.echo("No matching screenshots found.")
         return
     
-    for i, screenshot in enumerate(results, 1):
-        click.echo(f"\n[{i}] {screenshot.file_name}")
-        click.echo(f"    Path: {screenshot.file_path}")
-        click.echo(f"    App: {screenshot.app_name}")
-        click.echo(f"    Category: {screenshot.category or 'Uncategorized'}")
-        click.echo(f"    Date: {screenshot.created_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    if page.total is not None:
+        click.echo(f"{page.total}{'+' if page.total_is_estimate else ''} matching screenshots")
+    
+    for i, screenshot in enumerate(page.results, 1):
+        if columns:
+            click.echo(f"\n[{i}]")
+            for name in columns:
+                click.echo(f"    {name}: {screenshot.get(name)}")
+            continue
         
-        # Show preview of OCR text if available
-        if hasattr(screenshot, 'ocr_text') and screenshot.ocr_text:
-            preview = screenshot.ocr_text[:100]
-            if len(screenshot.ocr_text) > 100:
-                preview += "..."
-            click.echo(f"    Text: {preview}")
+        click.echo(f"\n[{i}] {screenshot['file_name']}")
+        click.echo(f"    Path: {screenshot['file_path']}")
+        click.echo(f"    App: {screenshot['app_name']}")
+        click.echo(f"    Category: {screenshot['category'] or 'Uncategorized'}")
+        click.echo(f"    Date: {screenshot['created_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Show the highlighted match for full-text results, otherwise a preview
+        if screenshot.get('snippet'):
+            label = "Match" if query else "Text"
+            click.echo(f"    {label}: {screenshot['snippet']}")
+    
+    if page.next_cursor:
+        click.echo(f"\nMore results: --cursor {page.next_cursor}")
+
+def _open_semantic(db_path: str, model: Optional[str], batch_size: int = 32):
+    """Find the vector index next to db_path and create an embedder for its model.
+    
+    Returns:
+        Tuple of (embedder, index path, (dimensions, model) of the index or None)
+    """
+    from smartshot.db.vectors import VectorIndex, default_vectors_path
+    from smartshot.utils.embeddings import Embedder
+    path = default_vectors_path(db_path)
+    header = VectorIndex.read_header(path)
+    try:
+        embedder = Embedder(model or (header[1] if header else DEFAULT_EMBEDDING_MODEL),
+                            batch_size=batch_size)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    return embedder, path, header
+
+
+@cli.command()
+@click.argument('query')
+@click.option('--category', '-c', help='Filter by category')
+@click.option('--app', '-a', help='Filter by application name')
+@click.option('--days', type=int, help='Filter by last N days')
+@click.option('--limit', '-l', type=int, default=20, help='Maximum number of results')
+@click.option('--json', 'as_json', is_flag=True, help='Print the results as JSON')
+@click.option('--db', default='smartshot.db', help='Path to database file')
+def semantic(query: str, category: Optional[str], app: Optional[str], days: Optional[int],
+             limit: int, as_json: bool, db: str):
+    """Find screenshots whose text is similar in meaning to QUERY.
+    
+    Unlike keyword search, "connection refused" also finds screenshots
+    that only say ECONNREFUSED. Needs embeddings, computed by
+    `smartshot start --semantic`, `smartshot index --semantic` or
+    `smartshot search embed`.
+    """
+    import json
+    from smartshot.utils.control import ControlError
+    
+    try:
+        matches = _ask_watcher(db, 'semantic', query=query, category=category, app=app,
+                               days=days, limit=limit)
+    except ControlError:
+        # E.g. the watcher runs without --semantic: load the model here
+        matches = None
+    if matches is None:
+        from smartshot.db.vectors import VectorIndex, match_to_dict, semantic_search
+        database = Database(db)
+        embedder, path, header = _open_semantic(db, None)
+        if header is None:
+            raise click.ClickException(
+                f"No semantic index at {path}. Run `smartshot search embed --db {db}` first."
+            )
+        index = VectorIndex(path, *header)
+        min_date = datetime.now() - timedelta(days=days) if days else None
+        matches = [
+            match_to_dict(screenshot, score, PREVIEW_CHARS)
+            for screenshot, score in semantic_search(database, index, embedder.embed([query])[0],
+                                                     limit=limit, category=category,
+                                                     app_name=app, min_date=min_date)
+        ]
+    
+    if as_json:
+        click.echo(json.dumps(matches))
+        return
+    
+    if not matches:
+        click.echo("No matching screenshots found.")
+        return
+    for i, match in enumerate(matches, 1):
+        click.echo(f"\n[{i}] {match['file_name']}  (similarity {match['score']:.2f})")
+        click.echo(f"    Path: {match['file_path']}")
+        click.echo(f"    App: {match['app_name']}")
+        click.echo(f"    Category: {match['category'] or 'Uncategorized'}")
+        click.echo(f"    Date: {match['created_at']}")
+        if match['snippet']:
+            click.echo(f"    Text: {match['snippet']}")
+
+
+@cli.command()
+@click.option('--model', help=f'sentence-transformers model (default: the index\'s, or {DEFAULT_EMBEDDING_MODEL})')
+@click.option('--batch-size', type=click.IntRange(min=1), default=64, show_default=True,
+              help='Texts embedded per model call')
+@click.option('--rebuild', is_flag=True, help='Re-embed every screenshot')
+@click.option('--db', default='smartshot.db', help='Path to database file')
+def embed(model: Optional[str], batch_size: int, rebuild: bool, db: str):
+    """Compute embeddings for semantic search of screenshots that have none.
+    
+    Also drops the vectors of deleted screenshots. Do not run it while the
+    watcher or an index run is adding vectors.
+    """
+    from smartshot.db.vectors import VectorIndex
+    from smartshot.utils.embeddings import embedding_text
+    
+    database = Database(db)
+    embedder, path, header = _open_semantic(db, model, batch_size)
+    if rebuild and path.exists():
+        path.unlink()
+    index = None
+    done = set()
+    if header is not None and header[1] == embedder.model:
+        index = VectorIndex(path, *header)
+        removed = index.compact(keep=database.get_ids())
+        if removed:
+            click.echo(f"Dropped {removed} stale vectors")
+        done = index.ids()
+    
+    added = 0
+    for rows in database.iter_texts(batch_size):
+        rows = [row for row in rows if row[0] not in done]
+        if not rows:
+            continue
+        vectors = embedder.embed([embedding_text(text, title, name) for _, text, title, name in rows])
+        if index is None:
+            index = VectorIndex(path, vectors.shape[1], embedder.model)
+        index.add([row[0] for row in rows], vectors)
+        added += len(rows)
+        click.echo(f"\rEmbedded {added} screenshots", nl=False)
+    click.echo(f"\rEmbedded {added} screenshots ({len(index) if index else 0} in the index)")
+
 
 @cli.command()
 @click.option('--db', default='smartshot.db', help='Path to database file')
 @click.option('--count', type=int, default=10, help='Number of items to show')
-def stats(db: str, count: int):
+@click.option('--days', type=int, default=30, show_default=True,
+              help='Window for the daily average and trends')
+@click.option('--rebuild', is_flag=True, help='Recompute the statistics from scratch first')
+@click.option('--pipeline', is_flag=True, help="Show the watcher's processing metrics instead")
+def stats(db: str, count: int, days: int, rebuild: bool, pipeline: bool):
     """Show database statistics."""
+    if pipeline:
+        _show_pipeline(default_metrics_path(db))
+        return
     db = Database(db)
-    
-    # Get total count
-    with db.Session() as session:
-        total = session.query(db.Screenshot).count()
-        
-        # Get most common categories
-        categories = session.query(
-            db.Screenshot.category,
-            db.func.count(db.Screenshot.id).label('count')
-        ).group_by(db.Screenshot.category).order_by(
-            db.func.count(db.Screenshot.id).desc()
-        ).limit(count).all()
-        
-        # Get most common apps
-        apps = session.query(
-            db.Screenshot.app_name,
-            db.func.count(db.Screenshot.id).label('count')
-        ).group_by(db.Screenshot.app_name).order_by(
-            db.func.count(db.Screenshot.id).desc()
-        ).limit(count).all()
+    if rebuild:
+        db.rebuild_stats()
+    stats = db.get_stats(top=count, days=days)
+    overview = stats['overview']
     
     # Display statistics
     click.echo(f"\n=== Database Statistics ===")
-    click.echo(f"Total screenshots: {total}")
+    click.echo(f"Total screenshots: {overview['total']}")
+    click.echo(f"Total size: {overview['total_bytes'] / (1024 * 1024):.1f} MB")
+    click.echo(f"OCR processed: {overview['ocr_processed']}")
+    click.echo(f"Categorized: {overview['categorized']}")
+    click.echo(f"Average per day (last {days} days): {overview['avg_per_day']}")
+    if overview['most_active_day']:
+        click.echo(f"Most active day: {overview['most_active_day']}")
     
     click.echo("\nMost common categories:")
-    for category, count in categories:
-        click.echo(f"  {category or 'Uncategorized'}: {count}")
+    for category in stats['categories']:
+        click.echo(f"  {category['name']}: {category['count']} ({category['trend']:+.0f}%)")
     
     click.echo("\nMost common applications:")
-    for app, count in apps:
-        click.echo(f"  {app or 'Unknown'}: {count}")
+    for app in stats['applications']:
+        click.echo(f"  {app['name']}: {app['count']} ({app['trend']:+.0f}%)")
+
+# Stages in the order a screenshot goes through them
+PIPELINE_STAGES = ('reconcile', 'hash', 'store', 'phash', 'preprocess', 'ocr', 'categorize', 'summarize_load',
+                   'summarize', 'thumbnails', 'embed', 'rename', 'move', 'db_commit', 'total')
+
+
+def _show_pipeline(path: Path):
+    """Print the metrics snapshot written by the running watcher."""
+    metrics = read_metrics(path)
+    if metrics is None:
+        click.echo(f"No pipeline metrics at {path}; they are written while `smartshot start` runs")
+        return
+    age = datetime.now().timestamp() - metrics['updated']
+    running = metrics.get('running') and age < 3 * metrics.get('interval', 2)
+    status = f"running (pid {metrics['pid']})" if running else "not running"
+    gauges = metrics['gauges']
+    
+    click.echo(f"\n=== Pipeline Metrics ===")
+    click.echo(f"Watcher: {status}, snapshot {age:.0f}s old, up {timedelta(seconds=int(metrics['uptime']))}")
+    click.echo(f"Throughput: {metrics['throughput']['per_minute']:.1f}/min "
+               f"({metrics['throughput']['last_minute']} in the last minute)")
+    click.echo(f"Queue depth: {gauges.get('queue_depth')}, files settling: {gauges.get('pending_files')}")
+    if gauges.get('peak_rss_bytes') is not None:
+        click.echo(f"Memory: peak RSS {gauges['peak_rss_bytes'] / 2**20:.0f} MB, "
+                   f"{(gauges.get('memory_reserved_bytes') or 0) / 2**20:.0f} MB of images in flight")
+    for name, values in metrics['counters'].items():
+        click.echo(f"{name.replace('_', ' ').capitalize()}: "
+                   + ", ".join(f"{label or 'total'} {value:g}" for label, value in values.items()))
+    
+    stages = metrics['stages']
+    order = [s for s in PIPELINE_STAGES if s in stages] + sorted(set(stages) - set(PIPELINE_STAGES))
+    click.echo(f"\n{'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in order:
+        h = stages[name]
+        click.echo(f"{name:<16}{h['count']:>8}" + "".join(
+            f"{h[key] * 1000:>10.1f}" for key in ('p50', 'p95', 'p99', 'max')
+        ))
 
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,73 @@
+"""Command-line interface for building thumbnails of stored screenshots."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import click
+
+from smartshot.db import Database
+from smartshot.db.thumbnails import ThumbnailPack, default_pack_path
+from smartshot.utils.thumbnails import THUMBNAIL_SIZES, Thumbnail, make_thumbnails
+
+
+def _render(path: str) -> Tuple[str, Optional[List[Thumbnail]], Optional[str]]:
+    """Encode the thumbnails of one file (runs in a worker process)."""
+    try:
+        return path, make_thumbnails(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+@click.command()
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=None,
+              help='Number of worker processes (default: CPU count)')
+@click.option('--batch-size', type=click.IntRange(min=1), default=128,
+              help='Screenshots per pack write and database transaction')
+@click.option('--db', default='smartshot.db', help='Path to database file')
+def thumbnails(workers: Optional[int], batch_size: int, db: str):
+    """Build missing thumbnails for screenshots already in the database.
+
+    Screenshots added by the watcher get thumbnails as they arrive; this
+    fills them in for rows added before, or by `smartshot index`. It can be
+    interrupted and run again.
+    """
+    database = Database(db)
+    pack = ThumbnailPack(default_pack_path(db))
+    built = missing = failed = 0
+    after_id = 0
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        while True:
+            rows = database.get_missing_thumbnails(THUMBNAIL_SIZES, after_id, batch_size)
+            if not rows:
+                break
+            after_id = rows[-1][0]
+            # Identical content shares one set of thumbnails
+            paths = {}
+            for _, file_path, file_hash in rows:
+                if not os.path.exists(file_path):
+                    missing += 1
+                    continue
+                paths.setdefault(file_hash, file_path)
+            hashes = {path: file_hash for file_hash, path in paths.items()}
+
+            rendered = []
+            for path, thumbs, error in executor.map(_render, list(paths.values()), chunksize=4):
+                if thumbs is None:
+                    failed += 1
+                    click.echo(f"\nThumbnail generation failed for {path}: {error}")
+                    continue
+                rendered.append((hashes[path], thumbs))
+
+            blobs = [thumb.data for _, thumbs in rendered for thumb in thumbs]
+            locations = iter(pack.append(blobs))
+            database.store_thumbnails([
+                {'file_hash': file_hash, 'size': thumb.size, 'offset': offset, 'length': length,
+                 'mime': thumb.mime, 'width': thumb.width, 'height': thumb.height}
+                for file_hash, thumbs in rendered
+                for thumb, (offset, length) in zip(thumbs, locations)
+            ])
+            built += len(rendered)
+            click.echo(f"\rBuilt thumbnails for {built} screenshots", nl=False)
+    pack.close()
+    click.echo(f"\rBuilt thumbnails for {built} screenshots "
+               f"({missing} files missing, {failed} failed); pack is {pack.size() / 2**20:.1f} MB")
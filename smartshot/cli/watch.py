@@ -0,0 +1,158 @@
+"""Command-line interface for running the screenshot watcher."""
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import click
+
+from smartshot.utils import get_default_watch_path
+from smartshot.utils.hashing import available_algorithms, DEFAULT_ALGORITHM
+from smartshot.utils.preprocess import PROFILES, DEFAULT_PROFILE
+from smartshot.utils.phash import DEFAULT_MAX_DISTANCE, HASH_BITS
+from smartshot.utils.summarize import BACKENDS, DEFAULT_BACKEND, DEFAULT_IDLE_TIMEOUT
+from smartshot.utils.result_cache import DEFAULT_MAX_BYTES
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL
+from smartshot.utils.memory import DEFAULT_MEMORY_BUDGET
+
+# Seconds `start --daemon` waits for the background watcher to come up
+DAEMON_START_TIMEOUT = 60.0
+
+def _start_daemon(db: str):
+    """Run this `start` command again as a detached background process."""
+    from smartshot.utils.control import NoReply, NotRunning, default_socket_path, request
+    log_path = Path(db).with_name(f"{Path(db).stem}.log")
+    args = [sys.executable, '-m', 'smartshot.main'] + [a for a in sys.argv[1:] if a != '--daemon']
+    if os.name == 'nt':
+        detach = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {'start_new_session': True}
+    with open(log_path, 'ab') as log:
+        process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                   env=dict(os.environ, PYTHONUNBUFFERED='1'), **detach)
+    
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise click.ClickException(f"The watcher exited with status {process.returncode}; see {log_path}")
+        try:
+            request(default_socket_path(db), 'ping', timeout=1.0)
+        except (NotRunning, NoReply):
+            time.sleep(0.2)
+            continue
+        click.echo(f"Watcher running in the background (pid {process.pid}), logging to {log_path}")
+        click.echo("Stop it with `smartshot stop`.")
+        return
+    raise click.ClickException(f"The watcher did not start within {DAEMON_START_TIMEOUT:.0f}s; see {log_path}")
+
+@click.command()
+@click.option('--path', '-p', 'watch_path',
+              default=None,
+              help='Path to watch for screenshots (default: ~/Pictures/Screenshots)')
+@click.option('--recursive', '-r', is_flag=True, help='Also watch subdirectories')
+@click.option('--no-ocr', is_flag=True, help='Disable OCR processing')
+@click.option('--no-rename', is_flag=True, help='Disable automatic file renaming')
+@click.option('--no-categorize', is_flag=True, help='Disable automatic categorization')
+@click.option('--db', default='smartshot.db', help='Database file path')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=2,
+              help='Number of worker threads for OCR and summarization')
+@click.option('--queue-size', type=click.IntRange(min=1), default=32,
+              help='Maximum screenshots in flight before new events wait')
+@click.option('--hash', 'hash_algorithm', type=click.Choice(available_algorithms()),
+              default=DEFAULT_ALGORITHM, show_default=True,
+              help='Hash used to detect duplicate files')
+@click.option('--ocr-profile', type=click.Choice(list(PROFILES)), default=DEFAULT_PROFILE,
+              show_default=True, help='Image preprocessing before OCR')
+@click.option('--near-dup-distance', type=click.IntRange(0, HASH_BITS - 1),
+              default=DEFAULT_MAX_DISTANCE, show_default=True,
+              help='Perceptual-hash distance at which earlier results are reused (0 disables)')
+@click.option('--summarizer', type=click.Choice(list(BACKENDS)), default=DEFAULT_BACKEND,
+              show_default=True, help='Summarization backend for smart filenames')
+@click.option('--warm-up/--no-warm-up', default=True, show_default=True,
+              help='Load the summarization model in the background at startup')
+@click.option('--summarizer-idle', type=click.FloatRange(min=0), default=DEFAULT_IDLE_TIMEOUT,
+              show_default=True, help='Seconds idle before the model is unloaded (0 = never)')
+@click.option('--cache-size', type=click.IntRange(min=0), default=DEFAULT_MAX_BYTES // 2**20,
+              show_default=True, help='Size limit in MB of the OCR/summary result cache (0 disables)')
+@click.option('--semantic', is_flag=True,
+              help='Embed screenshot text for semantic search (needs sentence-transformers)')
+@click.option('--embedding-model', default=DEFAULT_EMBEDDING_MODEL, show_default=True,
+              help='sentence-transformers model used by --semantic')
+@click.option('--no-thumbnails', is_flag=True, help='Do not store previews for the web UI')
+@click.option('--categories', 'categories_path', type=click.Path(exists=True, dir_okay=False),
+              help='JSON file of custom categories (reread by `smartshot reload-categories`)')
+@click.option('--memory-budget', type=click.IntRange(min=0), default=DEFAULT_MEMORY_BUDGET // 2**20,
+              show_default=True,
+              help='MB of decoded images processed at once; large screenshots wait their turn (0 = no limit)')
+@click.option('--rescan/--no-rescan', default=True, show_default=True,
+              help='Queue screenshots added to the folder while the watcher was stopped')
+@click.option('--daemon', is_flag=True,
+              help='Run in the background; control it with `smartshot stop` and `smartshot status`')
+def start(watch_path, recursive, no_ocr, no_rename, no_categorize, db, workers, queue_size,
+          hash_algorithm, ocr_profile, near_dup_distance, summarizer, warm_up, summarizer_idle,
+          cache_size, semantic, embedding_model, no_thumbnails, categories_path, memory_budget,
+          rescan, daemon):
+    """Start watching for new screenshots."""
+    if daemon:
+        _start_daemon(db)
+        return
+    
+    # Use provided path or default
+    watch_path = Path(watch_path) if watch_path else get_default_watch_path()
+    
+    from smartshot import __version__
+    print(f"SmartShot v{__version__}")
+    print(f"Watching directory: {watch_path}{' (recursive)' if recursive else ''}")
+    print(f"OCR: {'Disabled' if no_ocr else 'Enabled'}")
+    print(f"Auto-rename: {'Disabled' if no_rename else 'Enabled'}")
+    print(f"Auto-categorize: {'Disabled' if no_categorize else 'Enabled'}")
+    print(f"Database: {db}")
+    print(f"Workers: {workers}")
+    if not no_rename:
+        print(f"Summarizer: {summarizer}")
+    if semantic:
+        print(f"Semantic index: {embedding_model}")
+    if categories_path:
+        print(f"Categories: {categories_path}")
+    print("Press Ctrl+C or run `smartshot stop` to stop")
+    
+    try:
+        # Imported here: the watcher pulls in OCR, imaging and the database
+        from smartshot.watcher import ScreenshotWatcher
+        from smartshot.watcher.service import WatcherService
+        watcher = ScreenshotWatcher(
+            watch_path, 
+            enable_ocr=not no_ocr,
+            enable_rename=not no_rename,
+            enable_categorize=not no_categorize,
+            db_path=db,
+            workers=workers,
+            queue_size=queue_size,
+            hash_algorithm=hash_algorithm,
+            ocr_profile=ocr_profile,
+            near_duplicate_distance=near_dup_distance,
+            summarizer=summarizer,
+            warm_up=warm_up,
+            summarizer_idle_timeout=summarizer_idle,
+            result_cache_bytes=cache_size * 2**20,
+            semantic=semantic,
+            embedding_model=embedding_model,
+            enable_thumbnails=not no_thumbnails,
+            recursive=recursive,
+            categories_path=categories_path,
+            memory_budget=memory_budget * 2**20,
+            rescan=rescan
+        )
+        service = WatcherService(watcher)
+        
+        # Signals stop the watcher like `smartshot stop` does
+        signal.signal(signal.SIGINT, lambda sig, frame: service.stop())
+        signal.signal(signal.SIGTERM, lambda sig, frame: service.stop())
+        
+        # Serves the control socket and blocks until stopped
+        service.run()
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
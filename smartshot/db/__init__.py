@@ -1,19 +1,55 @@
 """Database models and operations for SmartShot."""
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, func
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, LargeBinary, func
+from sqlalchemy import event, literal_column, table, column, select, text, tuple_, and_, or_, update, delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, List
-import hashlib
+from typing import Any, Optional, List, Tuple, Dict, Iterable, Sequence
+import base64
+import json
+import re
+
+from smartshot.utils.hashing import hash_file, DEFAULT_ALGORITHM
+from .schema import apply_migrations, has_table, FTS_WEIGHTS, STATS_REBUILD
 
 Base = declarative_base()
 
+# Applied to every connection. WAL lets the Node API and the CLI read while
+# the watcher writes; NORMAL sync is durable across application crashes and
+# only risks the last transactions on power loss.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-65536",      # 64 MiB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MiB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+# Screenshot status: stored with its metadata and waiting for its job,
+# fully analyzed, or given up on after its job failed too often
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
 class Screenshot(Base):
     __tablename__ = 'screenshots'
     id = Column(Integer, primary_key=True)
     file_path = Column(String(512), unique=True, nullable=False)
     file_name = Column(String(255), nullable=False)
     file_size = Column(Integer, nullable=False)
+    file_mtime_ns = Column(Integer)
     file_hash = Column(String(64), index=True, nullable=False)
     category = Column(String(100), index=True)
     app_name = Column(String(255), index=True)
@@ -21,6 +57,10 @@ class Screenshot(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     ocr_text = Column(Text)
     ocr_confidence = Column(Float)
+    summary = Column(Text)
+    phash = Column(String(64))
+    # pending until OCR, summary, category, rename and move have run (see Job)
+    status = Column(String(16), nullable=False, default=READY, server_default=READY)
 
     # Add indexes for better query performance
     __table_args__ = (
@@ -29,38 +69,512 @@ class Screenshot(Base):
         Index('idx_app_created', 'app_name', 'created_at'),
     )
 
+class FileHash(Base):
+    """Cached digest of a file, valid while its size and mtime are unchanged."""
+    __tablename__ = 'file_hashes'
+    file_path = Column(String(512), primary_key=True)
+    file_size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    algorithm = Column(String(16), nullable=False)
+    digest = Column(String(64), nullable=False)
+
+class Thumbnail(Base):
+    """Location of a thumbnail in the pack file (see ``thumbnails.ThumbnailPack``).
+    
+    Keyed by file content, so identical screenshots share thumbnails and a
+    (file_hash, size) pair always names the same bytes.
+    """
+    __tablename__ = 'thumbnails'
+    file_hash = Column(String(64), primary_key=True)
+    size = Column(String(16), primary_key=True)
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    mime = Column(String(32), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+
+class OCRLines(Base):
+    """Lines of text found in a screenshot, with boxes and confidences.
+    
+    ``data`` is the compact encoding of ``smartshot.utils.ocr_lines.pack_lines``.
+    Keyed by file content like thumbnails, so identical screenshots share it.
+    """
+    __tablename__ = 'ocr_lines'
+    file_hash = Column(String(64), primary_key=True)
+    line_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+# Number of most recent events kept in the change log
+EVENT_LOG_SIZE = 1000
+
+class Event(Base):
+    """Change log of pipeline progress, read by the Node server.
+    
+    The watcher appends a row as a screenshot is queued, OCRed and
+    committed; the server polls for ids above the last one it has seen and
+    pushes them to the dashboards. Only the newest ``EVENT_LOG_SIZE`` rows
+    are kept.
+    """
+    __tablename__ = 'events'
+    # AUTOINCREMENT: ids are never reused after old rows are pruned
+    __table_args__ = {'sqlite_autoincrement': True}
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    type = Column(String(32), nullable=False)     # queued, ocr_completed, screenshot_processed, error, ...
+    status = Column(String(16), nullable=False)   # info, success, warning or error
+    message = Column(Text, nullable=False)
+    details = Column(Text)
+    file_name = Column(String(255))
+    screenshot_id = Column(Integer)
+
+# Job states; a job is deleted once its screenshot is ready
+QUEUED = 'queued'
+RUNNING = 'running'
+
+# Job stages: the screenshot's row is stored, or its file is being moved
+# to ``moved_to``. OCR, summary and category results are checkpointed by
+# content in the result cache, so a rerun job does not compute them again.
+STORED = 'stored'
+MOVING = 'moving'
+
+class Job(Base):
+    """Deferred analysis of a screenshot.
+    
+    The watcher stores a new screenshot right away with its path, hash,
+    size, time and window context, status ``pending``, and queues a job to
+    OCR, summarize, categorize, rename and move it. Jobs run highest
+    ``priority`` first, oldest first within a priority. A failed attempt is
+    retried after ``next_attempt_at``; once out of attempts the job is left
+    in state ``failed`` with its last error.
+    """
+    __tablename__ = 'jobs'
+    id = Column(Integer, primary_key=True)
+    screenshot_id = Column(Integer, unique=True, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    state = Column(String(16), nullable=False, default=QUEUED)   # queued, running or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    stage = Column(String(16), nullable=False, default=STORED, server_default=STORED)
+    # Where the file is being moved, recorded before it moves
+    moved_to = Column(String(512))
+
+    __table_args__ = (
+        Index('idx_jobs_state_priority', 'state', 'priority'),
+    )
+
+# Columns that search_page can return. "snippet" is the highlighted FTS
+# match (or the start of the OCR text), so the full text need not be sent.
+SEARCH_FIELDS = (
+    'id', 'file_path', 'file_name', 'file_size', 'category', 'app_name',
+    'window_title', 'created_at', 'ocr_confidence', 'summary', 'ocr_text',
+    'snippet', 'rank',
+)
+DEFAULT_SEARCH_FIELDS = ('id', 'file_path', 'file_name', 'category', 'app_name',
+                         'created_at', 'snippet')
+
+# Counting modes for search_page
+COUNT_MODES = ('none', 'estimate', 'exact')
+# "estimate" counts at most this many rows and reports a lower bound beyond it
+ESTIMATE_CAP = 10000
+
+# Length of the OCR text preview used as the snippet without a full-text match
+PREVIEW_CHARS = 120
+
+
+# Indexed like SQLite's strftime('%w'), which starts on Sunday
+WEEKDAYS = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+
+def percent_change(recent: int, previous: int) -> float:
+    """Change from one period to the next in percent (100 when starting from zero)."""
+    if not previous:
+        return 100.0 if recent else 0.0
+    return round((recent - previous) * 100.0 / previous, 1)
+
+
+@dataclass
+class SearchPage:
+    """One page of search results."""
+    results: List[Dict[str, Any]]
+    # Pass to search_page(cursor=...) for the next page; None on the last page
+    next_cursor: Optional[str] = None
+    # Total matching rows (None unless requested)
+    total: Optional[int] = None
+    # True if total is a lower bound from a capped count
+    total_is_estimate: bool = False
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor."""
+    # Datetimes in the format SQLAlchemy stores them, so string comparison in
+    # SQLite (and in server.js, which shares these cursors) stays exact
+    raw = json.dumps([v.strftime('%Y-%m-%d %H:%M:%S.%f') if isinstance(v, datetime) else v
+                      for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) not in (2, 3):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return values
+
+
 class Database:
     def __init__(self, db_path: str = "smartshot.db"):
-        self.engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
-        self.Session = sessionmaker(bind=self.engine)
+        # Pooled connections stay open, so pragmas and the page cache persist
+        self.engine = create_engine(
+            f"sqlite:///{db_path}",
+            connect_args={"check_same_thread": False, "timeout": 5},
+            pool_size=5
+        )
+        event.listen(self.engine, "connect", _set_sqlite_pragmas)
+        # Keep attributes loaded after commit so returned objects stay usable
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
         self.Screenshot = Screenshot
         self.func = func
         Base.metadata.create_all(self.engine)
+        
+        try:
+            apply_migrations(self.engine)
+        except OperationalError as e:
+            print(f"Warning: Could not migrate database schema: {e}")
+        with self.engine.connect() as conn:
+            self.has_fts = has_table(conn, 'screenshots_fts')
+            self.has_stats = has_table(conn, 'stats_totals')
     
     def add_screenshot(self, file_path: str, file_name: str, file_size: int,
                       category: str = None, app_name: str = None, 
-                      window_title: str = None, ocr_text: str = None) -> Screenshot:
+                      window_title: str = None, ocr_text: str = None,
+                      file_mtime_ns: int = None, created_at: datetime = None,
+                      file_hash: str = None, summary: str = None,
+                      phash: str = None, ocr_confidence: float = None) -> Screenshot:
         with self.Session() as session:
-            file_hash = self._calculate_file_hash(file_path)
+            if file_hash is None:
+                file_hash = self._calculate_file_hash(file_path)
             screenshot = Screenshot(
                 file_path=str(file_path),
                 file_name=file_name,
                 file_size=file_size,
+                file_mtime_ns=file_mtime_ns,
                 file_hash=file_hash,
                 category=category,
                 app_name=app_name,
                 window_title=window_title,
                 ocr_text=ocr_text,
-                created_at=datetime.utcnow()
+                ocr_confidence=ocr_confidence,
+                summary=summary,
+                phash=phash,
+                created_at=created_at or datetime.utcnow()
             )
             session.add(screenshot)
             session.commit()
             return screenshot
     
+    def add_screenshots_bulk(self, rows: Iterable[dict]) -> int:
+        """Insert many screenshots in a single transaction.
+        
+        Rows whose ``file_path`` is already stored replace the existing record.
+        
+        Args:
+            rows: Dictionaries of Screenshot column values. ``file_path``,
+                ``file_name``, ``file_size`` and ``file_hash`` are required.
+                
+        Returns:
+            Number of rows written
+        """
+        rows = [dict(row, file_path=str(row['file_path'])) for row in rows]
+        if not rows:
+            return 0
+        for row in rows:
+            row.setdefault('created_at', datetime.utcnow())
+        
+        with self.Session() as session:
+            self._upsert_screenshots(session, rows)
+            session.commit()
+        return len(rows)
+    
+    def write_batch(self, screenshots: Iterable[dict] = (),
+                    file_hashes: Iterable[dict] = (),
+                    thumbnails: Iterable[dict] = (),
+                    ocr_lines: Iterable[dict] = (),
+                    events: Iterable[dict] = (),
+                    updates: Iterable[dict] = (),
+                    jobs: Iterable[dict] = ()) -> Dict[str, int]:
+        """Write screenshots, cached digests, thumbnail locations, OCR lines, events and jobs in one transaction.
+        
+        Used by ``DatabaseWriter`` to group the watcher's writes.
+        
+        Args:
+            screenshots: Screenshot rows, as for ``add_screenshots_bulk``
+            file_hashes: Digest rows, as for ``store_file_hashes``
+            thumbnails: Thumbnail rows, as for ``store_thumbnails``
+            ocr_lines: OCR line rows, as for ``store_ocr_lines``
+            events: Event rows, as for ``add_events``
+            updates: Changes to stored screenshots, as for ``update_screenshots``
+            jobs: Job rows, as for ``store_jobs``
+            
+        Returns:
+            Dictionary of file_path to screenshot id for the written and
+            updated screenshots
+        """
+        rows = [dict(row, file_path=str(row['file_path'])) for row in screenshots]
+        for row in rows:
+            row.setdefault('created_at', datetime.utcnow())
+        file_hashes = list(file_hashes)
+        thumbnails = list(thumbnails)
+        ocr_lines = list(ocr_lines)
+        events = list(events)
+        updates = list(updates)
+        jobs = list(jobs)
+        ids = {}
+        with self.Session() as session:
+            if rows:
+                ids = self._upsert_screenshots(session, rows, returning=True)
+            if updates:
+                ids.update(self._update_screenshots(session, updates))
+            if jobs:
+                self._upsert_jobs(session, jobs, ids)
+            if file_hashes:
+                self._upsert_file_hashes(session, file_hashes)
+            if thumbnails:
+                self._upsert_thumbnails(session, thumbnails)
+            if ocr_lines:
+                self._upsert_ocr_lines(session, ocr_lines)
+            if events:
+                self._insert_events(session, events, ids)
+            session.commit()
+        return ids
+    
+    @staticmethod
+    def _upsert_screenshots(session, rows: List[dict], returning: bool = False) -> Dict[str, int]:
+        """Insert screenshot rows, replacing rows with the same file_path."""
+        stmt = sqlite_insert(Screenshot)
+        update_columns = {
+            name: stmt.excluded[name]
+            for name in rows[0]
+            if name not in ('id', 'file_path')
+        }
+        stmt = stmt.on_conflict_do_update(index_elements=['file_path'], set_=update_columns)
+        if not returning:
+            session.execute(stmt, rows)
+            return {}
+        result = session.execute(stmt.returning(Screenshot.file_path, Screenshot.id), rows)
+        return {file_path: row_id for file_path, row_id in result}
+    
+    def update_screenshots(self, rows: Iterable[dict]) -> Dict[str, int]:
+        """Change stored screenshots, e.g. once their job has analyzed them.
+        
+        Args:
+            rows: Dictionaries with the screenshot ``id`` and the columns to
+                set. A screenshot set to ``ready`` has its job deleted.
+                
+        Returns:
+            Dictionary of file_path to id for rows that set file_path
+        """
+        rows = list(rows)
+        if not rows:
+            return {}
+        with self.Session() as session:
+            ids = self._update_screenshots(session, rows)
+            session.commit()
+        return ids
+    
+    @staticmethod
+    def _update_screenshots(session, rows: List[dict]) -> Dict[str, int]:
+        ids = {}
+        for row in rows:
+            values = {name: value for name, value in row.items() if name != 'id'}
+            if 'file_path' in values:
+                values['file_path'] = str(values['file_path'])
+                ids[values['file_path']] = row['id']
+            session.execute(update(Screenshot).where(Screenshot.id == row['id']).values(**values))
+            if values.get('status') == READY:
+                session.execute(delete(Job).where(Job.screenshot_id == row['id']))
+        return ids
+    
+    def store_jobs(self, rows: Iterable[dict]):
+        """Queue or change the jobs of screenshots.
+        
+        Args:
+            rows: Dictionaries of Job column values with screenshot_id, or
+                with the file_path of the screenshot instead. A screenshot
+                that already has a job gets the given values.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.Session() as session:
+            self._upsert_jobs(session, rows, {})
+            session.commit()
+    
+    @staticmethod
+    def _upsert_jobs(session, rows: List[dict], ids: Dict[str, int]):
+        for row in rows:
+            row = dict(row)
+            file_path = row.pop('file_path', None)
+            if file_path is not None and row.get('screenshot_id') is None:
+                # Written in this transaction, or by an earlier batch
+                row['screenshot_id'] = ids.get(str(file_path)) or session.query(Screenshot.id).filter(
+                    Screenshot.file_path == str(file_path)
+                ).scalar()
+            if row['screenshot_id'] is None:
+                print(f"No stored screenshot for job at {file_path}")
+                continue
+            stmt = sqlite_insert(Job).values(**row)
+            changed = {name: stmt.excluded[name] for name in row if name not in ('id', 'screenshot_id')}
+            stmt = (stmt.on_conflict_do_update(index_elements=['screenshot_id'], set_=changed)
+                    if changed else stmt.on_conflict_do_nothing())
+            session.execute(stmt)
+    
+    def claim_jobs(self, limit: int, now: Optional[datetime] = None) -> List[dict]:
+        """Take the next due jobs off the queue, marking them running.
+        
+        Args:
+            limit: Maximum number of jobs
+            now: Current UTC time (jobs not due before it are skipped)
+            
+        Returns:
+            Dictionaries with the job's id, attempts (including this one),
+            priority and moved_to, and the screenshot's id, file_path,
+            file_hash, file_size, app_name, window_title and created_at
+        """
+        if limit < 1:
+            return []
+        now = now or datetime.utcnow()
+        with self.Session() as session:
+            rows = session.query(
+                Job.id, Job.attempts, Job.priority, Job.moved_to, Screenshot.id, Screenshot.file_path,
+                Screenshot.file_hash, Screenshot.file_size, Screenshot.app_name,
+                Screenshot.window_title, Screenshot.created_at
+            ).join(Screenshot, Screenshot.id == Job.screenshot_id).filter(
+                Job.state == QUEUED, Job.next_attempt_at <= now
+            ).order_by(Job.priority.desc(), Job.id).limit(limit).all()
+            if not rows:
+                return []
+            session.execute(
+                update(Job).where(Job.id.in_([row[0] for row in rows]))
+                .values(state=RUNNING, attempts=Job.attempts + 1)
+            )
+            session.commit()
+        keys = ('job_id', 'attempts', 'priority', 'moved_to', 'screenshot_id', 'file_path', 'file_hash',
+                'file_size', 'app_name', 'window_title', 'created_at')
+        return [dict(zip(keys, row), attempts=row[1] + 1) for row in rows]
+    
+    def requeue_running_jobs(self) -> int:
+        """Queue jobs left running by a watcher that did not exit cleanly again.
+        
+        Returns:
+            Number of jobs requeued
+        """
+        with self.Session() as session:
+            count = session.execute(
+                update(Job).where(Job.state == RUNNING).values(state=QUEUED)
+            ).rowcount
+            session.commit()
+        return count
+    
+    def get_job_counts(self, due_before: Optional[datetime] = None) -> Dict[str, int]:
+        """Number of jobs in each state.
+        
+        Args:
+            due_before: Only count queued jobs due before this UTC time,
+                leaving out those waiting to be retried
+        """
+        with self.Session() as session:
+            q = session.query(Job.state, func.count())
+            if due_before is not None:
+                q = q.filter(or_(Job.state != QUEUED, Job.next_attempt_at <= due_before))
+            return dict(q.group_by(Job.state).all())
+    
+    def get_file_states(self, path_prefix: str) -> Dict[str, Tuple[int, Optional[int]]]:
+        """Get the recorded (file_size, file_mtime_ns) of every file under a directory.
+        
+        Files that were only hashed, such as duplicates of stored screenshots
+        left in place, are included from the digest cache.
+        
+        Args:
+            path_prefix: Directory whose files should be returned
+            
+        Returns:
+            Mapping of file path to (file_size, file_mtime_ns)
+        """
+        prefix = str(path_prefix)
+        # Range scans on the file_path primary and unique indexes instead of LIKE
+        with self.Session() as session:
+            hashed = session.query(
+                FileHash.file_path, FileHash.file_size, FileHash.mtime_ns
+            ).filter(
+                FileHash.file_path >= prefix,
+                FileHash.file_path < prefix + '\uffff'
+            )
+            states = {path: (size, mtime_ns) for path, size, mtime_ns in hashed}
+            rows = session.query(
+                Screenshot.file_path, Screenshot.file_size, Screenshot.file_mtime_ns
+            ).filter(
+                Screenshot.file_path >= prefix,
+                Screenshot.file_path < prefix + '\uffff'
+            )
+            states.update((path, (size, mtime_ns)) for path, size, mtime_ns in rows)
+            return states
+    
+    def get_existing_hashes(self, hashes: Iterable[str]) -> set:
+        """Return the subset of the given file hashes that are already stored."""
+        hashes = [h for h in set(hashes) if h]
+        found = set()
+        with self.Session() as session:
+            # Stay below SQLite's bound-parameter limit
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                found.update(
+                    h for (h,) in session.query(Screenshot.file_hash)
+                    .filter(Screenshot.file_hash.in_(chunk))
+                )
+        return found
+    
     def search_screenshots(self, query: str = None, category: str = None, 
                          app_name: str = None, min_date: datetime = None, 
-                         limit: int = 50) -> List[Screenshot]:
+                         limit: int = 50,
+                         highlight: Tuple[str, str] = ('[', ']')) -> List[Screenshot]:
+        """Search screenshots, ranking full-text matches by relevance.
+        
+        The query uses FTS5 syntax: ``pyth*`` for prefixes, ``"exact phrase"``
+        for phrases and ``AND``/``OR``/``NOT`` for boolean logic. Plain text
+        that is not valid FTS5 syntax is searched as a list of words.
+        
+        Args:
+            query: Full-text query over OCR text, window titles and file names
+            category: Filter by category
+            app_name: Filter by application name
+            min_date: Only include screenshots created on or after this date
+            limit: Maximum number of results
+            highlight: Markers placed around matched terms in snippets
+            
+        Returns:
+            Matching screenshots. With a query, results are ordered by bm25
+            relevance and each has ``snippet`` and ``rank`` attributes.
+        """
         with self.Session() as session:
+            if query and self.has_fts:
+                try:
+                    return self._fts_search(session, query, category, app_name,
+                                            min_date, limit, highlight)
+                except OperationalError:
+                    session.rollback()
+                    return self._fts_search(session, self._quote_fts_query(query),
+                                            category, app_name, min_date, limit, highlight)
+            
             q = session.query(Screenshot)
             if query:
                 q = q.filter(
@@ -68,24 +582,470 @@ class Database:
                     (Screenshot.window_title.contains(query)) |
                     (Screenshot.file_name.contains(query))
                 )
-            if category:
-                q = q.filter(Screenshot.category == category)
-            if app_name:
-                q = q.filter(Screenshot.app_name == app_name)
-            if min_date:
-                q = q.filter(Screenshot.created_at >= min_date)
+            q = self._apply_filters(q, category, app_name, min_date)
             return q.order_by(Screenshot.created_at.desc()).limit(limit).all()
     
+    def _fts_search(self, session, fts_query: str, category: Optional[str],
+                    app_name: Optional[str], min_date: Optional[datetime], limit: int,
+                    highlight: Tuple[str, str]) -> List[Screenshot]:
+        """Run a ranked full-text query against the FTS5 index."""
+        fts = table('screenshots_fts', column('rowid'))
+        fts_ref = literal_column('screenshots_fts')
+        rank = func.bm25(fts_ref, *FTS_WEIGHTS).label('rank')
+        snippet = func.snippet(fts_ref, -1, highlight[0], highlight[1], '...', 12).label('snippet')
+        
+        q = (session.query(Screenshot, snippet, rank)
+             .join(fts, fts.c.rowid == Screenshot.id)
+             .filter(fts_ref.op('MATCH')(fts_query)))
+        q = self._apply_filters(q, category, app_name, min_date)
+        
+        results = []
+        for screenshot, snippet_text, score in q.order_by(rank, Screenshot.created_at.desc()).limit(limit):
+            screenshot.snippet = snippet_text
+            screenshot.rank = score
+            results.append(screenshot)
+        return results
+    
+    @staticmethod
+    def _apply_filters(q, category: Optional[str], app_name: Optional[str],
+                       min_date: Optional[datetime]):
+        """Apply the non-text search filters to a query."""
+        if category:
+            q = q.filter(Screenshot.category == category)
+        if app_name:
+            q = q.filter(Screenshot.app_name == app_name)
+        if min_date:
+            q = q.filter(Screenshot.created_at >= min_date)
+        return q
+    
+    @staticmethod
+    def _quote_fts_query(query: str) -> str:
+        """Turn free text into an FTS5 query that matches all of its words."""
+        words = re.findall(r'\w+\*?', query)
+        return " ".join(
+            f'"{w[:-1]}"*' if w.endswith('*') else f'"{w}"'
+            for w in words
+        ) or '""'
+    
+    def search_page(self, query: str = None, category: str = None,
+                    app_name: str = None, min_date: datetime = None,
+                    limit: int = 20, cursor: str = None,
+                    fields: Sequence[str] = DEFAULT_SEARCH_FIELDS, count: str = 'none',
+                    highlight: Tuple[str, str] = ('[', ']')) -> SearchPage:
+        """Search screenshots one page at a time.
+        
+        Pages are keyset-paginated on (created_at, id), or on (rank,
+        created_at, id) for full-text queries, so later pages cost the same
+        as the first. Only the requested columns are read.
+        
+        Args:
+            query: Full-text query (same syntax as ``search_screenshots``)
+            category: Filter by category
+            app_name: Filter by application name
+            min_date: Only include screenshots created on or after this date
+            limit: Page size
+            cursor: ``next_cursor`` of the previous page
+            fields: Columns to return (see ``SEARCH_FIELDS``)
+            count: "none", "estimate" (capped at ``ESTIMATE_CAP``) or "exact"
+            highlight: Markers placed around matched terms in snippets
+            
+        Returns:
+            SearchPage with one dictionary per result
+            
+        Raises:
+            ValueError: For unknown fields, count modes or a malformed cursor
+        """
+        fields = list(dict.fromkeys(fields))
+        unknown = [f for f in fields if f not in SEARCH_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if count not in COUNT_MODES:
+            raise ValueError(f"count must be one of: {', '.join(COUNT_MODES)}")
+        after = decode_cursor(cursor) if cursor else None
+        
+        with self.Session() as session:
+            if query and self.has_fts:
+                try:
+                    return self._search_page(session, query, True, category, app_name, min_date,
+                                             limit, after, fields, count, highlight)
+                except OperationalError:
+                    session.rollback()
+                    query = self._quote_fts_query(query)
+                    return self._search_page(session, query, True, category, app_name, min_date,
+                                             limit, after, fields, count, highlight)
+            return self._search_page(session, query, False, category, app_name, min_date,
+                                     limit, after, fields, count, highlight)
+    
+    def _search_page(self, session, query: Optional[str], use_fts: bool,
+                     category: Optional[str], app_name: Optional[str],
+                     min_date: Optional[datetime], limit: int, after: Optional[list],
+                     fields: List[str], count: str, highlight: Tuple[str, str]) -> SearchPage:
+        """Build and run one page query (see ``search_page``)."""
+        columns = [getattr(Screenshot, f) for f in fields if f not in ('snippet', 'rank')]
+        # The sort key is always selected so the cursor can be built
+        columns += [Screenshot.created_at.label('_created_at'), Screenshot.id.label('_id')]
+        
+        if use_fts:
+            fts = table('screenshots_fts', column('rowid'))
+            fts_ref = literal_column('screenshots_fts')
+            columns.append(func.bm25(fts_ref, *FTS_WEIGHTS).label('rank'))
+            if 'snippet' in fields:
+                columns.append(func.snippet(fts_ref, -1, highlight[0], highlight[1], '...', 12)
+                               .label('snippet'))
+            base = (select(*columns)
+                    .select_from(Screenshot)
+                    .join(fts, fts.c.rowid == Screenshot.id)
+                    .where(fts_ref.op('MATCH')(query)))
+        else:
+            if 'snippet' in fields:
+                columns.append(func.substr(Screenshot.ocr_text, 1, PREVIEW_CHARS).label('snippet'))
+            base = select(*columns)
+            if query:
+                base = base.where(
+                    (Screenshot.ocr_text.contains(query)) |
+                    (Screenshot.window_title.contains(query)) |
+                    (Screenshot.file_name.contains(query))
+                )
+        base = self._apply_filters(base, category, app_name, min_date)
+        
+        total = None
+        estimate = False
+        if count == 'exact':
+            total = session.execute(select(func.count()).select_from(base.subquery())).scalar()
+        elif count == 'estimate':
+            total = session.execute(
+                select(func.count()).select_from(base.limit(ESTIMATE_CAP + 1).subquery())
+            ).scalar()
+            if total > ESTIMATE_CAP:
+                total, estimate = ESTIMATE_CAP, True
+        
+        if use_fts:
+            # bm25 cannot be filtered on directly; page over the ranked matches
+            ranked = base.subquery()
+            stmt = select(ranked)
+            if after:
+                rank, created_at, row_id = after
+                created_at = datetime.fromisoformat(created_at)
+                stmt = stmt.where(or_(
+                    ranked.c.rank > rank,
+                    and_(ranked.c.rank == rank,
+                         tuple_(ranked.c._created_at, ranked.c._id) < tuple_(created_at, row_id))
+                ))
+            stmt = stmt.order_by(ranked.c.rank, ranked.c._created_at.desc(), ranked.c._id.desc())
+        else:
+            stmt = base
+            if after:
+                created_at, row_id = after[-2:]
+                stmt = stmt.where(tuple_(Screenshot.created_at, Screenshot.id)
+                                  < tuple_(datetime.fromisoformat(created_at), row_id))
+            stmt = stmt.order_by(Screenshot.created_at.desc(), Screenshot.id.desc())
+        
+        # One extra row tells whether there is a next page
+        rows = session.execute(stmt.limit(limit + 1)).mappings().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            key = [last['_created_at'], last['_id']]
+            next_cursor = encode_cursor([last['rank']] + key if use_fts else key)
+        
+        results = [{f: row[f] for f in fields if f in row} for row in rows]
+        return SearchPage(results, next_cursor, total, estimate)
+    
+    def get_stats(self, top: Optional[int] = None, days: int = 30) -> Dict[str, Any]:
+        """Read collection statistics from the rollup tables.
+        
+        Every figure comes from small tables kept current by triggers, so
+        the cost does not grow with the number of screenshots.
+        
+        Args:
+            top: Only return the N largest categories and applications
+            days: Window (in days) for the per-day average, the daily
+                activity series and the trends, which compare it with the
+                window before it
+            
+        Returns:
+            Dictionary with ``overview``, ``categories``, ``applications``,
+            ``daily`` and ``hourly`` entries
+        """
+        # Local, as the rollups bucket the UTC created_at in local days
+        today = datetime.now().date()
+        start = (today - timedelta(days=days - 1)).isoformat()
+        previous_start = (today - timedelta(days=2 * days - 1)).isoformat()
+        window = {'start': start, 'previous_start': previous_start}
+        
+        with self.engine.connect() as conn:
+            totals = conn.execute(text(
+                "SELECT screenshots, total_bytes, ocr_processed, categorized "
+                "FROM stats_totals WHERE id = 1"
+            )).first() or (0, 0, 0, 0)
+            total = totals[0]
+            
+            def breakdown(name: str, rollup: str, daily: str):
+                rows = conn.execute(text(
+                    f"SELECT {name}, count, total_bytes FROM {rollup} "
+                    f"WHERE count > 0 AND {name} != '' "
+                    f"ORDER BY count DESC" + (" LIMIT :top" if top else "")
+                ), {'top': top}).all()
+                windows = {
+                    key: (recent, previous) for key, recent, previous in conn.execute(text(
+                        f"SELECT {name}, SUM(CASE WHEN day >= :start THEN count ELSE 0 END), "
+                        f"SUM(CASE WHEN day < :start THEN count ELSE 0 END) "
+                        f"FROM {daily} WHERE day >= :previous_start GROUP BY {name}"
+                    ), window)
+                }
+                return [{
+                    'name': key,
+                    'count': count,
+                    'total_bytes': size,
+                    'percentage': round(count * 100.0 / total, 1) if total else 0.0,
+                    'trend': percent_change(*windows.get(key, (0, 0))),
+                } for key, count, size in rows]
+            
+            categories = breakdown('category', 'stats_categories', 'stats_daily_categories')
+            apps = breakdown('app_name', 'stats_apps', 'stats_daily_apps')
+            daily = conn.execute(text(
+                "SELECT day, count FROM stats_daily WHERE day >= :start AND count > 0 ORDER BY day"
+            ), window).all()
+            hourly = dict(conn.execute(text(
+                "SELECT hour, count FROM stats_hourly WHERE hour != ''"
+            )).all())
+            weekday = conn.execute(text(
+                "SELECT CAST(strftime('%w', day) AS INTEGER), SUM(count) FROM stats_daily "
+                "WHERE day != '' GROUP BY 1 HAVING SUM(count) > 0 ORDER BY 2 DESC LIMIT 1"
+            )).first()
+        
+        recent = sum(count for _, count in daily)
+        return {
+            'overview': {
+                'total': total,
+                'total_bytes': totals[1],
+                'ocr_processed': totals[2],
+                'categorized': totals[3],
+                'avg_per_day': round(recent / days, 1) if days else 0.0,
+                'most_active_day': WEEKDAYS[weekday[0]] if weekday else None,
+            },
+            'categories': categories,
+            'applications': apps,
+            'daily': [{'date': day, 'count': count} for day, count in daily],
+            'hourly': [{'hour': f"{h:02d}", 'count': hourly.get(f"{h:02d}", 0)} for h in range(24)],
+        }
+    
+    def rebuild_stats(self):
+        """Recompute the statistics rollups from the screenshots table."""
+        with self.engine.begin() as conn:
+            for statement in STATS_REBUILD:
+                conn.exec_driver_sql(statement)
+    
+    def get_screenshot(self, screenshot_id: int) -> Optional[Screenshot]:
+        """Get a screenshot by its id."""
+        with self.Session() as session:
+            return session.get(Screenshot, screenshot_id)
+    
+    def get_screenshots(self, ids: Sequence[int]) -> List[Screenshot]:
+        """Get screenshots by id, in the order given (missing ids are skipped)."""
+        with self.Session() as session:
+            rows = {row.id: row for row in session.query(Screenshot).filter(Screenshot.id.in_(list(ids)))}
+        return [rows[i] for i in ids if i in rows]
+    
+    def iter_texts(self, batch_size: int = 256) -> Iterable[List[Tuple[int, str, str, str]]]:
+        """Yield (id, ocr_text, window_title, file_name) rows in batches, by id.
+        
+        Args:
+            batch_size: Rows per batch
+        """
+        last_id = 0
+        while True:
+            with self.Session() as session:
+                rows = session.query(
+                    Screenshot.id, Screenshot.ocr_text, Screenshot.window_title, Screenshot.file_name
+                ).filter(Screenshot.id > last_id).order_by(Screenshot.id).limit(batch_size).all()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            last_id = rows[-1][0]
+    
+    def get_ids(self) -> set:
+        """Ids of all screenshots."""
+        with self.Session() as session:
+            return {row_id for row_id, in session.query(Screenshot.id)}
+    
+    def get_perceptual_hashes(self) -> List[Tuple[int, str]]:
+        """Get (id, phash) for every screenshot that has a perceptual hash."""
+        with self.Session() as session:
+            return session.query(Screenshot.id, Screenshot.phash).filter(
+                Screenshot.phash.isnot(None)
+            ).all()
+    
     def get_screenshot_by_hash(self, file_hash: str) -> Optional[Screenshot]:
         """Check if a screenshot with the given hash already exists."""
         with self.Session() as session:
             return session.query(Screenshot).filter(Screenshot.file_hash == file_hash).first()
     
+    def get_cached_hash(self, file_path: str, file_size: int, mtime_ns: int,
+                        algorithm: str) -> Optional[str]:
+        """Return the cached digest of a file if its size and mtime still match."""
+        with self.Session() as session:
+            row = session.get(FileHash, str(file_path))
+            if (row is not None and row.file_size == file_size
+                    and row.mtime_ns == mtime_ns and row.algorithm == algorithm):
+                return row.digest
+            return None
+    
+    def store_file_hashes(self, rows: Iterable[dict]):
+        """Insert or refresh cached file digests in a single transaction.
+        
+        Args:
+            rows: Dictionaries with file_path, file_size, mtime_ns, algorithm and digest
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.Session() as session:
+            self._upsert_file_hashes(session, rows)
+            session.commit()
+    
+    @staticmethod
+    def _upsert_file_hashes(session, rows: List[dict]):
+        stmt = sqlite_insert(FileHash)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['file_path'],
+            set_={name: stmt.excluded[name] for name in ('file_size', 'mtime_ns', 'algorithm', 'digest')}
+        )
+        session.execute(stmt, rows)
+    
+    def store_thumbnails(self, rows: Iterable[dict]):
+        """Record where thumbnails are stored in the pack file.
+        
+        Args:
+            rows: Dictionaries with file_hash, size, offset, length, mime, width and height
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.Session() as session:
+            self._upsert_thumbnails(session, rows)
+            session.commit()
+    
+    @staticmethod
+    def _upsert_thumbnails(session, rows: List[dict]):
+        stmt = sqlite_insert(Thumbnail)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['file_hash', 'size'],
+            set_={name: stmt.excluded[name] for name in ('offset', 'length', 'mime', 'width', 'height')}
+        )
+        session.execute(stmt, rows)
+    
+    def get_thumbnail(self, screenshot_id: int, size: str) -> Optional[Thumbnail]:
+        """Get the location of a screenshot's thumbnail of the given size."""
+        with self.Session() as session:
+            return session.query(Thumbnail).join(
+                Screenshot, Screenshot.file_hash == Thumbnail.file_hash
+            ).filter(Screenshot.id == screenshot_id, Thumbnail.size == size).first()
+    
+    def has_thumbnails(self, file_hash: str, sizes: Iterable[str]) -> bool:
+        """Whether thumbnails of every given size exist for this content."""
+        sizes = list(sizes)
+        with self.Session() as session:
+            count = session.query(func.count()).select_from(Thumbnail).filter(
+                Thumbnail.file_hash == file_hash, Thumbnail.size.in_(sizes)
+            ).scalar()
+        return count == len(sizes)
+    
+    def get_missing_thumbnails(self, sizes: Iterable[str], after_id: int = 0,
+                               limit: int = 256) -> List[Tuple[int, str, str]]:
+        """Find screenshots that lack a thumbnail of one of the given sizes.
+        
+        Args:
+            sizes: Size names that should exist
+            after_id: Only screenshots with a larger id (for paging)
+            limit: Maximum number of rows
+            
+        Returns:
+            (id, file_path, file_hash) rows, by id
+        """
+        sizes = list(sizes)
+        have = select(func.count()).select_from(Thumbnail).where(
+            Thumbnail.file_hash == Screenshot.file_hash, Thumbnail.size.in_(sizes)
+        ).scalar_subquery()
+        with self.Session() as session:
+            rows = session.query(Screenshot.id, Screenshot.file_path, Screenshot.file_hash).filter(
+                Screenshot.id > after_id, Screenshot.file_hash != '', have < len(sizes)
+            ).order_by(Screenshot.id).limit(limit).all()
+        return [tuple(row) for row in rows]
+    
+    def store_ocr_lines(self, rows: Iterable[dict]):
+        """Store the OCR lines of screenshots.
+        
+        Args:
+            rows: Dictionaries with file_hash, line_count and data (packed lines)
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.Session() as session:
+            self._upsert_ocr_lines(session, rows)
+            session.commit()
+    
+    @staticmethod
+    def _upsert_ocr_lines(session, rows: List[dict]):
+        stmt = sqlite_insert(OCRLines)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['file_hash'],
+            set_={name: stmt.excluded[name] for name in ('line_count', 'data')}
+        )
+        session.execute(stmt, rows)
+    
+    def add_events(self, rows: Iterable[dict]):
+        """Append events to the change log.
+        
+        Args:
+            rows: Dictionaries with type, status and message, and optionally
+                details, file_name, screenshot_id and file_path. An event
+                with a file_path but no screenshot_id gets the id of the
+                screenshot stored at that path.
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        with self.Session() as session:
+            self._insert_events(session, rows, {})
+            session.commit()
+    
+    @staticmethod
+    def _insert_events(session, rows: List[dict], ids: Dict[str, int]):
+        """Insert events, resolving screenshot ids, and prune the oldest."""
+        values = []
+        for row in rows:
+            row = dict(row)
+            file_path = row.pop('file_path', None)
+            if file_path is not None and row.get('screenshot_id') is None:
+                # Written in this transaction, or by an earlier batch
+                row['screenshot_id'] = ids.get(str(file_path)) or session.query(Screenshot.id).filter(
+                    Screenshot.file_path == str(file_path)
+                ).scalar()
+            # executemany needs the same columns in every row
+            for name in ('details', 'file_name', 'screenshot_id'):
+                row.setdefault(name, None)
+            row.setdefault('created_at', datetime.utcnow())
+            values.append(row)
+        session.execute(Event.__table__.insert(), values)
+        session.execute(
+            text("DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - :keep"),
+            {'keep': EVENT_LOG_SIZE}
+        )
+    
+    def get_ocr_lines(self, file_hash: str) -> Optional[bytes]:
+        """Get the packed OCR lines of a file's content, if stored."""
+        if not file_hash:
+            return None
+        with self.Session() as session:
+            return session.query(OCRLines.data).filter(OCRLines.file_hash == file_hash).scalar()
+    
     @staticmethod
-    def _calculate_file_hash(file_path: str) -> str:
+    def _calculate_file_hash(file_path: str, algorithm: str = DEFAULT_ALGORITHM) -> str:
         try:
-            with open(file_path, 'rb') as f:
-                return hashlib.sha256(f.read()).hexdigest()
+            return hash_file(file_path, algorithm)
         except (IOError, OSError) as e:
             print(f"Error calculating hash for {file_path}: {e}")
             return ""
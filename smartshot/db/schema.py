@@ -0,0 +1,336 @@
+"""Raw SQLite schema objects and migrations for SmartShot.
+
+SQLAlchemy creates the ORM tables; everything it cannot express (FTS5
+virtual tables, triggers, backfills of existing data) lives here as
+numbered migrations. The applied version is tracked in ``PRAGMA user_version``.
+"""
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy.exc import OperationalError
+
+# Full-text index over the searchable text columns of ``screenshots``.
+# It is an external-content table, so the text is not stored twice; the
+# triggers below keep it in sync with every insert, update and delete.
+FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS screenshots_fts USING fts5(
+        file_name,
+        window_title,
+        ocr_text,
+        content='screenshots',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS screenshots_fts_insert AFTER INSERT ON screenshots BEGIN
+        INSERT INTO screenshots_fts(rowid, file_name, window_title, ocr_text)
+        VALUES (new.id, new.file_name, new.window_title, new.ocr_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS screenshots_fts_delete AFTER DELETE ON screenshots BEGIN
+        INSERT INTO screenshots_fts(screenshots_fts, rowid, file_name, window_title, ocr_text)
+        VALUES ('delete', old.id, old.file_name, old.window_title, old.ocr_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS screenshots_fts_update
+    AFTER UPDATE OF file_name, window_title, ocr_text ON screenshots BEGIN
+        INSERT INTO screenshots_fts(screenshots_fts, rowid, file_name, window_title, ocr_text)
+        VALUES ('delete', old.id, old.file_name, old.window_title, old.ocr_text);
+        INSERT INTO screenshots_fts(rowid, file_name, window_title, ocr_text)
+        VALUES (new.id, new.file_name, new.window_title, new.ocr_text);
+    END
+    """,
+    # Backfill rows that existed before the index was created
+    "INSERT INTO screenshots_fts(screenshots_fts) VALUES ('rebuild')",
+]
+
+# Relative column weights for bm25(): file_name, window_title, ocr_text
+FTS_WEIGHTS = (5.0, 3.0, 1.0)
+
+
+def add_column(table_name: str, column_name: str, column_type: str) -> Callable:
+    """Build a migration step that adds a column unless it already exists.
+
+    Fresh databases get new columns from the ORM models via ``create_all``,
+    so a plain ``ALTER TABLE`` would fail on them.
+    """
+    def step(connection):
+        columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table_name})")}
+        if column_name not in columns:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"
+            )
+    return step
+
+
+# Lets rescans and backfills skip files whose size and mtime are unchanged
+MTIME_SCHEMA = [
+    add_column('screenshots', 'file_mtime_ns', 'INTEGER'),
+]
+
+# Perceptual hash for near-duplicate lookup, and the summary so that
+# near-duplicates can reuse it
+NEAR_DUPLICATE_SCHEMA = [
+    add_column('screenshots', 'phash', 'VARCHAR(64)'),
+    add_column('screenshots', 'summary', 'TEXT'),
+]
+
+# Screenshots are stored before they are analyzed; existing rows are done
+STATUS_SCHEMA = [
+    add_column('screenshots', 'status', "VARCHAR(16) NOT NULL DEFAULT 'ready'"),
+]
+
+# Checkpoint of a job moving its screenshot (the jobs table itself is
+# created by the ORM)
+JOB_STAGE_SCHEMA = [
+    add_column('jobs', 'stage', "VARCHAR(16) NOT NULL DEFAULT 'stored'"),
+    add_column('jobs', 'moved_to', 'VARCHAR(512)'),
+]
+
+# Rollups of the statistics the CLI and web UI show. Triggers keep them up
+# to date on every insert, update and delete, so reading the stats costs a
+# few small lookups instead of scans over ``screenshots``. Rows whose count
+# drops to zero are kept; readers filter on ``count > 0``. NULL categories,
+# apps and days are stored under ''.
+STATS_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS stats_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        screenshots INTEGER NOT NULL DEFAULT 0,
+        total_bytes INTEGER NOT NULL DEFAULT 0,
+        ocr_processed INTEGER NOT NULL DEFAULT 0,
+        categorized INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_categories (
+        category TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        total_bytes INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_apps (
+        app_name TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        total_bytes INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0,
+        total_bytes INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily_categories (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_hourly (
+        hour TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stats_daily_apps (
+        day TEXT NOT NULL,
+        app_name TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, app_name)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _stats_delta(row: str, sign: str) -> str:
+    """SQL adding (sign = '+') or removing (sign = '-') one row to the rollups."""
+    size = f"{sign}COALESCE({row}.file_size, 0)"
+    ocr = f"{sign}({row}.ocr_text IS NOT NULL AND {row}.ocr_text != '')"
+    categorized = f"{sign}({row}.category IS NOT NULL AND {row}.category != 'Uncategorized')"
+    category = f"COALESCE({row}.category, '')"
+    app = f"COALESCE({row}.app_name, '')"
+    # created_at is UTC; days and hours are bucketed in local time, like
+    # the windows they are compared with (Database.get_stats, server.js)
+    day = f"COALESCE(date({row}.created_at, 'localtime'), '')"
+    hour = f"COALESCE(strftime('%H', {row}.created_at, 'localtime'), '')"
+    return f"""
+        INSERT INTO stats_totals (id, screenshots, total_bytes, ocr_processed, categorized)
+        VALUES (1, {sign}1, {size}, {ocr}, {categorized})
+        ON CONFLICT(id) DO UPDATE SET
+            screenshots = screenshots + excluded.screenshots,
+            total_bytes = total_bytes + excluded.total_bytes,
+            ocr_processed = ocr_processed + excluded.ocr_processed,
+            categorized = categorized + excluded.categorized;
+        INSERT INTO stats_categories (category, count, total_bytes) VALUES ({category}, {sign}1, {size})
+        ON CONFLICT(category) DO UPDATE SET
+            count = count + excluded.count, total_bytes = total_bytes + excluded.total_bytes;
+        INSERT INTO stats_apps (app_name, count, total_bytes) VALUES ({app}, {sign}1, {size})
+        ON CONFLICT(app_name) DO UPDATE SET
+            count = count + excluded.count, total_bytes = total_bytes + excluded.total_bytes;
+        INSERT INTO stats_daily (day, count, total_bytes) VALUES ({day}, {sign}1, {size})
+        ON CONFLICT(day) DO UPDATE SET
+            count = count + excluded.count, total_bytes = total_bytes + excluded.total_bytes;
+        INSERT INTO stats_hourly (hour, count) VALUES ({hour}, {sign}1)
+        ON CONFLICT(hour) DO UPDATE SET count = count + excluded.count;
+        INSERT INTO stats_daily_categories (day, category, count) VALUES ({day}, {category}, {sign}1)
+        ON CONFLICT(day, category) DO UPDATE SET count = count + excluded.count;
+        INSERT INTO stats_daily_apps (day, app_name, count) VALUES ({day}, {app}, {sign}1)
+        ON CONFLICT(day, app_name) DO UPDATE SET count = count + excluded.count;
+    """
+
+
+# Recompute every rollup from scratch (also used after the tables are created)
+STATS_REBUILD = [
+    "DELETE FROM stats_totals",
+    "DELETE FROM stats_categories",
+    "DELETE FROM stats_apps",
+    "DELETE FROM stats_daily",
+    "DELETE FROM stats_hourly",
+    "DELETE FROM stats_daily_categories",
+    "DELETE FROM stats_daily_apps",
+    """
+    INSERT INTO stats_totals (id, screenshots, total_bytes, ocr_processed, categorized)
+    SELECT 1, COUNT(*), COALESCE(SUM(file_size), 0),
+           COALESCE(SUM(ocr_text IS NOT NULL AND ocr_text != ''), 0),
+           COALESCE(SUM(category IS NOT NULL AND category != 'Uncategorized'), 0)
+    FROM screenshots
+    """,
+    """
+    INSERT INTO stats_categories (category, count, total_bytes)
+    SELECT COALESCE(category, ''), COUNT(*), COALESCE(SUM(file_size), 0)
+    FROM screenshots GROUP BY 1
+    """,
+    """
+    INSERT INTO stats_apps (app_name, count, total_bytes)
+    SELECT COALESCE(app_name, ''), COUNT(*), COALESCE(SUM(file_size), 0)
+    FROM screenshots GROUP BY 1
+    """,
+    """
+    INSERT INTO stats_daily (day, count, total_bytes)
+    SELECT COALESCE(date(created_at, 'localtime'), ''), COUNT(*), COALESCE(SUM(file_size), 0)
+    FROM screenshots GROUP BY 1
+    """,
+    """
+    INSERT INTO stats_hourly (hour, count)
+    SELECT COALESCE(strftime('%H', created_at, 'localtime'), ''), COUNT(*)
+    FROM screenshots GROUP BY 1
+    """,
+    """
+    INSERT INTO stats_daily_categories (day, category, count)
+    SELECT COALESCE(date(created_at, 'localtime'), ''), COALESCE(category, ''), COUNT(*)
+    FROM screenshots GROUP BY 1, 2
+    """,
+    """
+    INSERT INTO stats_daily_apps (day, app_name, count)
+    SELECT COALESCE(date(created_at, 'localtime'), ''), COALESCE(app_name, ''), COUNT(*)
+    FROM screenshots GROUP BY 1, 2
+    """,
+]
+
+STATS_SCHEMA = STATS_TABLES + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS screenshots_stats_insert AFTER INSERT ON screenshots BEGIN
+        {_stats_delta('new', '+')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS screenshots_stats_delete AFTER DELETE ON screenshots BEGIN
+        {_stats_delta('old', '-')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS screenshots_stats_update
+    AFTER UPDATE OF file_size, category, app_name, created_at, ocr_text ON screenshots BEGIN
+        {_stats_delta('old', '-')}
+        {_stats_delta('new', '+')}
+    END
+    """,
+] + STATS_REBUILD
+
+# Rollups of databases created while days and hours were bucketed in UTC:
+# the triggers are recreated and the rollups recomputed
+STATS_LOCALTIME_SCHEMA = [
+    "DROP TRIGGER IF EXISTS screenshots_stats_insert",
+    "DROP TRIGGER IF EXISTS screenshots_stats_delete",
+    "DROP TRIGGER IF EXISTS screenshots_stats_update",
+] + STATS_SCHEMA
+
+# Ordered list of (version, steps). A step is a SQL statement or a callable
+# taking the connection. Append new migrations at the end.
+MIGRATIONS: List[Tuple[int, List[Union[str, Callable]]]] = [
+    (1, FTS_SCHEMA),
+    (2, MTIME_SCHEMA),
+    (3, NEAR_DUPLICATE_SCHEMA),
+    (4, STATS_SCHEMA),
+    (5, STATUS_SCHEMA),
+    (6, JOB_STAGE_SCHEMA),
+    (7, STATS_LOCALTIME_SCHEMA),
+]
+
+
+def _fts5_missing(error: OperationalError) -> bool:
+    return 'no such module: fts5' in str(error)
+
+
+# Migrations recorded as applied when they fail for the given reason, so
+# that later ones still run: without the FTS5 module, search falls back
+# to LIKE (see ``Database.has_fts``)
+SKIPPABLE_MIGRATIONS = {1: _fts5_missing}
+
+
+def apply_migrations(engine) -> int:
+    """Apply any migrations newer than the database's ``user_version``.
+
+    Each migration is committed in its own transaction, so one that fails
+    leaves the earlier ones applied.
+
+    Args:
+        engine: SQLAlchemy engine of the database
+
+    Returns:
+        The schema version after migrating
+
+    Raises:
+        OperationalError: If a migration failed (later ones are not applied)
+    """
+    with engine.connect() as connection:
+        current = connection.exec_driver_sql("PRAGMA user_version").scalar() or 0
+    for version, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            with engine.begin() as connection:
+                for statement in statements:
+                    if callable(statement):
+                        statement(connection)
+                    else:
+                        connection.exec_driver_sql(statement)
+                # PRAGMA does not accept bound parameters
+                connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+        except OperationalError as e:
+            skippable = SKIPPABLE_MIGRATIONS.get(version)
+            if skippable is None or not skippable(e):
+                raise
+            print(f"Warning: Skipping schema migration {version}: {e.orig}")
+            with engine.begin() as connection:
+                connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+        current = version
+    return current
+
+
+def has_table(connection, name: str) -> bool:
+    """Check whether a table (including virtual tables) exists."""
+    row = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).first()
+    return row is not None
@@ -0,0 +1,90 @@
+"""Append-only pack file holding every thumbnail."""
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from one process at a time only
+    fcntl = None
+
+
+def default_pack_path(db_path: str | Path) -> Path:
+    """Pack file stored next to the database, e.g. smartshot.thumbs."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.thumbs")
+
+
+class ThumbnailPack:
+    """Thumbnails concatenated into one file, located by (offset, length).
+
+    Thousands of tiny files waste disk blocks and inodes and make backups
+    and directory scans slow; one pack file is appended to sequentially
+    and read with a single memory mapping. The offsets are kept in the
+    database (``Database.store_thumbnails``), so a thumbnail only becomes
+    visible once its bytes are written, and bytes from a crashed append
+    are simply never referenced.
+    """
+
+    def __init__(self, path: str | Path):
+        """Open (or create) the pack file.
+
+        Args:
+            path: Path to the pack file
+        """
+        self.path = Path(path)
+        self.path.touch(exist_ok=True)
+        self._lock = threading.Lock()
+        self._map: Optional[mmap.mmap] = None
+
+    def append(self, blobs: List[bytes]) -> List[Tuple[int, int]]:
+        """Append blobs in one write, returning (offset, length) of each."""
+        data = b''.join(blobs)
+        with self._lock, open(self.path, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        locations = []
+        for blob in blobs:
+            locations.append((offset, len(blob)))
+            offset += len(blob)
+        return locations
+
+    def read(self, offset: int, length: int) -> memoryview:
+        """Return a thumbnail's bytes as a view into the mapped file (no copy)."""
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                self._remap()
+            if offset + length > len(self._map):
+                raise ValueError(f"Thumbnail at {offset}+{length} is past the end of {self.path}")
+            return memoryview(self._map)[offset:offset + length]
+
+    def size(self) -> int:
+        """Size of the pack file in bytes."""
+        return self.path.stat().st_size
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                try:
+                    self._map.close()
+                except BufferError:
+                    # Views handed out by read() are still alive; let GC unmap it
+                    pass
+                self._map = None
+
+    def _remap(self):
+        """Map the file again after it has grown."""
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # Older maps stay valid while views into them are alive
+            self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) if size else None
+        if self._map is None:
+            raise ValueError(f"{self.path} is empty")
@@ -0,0 +1,285 @@
+"""Memory-mapped store of screenshot embeddings with nearest-neighbour search."""
+import os
+import struct
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from one process at a time only
+    fcntl = None
+
+if TYPE_CHECKING:
+    from . import Database, Screenshot
+
+_MAGIC = b"SSVEC001"
+# magic, dimensions, model name (utf-8, NUL padded)
+_HEADER = struct.Struct("<8sI244s")
+
+# Records converted to float32 and scored per matrix product; bounds the
+# scratch memory of a search (32768 x 384 dims is 48 MB)
+SEARCH_CHUNK = 32768
+
+
+def default_vectors_path(db_path: str | Path) -> Path:
+    """Vector file stored next to the database, e.g. smartshot.vectors."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.vectors")
+
+
+class VectorIndex:
+    """Append-only file of (screenshot id, float16 vector) records.
+
+    The file is memory-mapped and searched by brute force: matrix products
+    over the unit-length vectors give every cosine similarity. Since BLAS
+    has no float16 product, the records are converted to float32 a block
+    of ``SEARCH_CHUNK`` at a time, so only the ids are held in memory
+    beyond the page cache. At 384 dimensions a record is 776 bytes, and an
+    exact scan of 100,000 screenshots takes about 150 ms on one core (most
+    of it the conversion), which makes an approximate index (IVF, HNSW)
+    not worth its recall loss.
+
+    Records are only ever appended, each batch with a single write under a
+    file lock, so the watcher and an index run can add vectors
+    concurrently. Re-embedding a screenshot appends a new record that
+    supersedes the old one; ``compact`` drops superseded and deleted
+    records.
+    """
+
+    def __init__(self, path: str | Path, dim: int, model: str):
+        """Open (or create) the vector file.
+
+        A file written by another model or with other dimensions is
+        replaced, since its vectors cannot be compared with new ones.
+
+        Args:
+            path: Path to the vector file
+            dim: Number of dimensions of the vectors
+            model: Name of the model the vectors come from
+        """
+        self.path = Path(path)
+        self.dim = dim
+        self.model = model
+        self.dtype = np.dtype([("id", "<i8"), ("vector", "<f2", (dim,))])
+        self._lock = threading.Lock()
+        self._file_key = None
+        self._count = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._live = np.zeros(0, dtype=np.int64)
+        if self.read_header(self.path) != (dim, model):
+            if self.path.exists():
+                print(f"Vector index {self.path} was built with another model; starting over")
+            self._write_file(np.zeros(0, dtype=self.dtype))
+
+    @staticmethod
+    def read_header(path: str | Path) -> Optional[Tuple[int, str]]:
+        """Return the (dimensions, model) a vector file was written with, or None."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read(_HEADER.size)
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, dim, model = _HEADER.unpack(data)
+        if magic != _MAGIC:
+            return None
+        return dim, model.rstrip(b"\0").decode("utf-8")
+
+    @classmethod
+    def open(cls, path: str | Path) -> "VectorIndex":
+        """Open an existing vector file for searching.
+
+        Raises:
+            FileNotFoundError: If there is no valid vector file at path
+        """
+        header = cls.read_header(path)
+        if header is None:
+            raise FileNotFoundError(f"No vector index at {path}")
+        return cls(path, *header)
+
+    def __len__(self) -> int:
+        return len(self._refresh()[2])
+
+    def add(self, ids: Iterable[int], vectors: "np.ndarray"):
+        """Append vectors (one row per id; normalized by the embedder)."""
+        records = np.zeros(len(vectors), dtype=self.dtype)
+        records["id"] = list(ids)
+        records["vector"] = vectors
+        if not len(records):
+            return
+        with open(self.path, "r+b") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Drop a torn record left by a crash mid-append, so records stay aligned
+                end = f.seek(0, os.SEEK_END)
+                f.seek(end - (end - _HEADER.size) % self.dtype.itemsize)
+                f.truncate()
+                f.write(records.tobytes())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def ids(self) -> Set[int]:
+        """Ids of the screenshots that have a vector."""
+        ids, _, live = self._refresh()
+        return set(ids[live].tolist())
+
+    def search(self, query: "np.ndarray", k: int = 20,
+               exclude: Optional[Set[int]] = None) -> List[Tuple[int, float]]:
+        """Find the vectors most similar to a query vector.
+
+        Args:
+            query: Unit-length query vector
+            k: Number of results
+            exclude: Ids to leave out (e.g. deleted screenshots)
+
+        Returns:
+            (id, cosine similarity) pairs, most similar first
+        """
+        ids, records, live = self._refresh()
+        if not len(live) or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        # Score every record (superseded ones are rare), then keep the live ones
+        scores = np.empty(len(records), dtype=np.float32)
+        for start in range(0, len(records), SEARCH_CHUNK):
+            block = records["vector"][start:start + SEARCH_CHUNK].astype(np.float32)
+            scores[start:start + len(block)] = block @ query
+        scores = scores[live]
+        ids = ids[live]
+        if exclude:
+            scores[np.isin(ids, list(exclude))] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > -np.inf]
+
+    def compact(self, keep: Optional[Set[int]] = None) -> int:
+        """Rewrite the file with only the newest vector of each screenshot.
+
+        Not safe while another process is appending.
+
+        Args:
+            keep: If given, also drop the vectors of ids not in this set
+
+        Returns:
+            Number of records removed
+        """
+        records = self._read_records()
+        kept = records[_latest(records["id"])]
+        if keep is not None:
+            kept = kept[np.isin(kept["id"], list(keep))]
+        removed = len(records) - len(kept)
+        if removed:
+            self._write_file(np.array(kept))
+        return removed
+
+    def _write_file(self, records: "np.ndarray"):
+        """Atomically replace the file with a header and the given records."""
+        header = _HEADER.pack(_MAGIC, self.dim, self.model.encode("utf-8")[:_HEADER.size - 12])
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header)
+            f.write(records.tobytes())
+        os.replace(tmp, self.path)
+
+    def _read_records(self) -> "np.ndarray":
+        """Memory-map the complete records in the file."""
+        count = max(0, (os.stat(self.path).st_size - _HEADER.size) // self.dtype.itemsize)
+        if not count:
+            return np.zeros(0, dtype=self.dtype)
+        # A torn trailing record is left out (and dropped by the next add)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=_HEADER.size, shape=(count,))
+
+    def _refresh(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Map the file, reading the ids of records appended since the last call.
+
+        Returns:
+            (ids, memory-mapped records, indexes of the live records)
+        """
+        with self._lock:
+            st = os.stat(self.path)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            records = self._read_records()
+            if key == self._file_key:
+                return self._ids[:self._count], records[:self._count], self._live
+            if self._file_key and (st.st_ino != self._file_key[0] or len(records) < self._count):
+                # Replaced (by compact or a model change): read it all again
+                self._count = 0
+            new = records[self._count:]
+            if self._count + len(new) > len(self._ids):
+                self._ids = np.resize(self._ids, max(1024, 2 * (self._count + len(new))))
+            end = self._count + len(new)
+            self._ids[self._count:end] = new["id"]
+            self._count = end
+            self._live = _latest(self._ids[:end])
+            self._file_key = key
+            return self._ids[:end], records[:end], self._live
+
+def semantic_search(db: "Database", index: VectorIndex, query: "np.ndarray", limit: int = 20,
+                    category: Optional[str] = None, app_name: Optional[str] = None,
+                    min_date: Optional[datetime] = None) -> List[Tuple["Screenshot", float]]:
+    """Find the screenshots whose text is closest in meaning to a query.
+
+    Filters are applied to the nearest neighbours, fetching more of them
+    until enough pass or the index is exhausted. Vectors of screenshots
+    that were deleted from the database are skipped.
+
+    Args:
+        db: Database the vectors belong to
+        index: Vector index
+        query: Embedding of the query text
+        limit: Maximum number of results
+        category: Only screenshots in this category
+        app_name: Only screenshots from this application
+        min_date: Only screenshots created after this time
+
+    Returns:
+        (screenshot, similarity) pairs, most similar first
+    """
+    filtered = category or app_name or min_date
+    k = limit * 4 if filtered else limit + 8
+    while True:
+        hits = index.search(query, k)
+        scores = dict(hits)
+        matches = []
+        for screenshot in db.get_screenshots([row_id for row_id, _ in hits]):
+            if category and screenshot.category != category:
+                continue
+            if app_name and screenshot.app_name != app_name:
+                continue
+            if min_date and screenshot.created_at < min_date:
+                continue
+            matches.append((screenshot, scores[screenshot.id]))
+        if len(matches) >= limit or len(hits) < k:
+            return matches[:limit]
+        k *= 4
+
+
+def match_to_dict(screenshot: "Screenshot", score: float, preview_chars: int = 120) -> dict:
+    """JSON-serializable form of a ``semantic_search`` match."""
+    return {
+        'id': screenshot.id,
+        'file_path': screenshot.file_path,
+        'file_name': screenshot.file_name,
+        'category': screenshot.category,
+        'app_name': screenshot.app_name,
+        'window_title': screenshot.window_title,
+        'created_at': screenshot.created_at.strftime('%Y-%m-%d %H:%M:%S') if screenshot.created_at else None,
+        'snippet': (screenshot.ocr_text or '')[:preview_chars],
+        'score': round(score, 4),
+    }
+
+
+def _latest(ids: "np.ndarray") -> "np.ndarray":
+    """Indexes of the last occurrence of each id, in file order."""
+    if not len(ids):
+        return np.zeros(0, dtype=np.int64)
+    _, last = np.unique(ids[::-1], return_index=True)
+    return np.sort(len(ids) - 1 - last)
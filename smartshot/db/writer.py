@@ -0,0 +1,174 @@
+"""Background writer that groups database writes into batched transactions."""
+import threading
+from concurrent.futures import Future, wait
+from typing import Dict, List, Tuple
+
+from smartshot.utils.batching import MicroBatcher
+from smartshot.utils.metrics import METRICS
+
+# Kinds of queued writes
+SCREENSHOT = 'screenshot'
+FILE_HASH = 'file_hash'
+THUMBNAIL = 'thumbnail'
+OCR_LINES = 'ocr_lines'
+EVENT = 'event'
+UPDATE = 'update'
+JOB = 'job'
+
+
+class DatabaseWriter:
+    """Writes rows on a dedicated thread, one transaction per batch.
+
+    Rows submitted within ``max_delay`` seconds of each other (up to
+    ``max_batch`` rows) are committed together, so a burst of screenshots
+    costs one fsync instead of one per row, and readers are blocked for
+    one short transaction instead of many.
+    """
+
+    def __init__(self, db, max_batch: int = 100, max_delay: float = 0.25):
+        """Initialize the writer.
+
+        Args:
+            db: Database to write to
+            max_batch: Maximum rows per transaction
+            max_delay: Longest time (seconds) a row waits for its batch to fill up
+        """
+        self.db = db
+        self._batcher = MicroBatcher(self._write, max_batch=max_batch, max_wait=max_delay,
+                                     name="smartshot-db-writer")
+        self._last: Future = None
+        self._lock = threading.Lock()
+
+    def add_screenshot(self, row: dict) -> Future:
+        """Queue a screenshot row (see ``Database.add_screenshots_bulk``).
+
+        Returns:
+            Future resolving to the screenshot id
+        """
+        return self._submit((SCREENSHOT, row))
+
+    def store_file_hash(self, row: dict) -> Future:
+        """Queue a cached digest row (see ``Database.store_file_hashes``)."""
+        return self._submit((FILE_HASH, row))
+
+    def store_thumbnail(self, row: dict) -> Future:
+        """Queue a thumbnail location row (see ``Database.store_thumbnails``)."""
+        return self._submit((THUMBNAIL, row))
+
+    def store_ocr_lines(self, row: dict) -> Future:
+        """Queue an OCR lines row (see ``Database.store_ocr_lines``)."""
+        return self._submit((OCR_LINES, row))
+
+    def add_event(self, row: dict) -> Future:
+        """Queue a change log event (see ``Database.add_events``).
+
+        Queued after a screenshot's row, an event with its file_path gets
+        its id.
+        """
+        return self._submit((EVENT, row))
+
+    def update_screenshot(self, row: dict) -> Future:
+        """Queue changes to a stored screenshot (see ``Database.update_screenshots``).
+
+        Returns:
+            Future resolving to the screenshot id
+        """
+        return self._submit((UPDATE, row))
+
+    def store_job(self, row: dict) -> Future:
+        """Queue a job row (see ``Database.store_jobs``).
+
+        Queued after a screenshot's row, a job with its file_path gets its id.
+        """
+        return self._submit((JOB, row))
+
+    def _submit(self, item) -> Future:
+        with self._lock:
+            self._last = self._batcher.submit(item)
+            return self._last
+
+    def flush(self, timeout: float = None):
+        """Block until every row queued so far has been written (or has failed)."""
+        with self._lock:
+            last = self._last
+        # Batches are written in submission order
+        if last is not None:
+            wait([last], timeout=timeout)
+
+    def close(self, wait: bool = True):
+        """Write everything still queued and stop the writer thread."""
+        self._batcher.close(wait=wait)
+
+    def _write(self, items: List[Tuple[str, dict]]) -> List:
+        """Write one batch (runs on the writer thread)."""
+        screenshots = [row for kind, row in items if kind == SCREENSHOT]
+        file_hashes = [row for kind, row in items if kind == FILE_HASH]
+        thumbnails = [row for kind, row in items if kind == THUMBNAIL]
+        ocr_lines = [row for kind, row in items if kind == OCR_LINES]
+        events = [row for kind, row in items if kind == EVENT]
+        updates = [row for kind, row in items if kind == UPDATE]
+        jobs = [row for kind, row in items if kind == JOB]
+        with METRICS.time('db_commit'):
+            ids = self._write_rows(screenshots, file_hashes, thumbnails, ocr_lines, events,
+                                   updates, jobs)
+        results = []
+        for kind, row in items:
+            if kind == SCREENSHOT:
+                results.append(ids.get(str(row['file_path'])))
+            elif kind == UPDATE:
+                # None if the update of a row with a new path failed
+                results.append(ids.get(str(row['file_path'])) if 'file_path' in row else row['id'])
+            else:
+                results.append(None)
+        return results
+
+    def _write_rows(self, screenshots: List[dict], file_hashes: List[dict],
+                    thumbnails: List[dict], ocr_lines: List[dict],
+                    events: List[dict], updates: List[dict], jobs: List[dict]) -> Dict[str, int]:
+        try:
+            return self.db.write_batch(screenshots, file_hashes, thumbnails, ocr_lines, events,
+                                       updates, jobs)
+        except Exception as e:
+            if len(screenshots) + len(file_hashes) + len(thumbnails) + len(ocr_lines) \
+                    + len(events) + len(updates) + len(jobs) <= 1:
+                raise
+            # Rows in a batch may have different columns, or one may be bad:
+            # retry them one at a time so the others are still written
+            print(f"Batched write failed, retrying rows individually: {e}")
+        ids = {}
+        for row in screenshots:
+            try:
+                ids.update(self.db.write_batch([row]))
+            except Exception as e:
+                print(f"Database save failed for {row['file_path']}: {e}")
+        for row in updates:
+            try:
+                ids.update(self.db.write_batch(updates=[row]))
+            except Exception as e:
+                print(f"Database update failed for screenshot {row['id']}: {e}")
+        for row in jobs:
+            try:
+                self.db.write_batch(jobs=[row])
+            except Exception as e:
+                print(f"Could not store job of {row.get('file_path') or row.get('screenshot_id')}: {e}")
+        for row in file_hashes:
+            try:
+                self.db.write_batch(file_hashes=[row])
+            except Exception as e:
+                print(f"Could not cache digest of {row['file_path']}: {e}")
+        for row in thumbnails:
+            try:
+                self.db.write_batch(thumbnails=[row])
+            except Exception as e:
+                print(f"Could not record thumbnail of {row['file_hash']}: {e}")
+        for row in ocr_lines:
+            try:
+                self.db.write_batch(ocr_lines=[row])
+            except Exception as e:
+                print(f"Could not store OCR lines of {row['file_hash']}: {e}")
+        for row in events:
+            try:
+                self.db.write_batch(events=[row])
+            except Exception as e:
+                print(f"Could not log event {row['type']}: {e}")
+        return ids
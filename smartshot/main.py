@@ -2,39 +2,58 @@
 """
 SmartShot - A tool to watch for and organize screenshots.
 """
-import os
-import signal
-import sys
-import time
-from pathlib import Path
+import importlib
+from typing import Dict, List, Optional, Tuple
 
 import click
-from dotenv import load_dotenv
 
-from smartshot.watcher import ScreenshotWatcher
-from smartshot.utils import get_default_watch_path
-from smartshot.cli.search import cli as search_cli
+# Subcommand name -> ("module:attribute", short help). Each module is
+# imported only when its command runs, so e.g. `smartshot version` does not
+# load the watcher, OCR or the database; the short help is repeated here so
+# `smartshot --help` does not import them either. Keep imports at the top
+# of this file to a minimum (see benchmarks/import_time.py).
+LAZY_COMMANDS: Dict[str, Tuple[str, str]] = {
+    'start': ('smartshot.cli.watch:start', 'Start watching for new screenshots.'),
+    'stop': ('smartshot.cli.control:stop', 'Stop the running watcher.'),
+    'status': ('smartshot.cli.control:status', 'Show the state of the running watcher.'),
+    'reload-categories': ('smartshot.cli.control:reload_categories',
+                          'Make the running watcher re-read its categories file.'),
+    'search': ('smartshot.cli.search:cli', 'Search and manage screenshots in the database.'),
+    'index': ('smartshot.cli.index:index', 'Index screenshots that already exist under PATH.'),
+    'thumbnails': ('smartshot.cli.thumbnails:thumbnails',
+                   'Build missing thumbnails for stored screenshots.'),
+}
 
-# Load environment variables from .env file if it exists
-load_dotenv()
 
-# Global watcher instance
-watcher = None
+class LazyGroup(click.Group):
+    """Click group that imports subcommands from ``LAZY_COMMANDS`` on demand."""
 
-def signal_handler(sig, frame):
-    """Handle interrupt signals."""
-    global watcher
-    if watcher:
-        print("\nStopping watcher...")
-        watcher.stop()
-        watcher.join()
-    sys.exit(0)
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(set(super().list_commands(ctx)) | set(LAZY_COMMANDS))
 
-@click.group()
+    def get_command(self, ctx: click.Context, name: str) -> Optional[click.Command]:
+        if name in LAZY_COMMANDS and name not in self.commands:
+            module, attribute = LAZY_COMMANDS[name][0].split(':')
+            self.add_command(getattr(importlib.import_module(module), attribute), name)
+        return super().get_command(ctx, name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                rows.append((name, self.commands[name].get_short_help_str()))
+            else:
+                rows.append((name, LAZY_COMMANDS[name][1]))
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
+
+
+@click.group(cls=LazyGroup)
 def cli():
     """SmartShot - A tool to watch for and organize screenshots."""
-    # Add version info
-    pass
+    from dotenv import load_dotenv
+    # Load environment variables from .env file if it exists
+    load_dotenv()
 
 @cli.command()
 def version():
@@ -42,61 +61,5 @@ def version():
     from smartshot import __version__
     click.echo(f"SmartShot v{__version__}")
 
-@cli.command()
-@click.option('--path', '-p', 'watch_path',
-              default=None,
-              help='Path to watch for screenshots (default: ~/Pictures/Screenshots)')
-@click.option('--no-ocr', is_flag=True, help='Disable OCR processing')
-@click.option('--no-rename', is_flag=True, help='Disable automatic file renaming')
-@click.option('--no-categorize', is_flag=True, help='Disable automatic categorization')
-@click.option('--db', default='smartshot.db', help='Database file path')
-def start(watch_path, no_ocr, no_rename, no_categorize, db):
-    """Start watching for new screenshots."""
-    global watcher
-    
-    # Use provided path or default
-    watch_path = Path(watch_path) if watch_path else get_default_watch_path()
-    
-    from smartshot import __version__
-    print(f"SmartShot v{__version__}")
-    print(f"Watching directory: {watch_path}")
-    print(f"OCR: {'Disabled' if no_ocr else 'Enabled'}")
-    print(f"Auto-rename: {'Disabled' if no_rename else 'Enabled'}")
-    print(f"Auto-categorize: {'Disabled' if no_categorize else 'Enabled'}")
-    print(f"Database: {db}")
-    print("Press Ctrl+C to stop")
-    
-    # Set up signal handler for clean exit
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-    
-    try:
-        watcher = ScreenshotWatcher(
-            watch_path, 
-            enable_ocr=not no_ocr,
-            enable_rename=not no_rename,
-            enable_categorize=not no_categorize,
-            db_path=db
-        )
-        watcher.start()
-        
-        # Keep the main thread alive
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        signal_handler(None, None)
-    except Exception as e:
-        print(f"Error: {e}", file=sys.stderr)
-        sys.exit(1)
-
-@cli.command()
-def stop():
-    """Stop any running watcher (not implemented in this version)."""
-    print("The watcher can be stopped by pressing Ctrl+C when running in the terminal.")
-    print("This command is a placeholder for future implementation.")
-
-# Add search commands
-cli.add_command(search_cli, name='search')
-
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,104 @@
+"""Micro-batching of calls to a batch-capable function."""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+# Sentinel telling the batching thread to exit
+_STOP = object()
+
+
+class MicroBatcher:
+    """Groups items submitted from many threads into batches.
+
+    A single background thread takes the first pending item, then keeps
+    collecting items until ``max_batch`` are pending or ``max_wait``
+    seconds have passed, and calls ``fn`` once with the whole batch.
+    Model inference is much cheaper per item in a batch than one at a
+    time, and the short wait only adds latency when work is arriving
+    anyway.
+    """
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 8,
+                 max_wait: float = 0.05, name: str = "smartshot-batcher"):
+        """Initialize the batcher.
+
+        Args:
+            fn: Function taking a list of items and returning one result per item
+            max_batch: Maximum number of items per call to ``fn``
+            max_wait: Longest time (seconds) to wait for a batch to fill up
+            name: Name of the batching thread
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item, returning a future for its result."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Process one item, blocking until its batch has run."""
+        return self.submit(item).result(timeout)
+
+    def close(self, wait: bool = True):
+        """Stop the batching thread after the pending items are processed."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            if wait:
+                thread.join()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    entry = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"batch function returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -1,9 +1,15 @@
 """Categorization utilities for organizing screenshots."""
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 import re
 import json
 
+from smartshot.utils.result_cache import config_version
+
+# OCR lines read with at least this confidence count fully; a keyword seen
+# only in less certain lines counts in proportion (see ``categorize``)
+FULL_WEIGHT_CONFIDENCE = 0.8
+
 # Default categories and their associated keywords
 DEFAULT_CATEGORIES = {
     "Code": [
@@ -33,7 +39,12 @@ DEFAULT_CATEGORIES = {
 }
 
 class ScreenshotCategorizer:
-    """Categorizes screenshots based on content, context, and file patterns."""
+    """Categorizes screenshots based on content, context, and file patterns.
+    
+    All category keywords, including multi-word phrases, are compiled into
+    a single regular expression when the categorizer is created, so every
+    category is scored in one pass over the text.
+    """
     
     def __init__(self, config_path: Optional[Path] = None):
         """Initialize the categorizer with optional custom categories.
@@ -43,6 +54,7 @@ class ScreenshotCategorizer:
         """
         self.categories = self._load_categories(config_path) if config_path else DEFAULT_CATEGORIES
         self.category_paths = {}
+        self._compile()
     
     def _load_categories(self, config_path: Path) -> Dict[str, List[str]]:
         """Load categories from a JSON configuration file.
@@ -60,21 +72,74 @@ class ScreenshotCategorizer:
             print(f"Warning: Could not load categories from {config_path}: {e}")
             return DEFAULT_CATEGORIES
     
-    def _get_text_features(self, text: str) -> Dict[str, int]:
-        """Extract features from text for categorization.
+    @property
+    def version(self) -> str:
+        """Fingerprint of the category configuration, for the result cache."""
+        return config_version('categorize', self.categories, FULL_WEIGHT_CONFIDENCE)
+    
+    def _compile(self):
+        """Build the keyword matcher for the current categories."""
+        # Keyword -> categories listing it (a keyword may belong to several)
+        self._keyword_categories: Dict[str, List[str]] = {}
+        self._keyword_counts: Dict[str, int] = {}
+        for category, keywords in self.categories.items():
+            unique = {self._normalize(kw) for kw in keywords} - {''}
+            self._keyword_counts[category] = len(unique)
+            for kw in unique:
+                self._keyword_categories.setdefault(kw, []).append(category)
+        
+        if not self._keyword_categories:
+            self._pattern = None
+            return
+        # Longest keywords first so a phrase wins over a keyword it starts with.
+        # Keywords only match whole words; spaces in phrases match any
+        # whitespace, since OCR may break a phrase across lines.
+        alternatives = '|'.join(
+            r'\s+'.join(re.escape(part) for part in kw.split(' '))
+            for kw in sorted(self._keyword_categories, key=len, reverse=True)
+        )
+        # The lookahead makes matches zero-width, so a keyword inside a
+        # matched phrase is still found at its own position
+        self._pattern = re.compile(rf'(?<!\w)(?=({alternatives})(?!\w))', re.IGNORECASE)
+    
+    @staticmethod
+    def _normalize(keyword: str) -> str:
+        return ' '.join(keyword.lower().split())
+    
+    def _find_keywords(self, text: str) -> Set[str]:
+        """Find the distinct keywords that occur in the text.
         
         Args:
-            text: Input text to analyze
+            text: Text to scan
             
         Returns:
-            Dictionary of feature counts
+            Set of matched keywords (normalized)
         """
-        if not text:
-            return {}
+        if not text or self._pattern is None:
+            return set()
+        return {self._normalize(kw) for kw in set(self._pattern.findall(text))}
+    
+    def _score(self, text: str, weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """Score every category against the text in one pass.
+        
+        Args:
+            text: Text to analyze
+            weights: Weight (0.0 to 1.0) of keywords that should count less
+                than a full match; other keywords count 1
             
-        # Convert to lowercase and split into words
-        words = re.findall(r'\b\w+\b', text.lower())
-        return {word: words.count(word) for word in set(words)}
+        Returns:
+            Dictionary of category to match score (0.0 to 1.0): the fraction
+            of the category's keywords found in the text
+        """
+        weights = weights or {}
+        matches = dict.fromkeys(self.categories, 0.0)
+        for kw in self._find_keywords(text):
+            for category in self._keyword_categories.get(kw, ()):
+                matches[category] += weights.get(kw, 1.0)
+        return {
+            category: count / max(1, self._keyword_counts[category])
+            for category, count in matches.items()
+        }
     
     def _calculate_match_score(self, text: str, category: str) -> float:
         """Calculate how well the text matches a category.
@@ -88,21 +153,14 @@ class ScreenshotCategorizer:
         """
         if not text or category not in self.categories:
             return 0.0
-            
-        features = self._get_text_features(text)
-        category_keywords = [kw.lower() for kw in self.categories[category]]
-        
-        # Count matches with category keywords
-        matches = sum(1 for kw in category_keywords if kw in features)
-        
-        # Normalize score by number of keywords
-        return matches / max(1, len(category_keywords))
+        return self._score(text)[category]
     
     def categorize(self, 
                   text: str, 
                   app_name: str = "", 
                   window_title: str = "",
-                  min_confidence: float = 0.3) -> Tuple[str, float]:
+                  min_confidence: float = 0.3,
+                  lines: Optional[Sequence[Tuple[str, float]]] = None) -> Tuple[str, float]:
         """Categorize content based on text, app name, and window title.
         
         Args:
@@ -110,17 +168,17 @@ class ScreenshotCategorizer:
             app_name: Name of the application
             window_title: Window title
             min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            lines: The OCR text as (line, OCR confidence 0.0 to 1.0) pairs.
+                A keyword only found in lines read with less than
+                ``FULL_WEIGHT_CONFIDENCE`` counts as a partial match.
             
         Returns:
             Tuple of (category_name, confidence_score)
         """
-        combined_text = f"{app_name} {window_title} {text}".lower()
+        combined_text = f"{app_name or ''} {window_title or ''} {text or ''}"
         
         # Calculate scores for each category
-        scores = {
-            category: self._calculate_match_score(combined_text, category)
-            for category in self.categories
-        }
+        scores = self._score(combined_text, self._keyword_weights(lines, app_name, window_title))
         
         # Get the best matching category
         if not scores:
@@ -134,6 +192,47 @@ class ScreenshotCategorizer:
             
         return best_category
     
+    def _keyword_weights(self, lines: Optional[Sequence[Tuple[str, float]]],
+                         app_name: str, window_title: str) -> Dict[str, float]:
+        """Weights of keywords that were only read with low OCR confidence."""
+        if not lines:
+            return {}
+        best: Dict[str, float] = {}
+        for line, confidence in lines:
+            for kw in self._find_keywords(line):
+                best[kw] = max(best.get(kw, 0.0), confidence)
+        # Keywords from the window context are certain
+        for kw in self._find_keywords(f"{app_name or ''} {window_title or ''}"):
+            best.pop(kw, None)
+        # Phrases broken across lines are not in ``best`` and count fully
+        return {kw: min(1.0, conf / FULL_WEIGHT_CONFIDENCE)
+                for kw, conf in best.items() if conf < FULL_WEIGHT_CONFIDENCE}
+    
+    def categorize_batch(self,
+                         items: Iterable[Union[str, Tuple[str, str, str]]],
+                         min_confidence: float = 0.3) -> List[Tuple[str, float]]:
+        """Categorize many screenshots, e.g. during a backfill.
+        
+        Args:
+            items: OCR texts, or (text, app_name, window_title) tuples,
+                optionally followed by the (text, confidence) OCR lines
+            min_confidence: Minimum confidence threshold (0.0 to 1.0)
+            
+        Returns:
+            (category_name, confidence_score) for each item, in order
+        """
+        results = []
+        for item in items:
+            if isinstance(item, str) or item is None:
+                results.append(self.categorize(item or '', min_confidence=min_confidence))
+            else:
+                text, app_name, window_title, *lines = item
+                results.append(self.categorize(
+                    text, app_name=app_name, window_title=window_title,
+                    min_confidence=min_confidence, lines=lines[0] if lines else None
+                ))
+        return results
+    
     def get_category_path(self, base_dir: Path, category: str) -> Path:
         """Get the full path for a category directory, creating it if needed.
         
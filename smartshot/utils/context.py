@@ -1,15 +1,24 @@
 """Utilities for getting window and application context."""
-import psutil
-try:
-    import pygetwindow as gw
-    HAS_PYGETWINDOW = True
-except ImportError:
-    HAS_PYGETWINDOW = False
-    print("Warning: pygetwindow not available. Window context will be limited.")
-
+from functools import lru_cache
 from typing import Dict, Optional
+import importlib.util
 import platform
 
+# pygetwindow and psutil are only needed by the watcher, so they are
+# imported on first use rather than when the CLI starts
+HAS_PYGETWINDOW = importlib.util.find_spec("pygetwindow") is not None
+
+
+@lru_cache(maxsize=None)
+def _window_api():
+    """Import pygetwindow once, warning if it cannot be used."""
+    try:
+        import pygetwindow
+        return pygetwindow
+    except (ImportError, NotImplementedError):
+        print("Warning: pygetwindow not available. Window context will be limited.")
+        return None
+
 def get_active_window_info() -> Dict[str, str]:
     """Get information about the currently active window.
     
@@ -17,8 +26,10 @@ def get_active_window_info() -> Dict[str, str]:
         Dictionary containing window title and application name
     """
     try:
-        if not HAS_PYGETWINDOW:
+        gw = _window_api()
+        if gw is None:
             return {"title": "Unknown (pygetwindow not available)", "app": "Unknown"}
+        import psutil
             
         active_window = gw.getActiveWindow()
         if not active_window:
@@ -0,0 +1,231 @@
+"""Local control socket of a running watcher.
+
+The watcher listens on a socket next to its database (smartshot.sock).
+Clients send one JSON object per line, ``{"command": ..., "args": {...}}``,
+and get one JSON line back, ``{"ok": true, "result": ...}`` or
+``{"ok": false, "error": ..., "invalid": ...}``, where ``invalid`` marks
+arguments the watcher rejected (raised as ``InvalidRequest``).
+``smartshot stop``, ``status``, ``reload-categories`` and searches use it
+to reach the running process with its models, caches and database
+connection already loaded, instead of starting a fresh one.
+
+Where Unix sockets are unavailable (or the path is too long for one), the
+server listens on a localhost TCP port and writes ``tcp:<port>`` to the
+socket path instead. This module only uses the standard library so that
+clients start quickly.
+"""
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Longest path accepted for a Unix socket (the OS limit is 104-108 bytes)
+MAX_UNIX_PATH = 100
+
+# Seconds a client waits for a reply; searches on a busy watcher can be slow
+DEFAULT_TIMEOUT = 10.0
+
+# Largest request or reply line accepted
+MAX_LINE = 16 * 2**20
+
+
+class ControlError(Exception):
+    """A request to the watcher failed, or the watcher reported an error."""
+
+
+class NotRunning(ControlError):
+    """No watcher is listening on the control socket."""
+
+
+class NoReply(ControlError):
+    """The watcher did not answer in time, or dropped the connection."""
+
+
+class InvalidRequest(ControlError):
+    """The watcher rejected the arguments of a request (e.g. a bad cursor)."""
+
+
+def default_socket_path(db_path: str | Path) -> Path:
+    """Control socket next to the database, e.g. smartshot.sock."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.sock")
+
+
+def default_pid_path(db_path: str | Path) -> Path:
+    """PID file of the watcher next to the database, e.g. smartshot.pid."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.pid")
+
+
+def read_pid(path: str | Path) -> Optional[int]:
+    """PID in a PID file, or None if there is none or it is unreadable."""
+    try:
+        return int(Path(path).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _connect(path: Path, timeout: float) -> socket.socket:
+    try:
+        mode = path.stat().st_mode
+    except OSError:
+        raise NotRunning(f"No watcher is running (no control socket at {path})")
+    try:
+        if stat.S_ISSOCK(mode):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+        else:
+            address = path.read_text().strip()
+            if not address.startswith('tcp:') or not address[4:].isdigit():
+                raise NotRunning(f"Not a control socket: {path}")
+            sock = socket.create_connection(('127.0.0.1', int(address[4:])), timeout=timeout)
+    except (ConnectionRefusedError, FileNotFoundError) as e:
+        # Left behind by a watcher that did not exit cleanly
+        raise NotRunning(f"No watcher is running ({path} is stale: {e})")
+    except TimeoutError:
+        raise NoReply(f"The watcher did not accept a connection within {timeout:g}s")
+    except OSError as e:
+        raise ControlError(f"Cannot connect to the watcher at {path}: {e}")
+    return sock
+
+
+def request(path: str | Path, command: str, timeout: float = DEFAULT_TIMEOUT, **args) -> Any:
+    """Send one command to the running watcher and return its result.
+
+    Args:
+        path: Control socket path (see ``default_socket_path``)
+        command: Command name, e.g. "status"
+        timeout: Seconds to wait for the reply
+        **args: Arguments of the command (JSON-serializable)
+
+    Returns:
+        The command's result
+
+    Raises:
+        NotRunning: If no watcher is listening
+        NoReply: If the watcher did not answer within timeout or dropped
+            the connection
+        InvalidRequest: If the watcher rejected the command's arguments
+        ControlError: If the command failed in the watcher, or its reply
+            could not be read
+    """
+    with _connect(Path(path), timeout) as sock:
+        try:
+            sock.sendall(json.dumps({'command': command, 'args': args}).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as reply:
+                line = reply.readline(MAX_LINE)
+        except TimeoutError:
+            raise NoReply(f"The watcher did not answer {command} within {timeout:g}s")
+        except (ConnectionResetError, BrokenPipeError) as e:
+            raise NoReply(f"The watcher dropped the connection during {command}: {e}")
+        except OSError as e:
+            raise ControlError(f"{command} failed: {e}")
+    if not line:
+        raise NoReply(f"The watcher closed the connection during {command}")
+    try:
+        response = json.loads(line)
+    except ValueError as e:
+        raise ControlError(f"Unreadable reply to {command}: {e}")
+    if not isinstance(response, dict):
+        raise ControlError(f"Unreadable reply to {command}")
+    if not response.get('ok'):
+        error = response.get('error') or f"{command} failed"
+        raise InvalidRequest(error) if response.get('invalid') else ControlError(error)
+    return response.get('result')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answers JSON-line requests until the client disconnects."""
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline(MAX_LINE)
+            if not line:
+                return
+            try:
+                message = json.loads(line)
+                handler = self.server.commands.get(message.get('command'))
+                if handler is None:
+                    raise ControlError(f"Unknown command: {message.get('command')}")
+                response = {'ok': True, 'result': handler(**(message.get('args') or {}))}
+            except Exception as e:
+                # ValueError is how the database rejects arguments (cursor,
+                # fields, count); clients report it as the user's mistake
+                response = {'ok': False, 'error': str(e), 'invalid': isinstance(e, ValueError)}
+            # default=str covers datetimes and paths in results
+            self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ControlServer:
+    """Serves commands on the control socket from a background thread.
+
+    Each connection gets its own thread, so a slow search does not hold up
+    ``status`` or ``stop``.
+    """
+
+    def __init__(self, path: str | Path, commands: Dict[str, Callable[..., Any]]):
+        """Initialize the server without listening yet.
+
+        Args:
+            path: Control socket path (see ``default_socket_path``)
+            commands: Command name -> function called with the request's
+                args, returning a JSON-serializable result
+        """
+        self.path = Path(path).absolute()
+        self.commands = commands
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start listening.
+
+        Raises:
+            ControlError: If another watcher is already listening on the path
+        """
+        try:
+            request(self.path, 'ping', timeout=2.0)
+        except NotRunning:
+            pass
+        except ControlError as e:
+            # Nothing answering a ping (e.g. a hung process, or a file that
+            # is not a socket); it is replaced below
+            print(f"Replacing control socket {self.path}: {e}")
+        else:
+            raise ControlError(f"A watcher is already running (control socket {self.path})")
+        self.path.unlink(missing_ok=True)
+
+        if hasattr(socket, 'AF_UNIX') and len(str(self.path)) <= MAX_UNIX_PATH:
+            self._server = _UnixServer(str(self.path), _RequestHandler)
+            # Only the user running the watcher may control it
+            os.chmod(self.path, 0o600)
+        else:
+            self._server = _TCPServer(('127.0.0.1', 0), _RequestHandler)
+            self.path.write_text(f"tcp:{self._server.server_address[1]}")
+        self._server.commands = self.commands
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="smartshot-control", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Stop listening and remove the socket."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        self.path.unlink(missing_ok=True)
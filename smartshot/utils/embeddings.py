@@ -0,0 +1,115 @@
+"""Sentence embeddings of screenshot text for semantic search."""
+from typing import List, Optional, Sequence
+import gc
+import importlib.util
+import threading
+
+from smartshot.utils.batching import MicroBatcher
+from smartshot.utils.result_cache import config_version
+
+# sentence-transformers pulls in torch (and numpy), so only check that they
+# are installed here; they are imported when the model is first loaded
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+HAS_SENTENCE_TRANSFORMERS = HAS_NUMPY and importlib.util.find_spec("sentence_transformers") is not None
+
+# Small (22M parameters, 384 dimensions) and fast enough on CPU to embed
+# every screenshot as it arrives
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# The model only reads the first 256 tokens; don't tokenize pages of OCR text
+MAX_TEXT_CHARS = 2000
+
+
+def embedding_text(ocr_text: Optional[str], window_title: Optional[str] = None,
+                   file_name: Optional[str] = None) -> str:
+    """Text a screenshot is embedded from: its window title followed by its OCR text.
+
+    The file name stands in for the title when there is none, so screenshots
+    without any text still get a (weak) vector.
+    """
+    parts = [window_title or file_name or "", " ".join((ocr_text or "").split())]
+    return "\n".join(p for p in parts if p)[:MAX_TEXT_CHARS]
+
+
+class Embedder:
+    """Sentence-embedding model on CPU, loaded on first use.
+
+    ``embed`` returns L2-normalized float32 vectors, so the dot product of
+    two vectors is their cosine similarity. ``submit`` groups texts from
+    several threads into micro-batches like the summarizer does.
+    """
+
+    def __init__(self, model: str = DEFAULT_MODEL, batch_size: int = 32,
+                 max_wait: float = 0.05):
+        """Initialize the embedder without loading the model.
+
+        Args:
+            model: sentence-transformers model id or local path
+            batch_size: Maximum texts per model call
+            max_wait: Longest time (seconds) ``submit`` waits for more texts to batch
+        """
+        if not HAS_SENTENCE_TRANSFORMERS:
+            raise RuntimeError("Semantic search needs numpy and sentence-transformers: "
+                               "pip install sentence-transformers")
+        self.model = model
+        self.batch_size = batch_size
+        self._model = None
+        self._lock = threading.Lock()
+        self._batcher = MicroBatcher(self._embed_items, max_batch=batch_size, max_wait=max_wait,
+                                     name="smartshot-embedder")
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def dim(self) -> int:
+        """Number of dimensions of the vectors."""
+        self.load()
+        return self._model.get_sentence_embedding_dimension()
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the model, for invalidating stored vectors."""
+        return config_version("embedding", self.model)
+
+    def load(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model, device="cpu")
+
+    def unload(self):
+        with self._lock:
+            self._model = None
+        gc.collect()
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """Embed several texts in one model call.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 array of shape (len(texts), dim) with unit-length rows
+        """
+        import numpy as np
+        self.load()
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vectors = self._model.encode(list(texts), batch_size=self.batch_size,
+                                     convert_to_numpy=True, normalize_embeddings=True,
+                                     show_progress_bar=False)
+        return vectors.astype(np.float32, copy=False)
+
+    def submit(self, text: str):
+        """Queue one text for the next micro-batch, returning a future of its vector."""
+        return self._batcher.submit(text)
+
+    def close(self):
+        self._batcher.close()
+        self.unload()
+
+    def _embed_items(self, texts: List[str]) -> List["np.ndarray"]:
+        return list(self.embed(texts))
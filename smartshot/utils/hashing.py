@@ -0,0 +1,119 @@
+"""Streaming file hashing utilities."""
+import hashlib
+from pathlib import Path
+from typing import Callable, Dict, List
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+
+# Read files in 1 MiB chunks so memory use does not grow with file size
+CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_ALGORITHM = "sha256"
+
+
+def _hasher_factories() -> Dict[str, Callable]:
+    factories = {
+        "sha256": hashlib.sha256,
+        # Faster than SHA-256 on 64-bit CPUs; 128 bits is plenty for dedupe
+        "blake2b": lambda: hashlib.blake2b(digest_size=16),
+    }
+    if HAS_XXHASH:
+        # Non-cryptographic, several GB/s; only suitable for dedupe
+        factories["xxh3"] = xxhash.xxh3_128
+    return factories
+
+
+def available_algorithms() -> List[str]:
+    """List the hash algorithms usable on this system."""
+    return list(_hasher_factories())
+
+
+def hash_file(file_path: str | Path, algorithm: str = DEFAULT_ALGORITHM,
+              chunk_size: int = CHUNK_SIZE) -> str:
+    """Hash a file by streaming it in fixed-size chunks.
+
+    SHA-256 digests are returned as plain hex for compatibility with
+    existing databases. Other algorithms are prefixed with their name
+    (e.g. ``blake2b:...``) so digests from different algorithms never
+    compare equal.
+
+    Args:
+        file_path: Path to the file
+        algorithm: One of ``available_algorithms()``
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Hex digest of the file contents
+
+    Raises:
+        ValueError: If the algorithm is not available
+        OSError: If the file cannot be read
+    """
+    factories = _hasher_factories()
+    if algorithm not in factories:
+        raise ValueError(f"Unknown hash algorithm: {algorithm}")
+
+    hasher = factories[algorithm]()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+
+    digest = hasher.hexdigest()
+    return digest if algorithm == "sha256" else f"{algorithm}:{digest}"
+
+
+class HashCache:
+    """Persistent cache of file digests keyed on (path, size, mtime_ns).
+
+    A cached digest is only returned while the file's size and
+    modification time are unchanged, so rescans and backfills can skip
+    re-reading files that have not been touched.
+    """
+
+    def __init__(self, db, algorithm: str = DEFAULT_ALGORITHM):
+        """Initialize the cache.
+
+        Args:
+            db: Database holding the ``file_hashes`` table
+            algorithm: Hash algorithm used for new digests
+        """
+        if algorithm not in _hasher_factories():
+            raise ValueError(f"Unknown hash algorithm: {algorithm}")
+        self.db = db
+        self.algorithm = algorithm
+
+    def get(self, file_path: str | Path, size: int, mtime_ns: int) -> str | None:
+        """Return the cached digest if the file is unchanged."""
+        return self.db.get_cached_hash(str(file_path), size, mtime_ns, self.algorithm)
+
+    def put(self, file_path: str | Path, size: int, mtime_ns: int, digest: str):
+        """Record the digest of a file."""
+        self.db.store_file_hashes([{
+            'file_path': str(file_path),
+            'file_size': size,
+            'mtime_ns': mtime_ns,
+            'algorithm': self.algorithm,
+            'digest': digest,
+        }])
+
+    def hash_file(self, file_path: str | Path) -> str:
+        """Hash a file, reading it only if it changed since it was last hashed.
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        st = Path(file_path).stat()
+        digest = self.get(file_path, st.st_size, st.st_mtime_ns)
+        if digest is None:
+            digest = hash_file(file_path, self.algorithm)
+            self.put(file_path, st.st_size, st.st_mtime_ns, digest)
+        return digest
@@ -0,0 +1,122 @@
+"""Bounding the memory used by screenshots being processed.
+
+A screenshot is decoded in full while it is hashed perceptually, OCRed
+and thumbnailed. That is a few tens of MB for a normal capture, but a
+full-page scrolling capture of 2,000 x 60,000 pixels decodes to nearly
+half a GB, and several of them on parallel workers can exhaust memory.
+``MemoryBudget`` admits screenshots only while their estimated working
+memory fits the budget, so large ones wait for each other instead.
+"""
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+import importlib.util
+import sys
+import threading
+import time
+
+from smartshot.utils.metrics import METRICS
+
+# Only used for peak memory on Windows, where the resource module is missing
+HAS_PSUTIL = importlib.util.find_spec("psutil") is not None
+
+# Estimated working memory per image pixel: the RGBA decode plus the
+# grayscale copy and the downscaled buffers of OCR, phash and thumbnails
+WORKING_BYTES_PER_PIXEL = 6
+
+# Default budget for screenshots in flight
+DEFAULT_MEMORY_BUDGET = 1024 * 2**20
+
+
+def image_cost(image_path: str | Path) -> int:
+    """Estimated working memory in bytes of processing an image.
+
+    Only the image header is read. Returns 0 if the file cannot be opened
+    as an image, so that it is not held back (it fails later anyway).
+    """
+    try:
+        from PIL import Image
+        with Image.open(image_path) as image:
+            return image.width * image.height * WORKING_BYTES_PER_PIXEL
+    except Exception:
+        return 0
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident memory of this process in bytes, or None if unknown."""
+    try:
+        import resource
+    except ImportError:
+        if HAS_PSUTIL:
+            import psutil
+            return psutil.Process().memory_info().peak_wset
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in KB elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """Admits images for processing while their estimated memory fits a budget.
+
+    Waiters are admitted in arrival order, so a stream of small screenshots
+    cannot starve a large one. An image larger than the whole budget is
+    admitted once nothing else is in flight, so it runs alone rather than
+    never.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BUDGET):
+        """Initialize the budget.
+
+        Args:
+            max_bytes: Estimated working memory allowed in flight (0 disables
+                the limit)
+        """
+        self.max_bytes = max_bytes
+        self.reserved = 0
+        self._waiting = deque()
+        self._condition = threading.Condition()
+
+    def _fits(self, cost: int) -> bool:
+        return self.reserved == 0 or self.reserved + cost <= self.max_bytes
+
+    def acquire(self, cost: int):
+        """Block until cost bytes fit the budget, then reserve them."""
+        with self._condition:
+            ticket = object()
+            self._waiting.append(ticket)
+            try:
+                if not (self._waiting[0] is ticket and self._fits(cost)):
+                    METRICS.count('memory', 'waits')
+                    start = time.perf_counter()
+                    self._condition.wait_for(lambda: self._waiting[0] is ticket and self._fits(cost))
+                    METRICS.observe('memory_wait', time.perf_counter() - start)
+                self.reserved += cost
+            finally:
+                self._waiting.remove(ticket)
+                # The next waiter may fit as well
+                self._condition.notify_all()
+
+    def release(self, cost: int):
+        """Return bytes reserved by ``acquire``."""
+        with self._condition:
+            self.reserved -= cost
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, image_path: str | Path) -> Iterator[int]:
+        """Hold an image's estimated working memory while processing it.
+
+        Yields:
+            The reserved estimate in bytes
+        """
+        cost = image_cost(image_path) if self.max_bytes > 0 else 0
+        if cost == 0:
+            yield 0
+            return
+        self.acquire(cost)
+        try:
+            yield cost
+        finally:
+            self.release(cost)
@@ -0,0 +1,288 @@
+"""Pipeline metrics: per-stage latency histograms, counters and gauges.
+
+Stages time themselves into the process-wide ``METRICS`` registry (the
+OCR engine, the summarizer, the watcher's handler and the database
+writer). While the watcher runs, a ``MetricsExporter`` writes snapshots
+next to the database as JSON (read by ``smartshot search stats
+--pipeline`` and the web server) and as Prometheus text.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+# Histogram bucket upper bounds in seconds: 1 ms doubling up to about 2 minutes
+BUCKETS: Tuple[float, ...] = tuple(0.001 * 2 ** i for i in range(18))
+
+# Seconds between snapshots written by the exporter
+EXPORT_INTERVAL = 2.0
+
+# Completions remembered for the throughput rate
+THROUGHPUT_WINDOW = 300.0
+
+# Quantiles reported for every stage
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def default_metrics_path(db_path: str | Path) -> Path:
+    """Metrics snapshot stored next to the database, e.g. smartshot.metrics.json."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.metrics.json")
+
+
+class Histogram:
+    """Latency distribution in fixed exponential buckets.
+
+    Observing is O(log buckets) with constant memory, and quantiles are
+    interpolated within a bucket the way Prometheus' histogram_quantile
+    does, so they are accurate to within a factor of two at worst and
+    usually much closer.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0-1), or None without observations."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self) -> dict:
+        result = {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'max': self.max if self.count else None,
+        }
+        for q in QUANTILES:
+            result[f'p{round(q * 100)}'] = self.quantile(q)
+        cumulative, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append([bound, total])
+        result['buckets'] = cumulative
+        return result
+
+
+class Metrics:
+    """Thread-safe registry of stage timings, counters and gauges."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._completions = deque()
+        self.started = time.time()
+
+    def observe(self, stage: str, seconds: float):
+        """Record how long one run of a stage took."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """Time a block as one run of a stage; an exception counts as an error."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(stage)
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name: str, label: str = '', value: float = 1):
+        """Add to a counter, e.g. ``count('screenshots', 'duplicate')``."""
+        with self._lock:
+            key = (name, label)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def error(self, stage: str):
+        """Count a failure in a stage."""
+        self.count('errors', stage)
+
+    def completed(self):
+        """Count a screenshot that made it through the whole pipeline."""
+        now = time.monotonic()
+        with self._lock:
+            self._completions.append(now)
+            while self._completions and now - self._completions[0] > THROUGHPUT_WINDOW:
+                self._completions.popleft()
+        self.count('screenshots', 'stored')
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        """Register a value read at snapshot time, e.g. a queue's depth."""
+        with self._lock:
+            self._gauges[name] = read
+
+    def reset(self):
+        """Forget all observations (gauges stay registered)."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._completions.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """All metrics as a JSON-serializable dictionary."""
+        now = time.monotonic()
+        with self._lock:
+            stages = {name: h.snapshot() for name, h in sorted(self._histograms.items())}
+            counters: Dict[str, Dict[str, float]] = {}
+            for (name, label), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[label] = value
+            gauges = dict(self._gauges)
+            last_minute = sum(1 for t in self._completions if now - t <= 60)
+            window = min(THROUGHPUT_WINDOW, max(time.time() - self.started, 1.0))
+            recent = sum(1 for t in self._completions if now - t <= window)
+        values = {}
+        for name, read in gauges.items():
+            try:
+                values[name] = read()
+            except Exception:
+                values[name] = None
+        return {
+            'pid': os.getpid(),
+            'started': self.started,
+            'updated': time.time(),
+            'uptime': time.time() - self.started,
+            'throughput': {
+                'last_minute': last_minute,
+                'per_minute': recent * 60 / window,
+            },
+            'gauges': values,
+            'counters': counters,
+            'stages': stages,
+        }
+
+    def to_prometheus(self, snapshot: Optional[dict] = None) -> str:
+        """Render a snapshot in the Prometheus text exposition format."""
+        snapshot = snapshot or self.snapshot()
+        lines = [
+            '# HELP smartshot_stage_seconds Time spent in each pipeline stage.',
+            '# TYPE smartshot_stage_seconds histogram',
+        ]
+        for stage, h in snapshot['stages'].items():
+            for bound, count in h['buckets']:
+                lines.append(f'smartshot_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+            lines.append(f'smartshot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h["count"]}')
+            lines.append(f'smartshot_stage_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}')
+            lines.append(f'smartshot_stage_seconds_count{{stage="{stage}"}} {h["count"]}')
+        labels = {'screenshots': 'result', 'errors': 'stage'}
+        for name, values in snapshot['counters'].items():
+            lines.append(f'# TYPE smartshot_{name}_total counter')
+            label = labels.get(name, 'kind')
+            for value_label, value in values.items():
+                tag = f'{{{label}="{value_label}"}}' if value_label else ''
+                lines.append(f'smartshot_{name}_total{tag} {value:g}')
+        for name, value in snapshot['gauges'].items():
+            if value is not None:
+                lines.append(f'# TYPE smartshot_{name} gauge')
+                lines.append(f'smartshot_{name} {value:g}')
+        lines.append('# TYPE smartshot_throughput_per_minute gauge')
+        lines.append(f'smartshot_throughput_per_minute {snapshot["throughput"]["per_minute"]:.3f}')
+        lines.append('# TYPE smartshot_uptime_seconds gauge')
+        lines.append(f'smartshot_uptime_seconds {snapshot["uptime"]:.1f}')
+        return '\n'.join(lines) + '\n'
+
+
+# Registry shared by the whole process
+METRICS = Metrics()
+
+
+def read_metrics(path: str | Path) -> Optional[dict]:
+    """Load a snapshot written by ``MetricsExporter``, or None if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class MetricsExporter:
+    """Periodically writes snapshots of a registry to disk.
+
+    ``path`` gets the JSON snapshot and the same name with ``.prom`` in
+    place of ``.json`` the Prometheus text (for node_exporter's textfile
+    collector, or the web server's /metrics). Both are replaced
+    atomically, so readers never see a partial file.
+    """
+
+    def __init__(self, path: str | Path, metrics: Metrics = METRICS,
+                 interval: float = EXPORT_INTERVAL):
+        """Initialize the exporter.
+
+        Args:
+            path: Where to write the JSON snapshot
+            metrics: Registry to export
+            interval: Seconds between snapshots
+        """
+        self.path = Path(path)
+        self.prometheus_path = self.path.with_suffix('.prom')
+        self.metrics = metrics
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self.write()
+        self._thread = threading.Thread(target=self._run, name="smartshot-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop exporting; the final snapshot is marked as no longer running."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write(running=False)
+
+    def write(self, running: bool = True):
+        """Write one snapshot now."""
+        snapshot = self.metrics.snapshot()
+        snapshot['running'] = running
+        snapshot['interval'] = self.interval
+        try:
+            self._replace(self.path, json.dumps(snapshot))
+            self._replace(self.prometheus_path, self.metrics.to_prometheus(snapshot))
+        except OSError as e:
+            print(f"Writing metrics failed: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    @staticmethod
+    def _replace(path: Path, content: str):
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(content)
+        os.replace(tmp, path)
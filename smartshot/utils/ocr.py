@@ -1,21 +1,38 @@
 """OCR utilities for extracting text from images."""
+from collections import deque
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
+import importlib.util
 import platform
 import os
+import subprocess
+import tempfile
+import threading
+import time
 
-try:
-    import pytesseract
-    from PIL import Image
-    HAS_OCR = True
-except ImportError:
-    HAS_OCR = False
-    print("Warning: pytesseract or PIL not available. OCR functionality will be disabled.")
+# Only check that the OCR packages are installed here; they are imported
+# when an engine first runs, so CLI commands that never OCR start quickly
+HAS_OCR = all(importlib.util.find_spec(name) is not None for name in ("pytesseract", "PIL"))
+# In-process Tesseract API; avoids one subprocess per image when installed
+HAS_TESSEROCR = importlib.util.find_spec("tesserocr") is not None
+
+from smartshot.utils.preprocess import (
+    HAS_PREPROCESS, DEFAULT_PROFILE, Layout, PreprocessProfile, get_profile, preprocess_tiles
+)
+from smartshot.utils.ocr_lines import OCRLine, OCRResult, PACK_VERSION, parse_tsv
+from smartshot.utils.metrics import METRICS
+from smartshot.utils.result_cache import config_version
+
+# Tesseract settings: default LSTM engine, single uniform block of text
+OEM = 3
+PSM = 6
+DEFAULT_CONFIG = f'--oem {OEM} --psm {PSM}'
 
 def setup_tesseract():
     """Set up Tesseract path for Windows if needed."""
     if not HAS_OCR:
         return False
+    import pytesseract
         
     try:
         # Test if Tesseract is properly configured
@@ -39,29 +56,331 @@ def setup_tesseract():
                         continue
         return False
 
+
+class OCREngine:
+    """Long-lived OCR session.
+
+    Tesseract is located and checked once, on first use, instead of for
+    every image. When ``tesserocr`` is installed, each thread keeps an
+    in-process Tesseract API open; otherwise images are passed to the
+    tesseract binary by path, and ``extract_many`` OCRs a whole batch with
+    a single tesseract process.
+
+    ``recognize`` returns the text line by line with boxes and confidences
+    (see ``smartshot.utils.ocr_lines``); ``extract`` returns only the text.
+
+    Unless the profile is "none", images are first downscaled, binarized
+    and cropped to their text regions (see ``smartshot.utils.preprocess``).
+    Very tall images are OCRed in tiles, one page per tile, and the lines
+    of all tiles are mapped back into one result.
+    """
+
+    def __init__(self, lang: str = 'eng', config: str = DEFAULT_CONFIG,
+                 batch_size: int = 32, use_tesserocr: bool = True,
+                 max_timings: int = 1000, profile: Optional[str] = DEFAULT_PROFILE):
+        """Initialize the engine.
+
+        Args:
+            lang: Tesseract language code(s), e.g. "eng" or "eng+deu"
+            config: Extra tesseract command-line options
+            batch_size: Maximum images per tesseract process in ``extract_many``
+            use_tesserocr: Use the in-process tesserocr API when available
+            max_timings: Number of recent per-image timings to keep
+            profile: Preprocessing profile name ("fast", "accurate" or "none")
+        """
+        self.lang = lang
+        self.config = config
+        self.batch_size = batch_size
+        self.use_tesserocr = use_tesserocr and HAS_TESSEROCR
+        self.profile: Optional[PreprocessProfile] = get_profile(profile) if HAS_PREPROCESS else None
+        # Recent (path, seconds) pairs; batch timings are amortized per image
+        self.timings = deque(maxlen=max_timings)
+        self._available = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        """Whether Tesseract was found (detected once and cached)."""
+        if self._available is None:
+            with self._lock:
+                if self._available is None:
+                    if not HAS_OCR and not self.use_tesserocr:
+                        print("Warning: pytesseract or PIL not available. OCR functionality will be disabled.")
+                    self._available = self.use_tesserocr or setup_tesseract()
+        return self._available
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the settings that affect OCR output, for the result cache."""
+        return config_version('tesseract', self.lang, self.config, self.profile, 'lines', PACK_VERSION)
+
+    def _unavailable_message(self) -> Optional[str]:
+        if not HAS_OCR and not self.use_tesserocr:
+            return "[OCR not available - missing dependencies]"
+        if not self.available:
+            return "[OCR not available - Tesseract not found]"
+        return None
+
+    def _tesserocr_api(self):
+        """Per-thread tesserocr API; the C++ API object is not thread-safe."""
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            import tesserocr
+            api = tesserocr.PyTessBaseAPI(lang=self.lang, psm=PSM, oem=OEM)
+            self._local.api = api
+        return api
+
+    def extract(self, image_path: str | Path) -> str:
+        """Extract text from one image.
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            Extracted text or error message if OCR fails
+        """
+        return self.recognize(image_path).text
+
+    def recognize(self, image_path: str | Path) -> OCRResult:
+        """Extract the lines of text of one image.
+
+        Args:
+            image_path: Path to the image file
+
+        Returns:
+            Result with the text, lines and confidence. If OCR fails, the
+            text is an error message and the confidence is None.
+        """
+        message = self._unavailable_message()
+        if message:
+            return OCRResult(message)
+        if not Path(image_path).exists():
+            return OCRResult("[Image file not found]")
+
+        start = time.perf_counter()
+        try:
+            pages = []
+            # One tile at a time, so only one preprocessed tile is held
+            for image, layout in self._prepare(image_path):
+                if self.use_tesserocr:
+                    size, lines = self._tesserocr_lines(image)
+                else:
+                    import pytesseract
+                    # A str path goes straight to tesseract without being decoded here
+                    parsed = parse_tsv(pytesseract.image_to_data(image, lang=self.lang, config=self.config))
+                    size, lines = parsed[0] if parsed else ((0, 0), [])
+                pages.append((size, lines, layout))
+            return self._result(pages)
+        except FileNotFoundError:
+            return OCRResult("[Image file not found]")
+        except Exception as e:
+            METRICS.error('ocr')
+            return OCRResult(f"[OCR Error] {str(e)}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings.append((str(image_path), elapsed))
+            METRICS.observe('ocr', elapsed)
+
+    def _tesserocr_lines(self, image):
+        """Recognize an image with the in-process API, returning (size, lines)."""
+        from tesserocr import RIL, iterate_level
+        api = self._tesserocr_api()
+        if isinstance(image, str):
+            from PIL import Image
+            with Image.open(image) as opened:
+                size = opened.size
+            api.SetImageFile(image)
+        else:
+            size = image.size
+            api.SetImage(image)
+        api.Recognize()
+        lines = []
+        for item in iterate_level(api.GetIterator(), RIL.TEXTLINE):
+            text = (item.GetUTF8Text(RIL.TEXTLINE) or '').strip()
+            if not text:
+                continue
+            left, top, right, bottom = item.BoundingBox(RIL.TEXTLINE)
+            lines.append(OCRLine(left, top, right - left, bottom - top,
+                                 min(max(item.Confidence(RIL.TEXTLINE) / 100, 0.0), 1.0), text))
+        return size, lines
+
+    @staticmethod
+    def _result(pages: List[Tuple[tuple, List[OCRLine], Optional[Layout]]]) -> OCRResult:
+        """Map line boxes back onto the original image and build the result.
+
+        Args:
+            pages: (size, lines, layout) of each tile of one image, top to bottom
+        """
+        size, lines = (0, 0), []
+        for size, page_lines, layout in pages:
+            if layout is None:
+                lines.extend(page_lines)
+                continue
+            for line in page_lines:
+                left, top, right, bottom = layout.to_original(
+                    (line.left, line.top, line.left + line.width, line.top + line.height)
+                )
+                lines.append(OCRLine(left, top, right - left, bottom - top, line.confidence, line.text))
+            size = layout.size
+        return OCRResult.from_lines(lines, *size)
+
+    def _prepare(self, image_path: str | Path) -> Iterator[tuple]:
+        """Preprocess an image, yielding (PIL image, layout) per tile or (original path, None) once."""
+        if self.profile is None:
+            yield str(image_path), None
+            return
+        tiles = preprocess_tiles(image_path, self.profile)
+        try:
+            # The image is decoded with the first tile
+            with METRICS.time('preprocess'):
+                tile = next(tiles)
+        except Exception as e:
+            print(f"Preprocessing failed for {image_path}, using original: {e}")
+            yield str(image_path), None
+            return
+        while tile is not None:
+            yield tile
+            with METRICS.time('preprocess'):
+                tile = next(tiles, None)
+
+    def extract_many(self, image_paths: Iterable[str | Path]) -> List[str]:
+        """Extract text from several images, amortizing OCR startup.
+
+        Args:
+            image_paths: Paths to the image files
+
+        Returns:
+            Extracted text (or error message) for each path, in order
+        """
+        return [result.text for result in self.recognize_many(image_paths)]
+
+    def recognize_many(self, image_paths: Iterable[str | Path]) -> List[OCRResult]:
+        """Extract the lines of text of several images, amortizing OCR startup.
+
+        Args:
+            image_paths: Paths to the image files
+
+        Returns:
+            One result per path, in order
+        """
+        paths = [Path(p) for p in image_paths]
+        message = self._unavailable_message()
+        if message:
+            return [OCRResult(message) for _ in paths]
+        if self.use_tesserocr or len(paths) < 2:
+            return [self.recognize(p) for p in paths]
+
+        results = []
+        for i in range(0, len(paths), self.batch_size):
+            results.extend(self._recognize_batch(paths[i:i + self.batch_size]))
+        return results
+
+    def _recognize_batch(self, paths: List[Path]) -> List[OCRResult]:
+        """OCR a batch of images with one tesseract process."""
+        existing = [p for p in paths if p.exists()]
+        results = {}
+        if existing:
+            start = time.perf_counter()
+            # (index in existing, layout) of each page; tall images have several
+            owners = []
+            with tempfile.TemporaryDirectory(prefix='smartshot_ocr_') as tmp_dir:
+                inputs = []
+                for i, p in enumerate(existing):
+                    for j, (image, layout) in enumerate(self._prepare(p)):
+                        owners.append((i, layout))
+                        if isinstance(image, str):
+                            inputs.append(Path(image))
+                        else:
+                            prepared = Path(tmp_dir) / f"{i}_{j}.png"
+                            image.save(prepared)
+                            inputs.append(prepared)
+                pages = self._run_tesseract_list(inputs)
+            elapsed = time.perf_counter() - start
+            if pages is None:
+                # Output could not be matched to inputs: OCR one by one
+                for p in existing:
+                    results[p] = self.recognize(p)
+            else:
+                grouped = [[] for _ in existing]
+                for (i, layout), (size, lines) in zip(owners, pages):
+                    grouped[i].append((size, lines, layout))
+                for p, image_pages in zip(existing, grouped):
+                    results[p] = self._result(image_pages)
+                    self.timings.append((str(p), elapsed / len(existing)))
+                    METRICS.observe('ocr', elapsed / len(existing))
+        return [results.get(p) or OCRResult("[Image file not found]") for p in paths]
+
+    def _run_tesseract_list(self, paths: List[Path]) -> Optional[list]:
+        """Run tesseract on a list file, returning (size, lines) per image or None."""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write("\n".join(str(p.absolute()) for p in paths) + "\n")
+            list_file = f.name
+        try:
+            import pytesseract
+            # The tsv config writes word boxes and confidences, one page per image
+            cmd = [pytesseract.pytesseract.tesseract_cmd, list_file, 'stdout',
+                   '-l', self.lang, *self.config.split(), 'tsv']
+            proc = subprocess.run(cmd, capture_output=True)
+            if proc.returncode != 0:
+                return None
+            pages = parse_tsv(proc.stdout.decode('utf-8', errors='replace'))
+            return pages if len(pages) == len(paths) else None
+        except OSError:
+            return None
+        finally:
+            os.unlink(list_file)
+
+
+# Shared engine used by extract_text_from_image
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> OCREngine:
+    """Get the shared OCR engine, creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = OCREngine()
+    return _engine
+
+def configure_engine(**kwargs) -> OCREngine:
+    """Replace the shared OCR engine with one built from the given OCREngine options."""
+    global _engine
+    with _engine_lock:
+        _engine = OCREngine(**kwargs)
+    return _engine
+
 def extract_text_from_image(image_path: str | Path) -> str:
     """Extract text from an image using OCR.
-    
+
     Args:
         image_path: Path to the image file
-        
+
     Returns:
         Extracted text or error message if OCR fails
     """
-    try:
-        if not HAS_OCR:
-            return "[OCR not available - missing dependencies]"
-            
-        if not setup_tesseract():
-            return "[OCR not available - Tesseract not found]"
-            
-        image = Image.open(image_path)
-        
-        # Use better OCR configuration
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(image, config=custom_config)
-        return text.strip() or "[No text detected]"
-    except FileNotFoundError:
-        return "[Image file not found]"
-    except Exception as e:
-        return f"[OCR Error] {str(e)}"
+    return get_engine().extract(image_path)
+
+def extract_text_from_images(image_paths: Iterable[str | Path]) -> List[str]:
+    """Extract text from several images in one batch.
+
+    Args:
+        image_paths: Paths to the image files
+
+    Returns:
+        Extracted text (or error message) for each path, in order
+    """
+    return get_engine().extract_many(image_paths)
+
+def recognize_images(image_paths: Iterable[str | Path]) -> List[OCRResult]:
+    """Extract the lines of text of several images in one batch.
+
+    Args:
+        image_paths: Paths to the image files
+
+    Returns:
+        One result per path, in order (see ``OCREngine.recognize``)
+    """
+    return get_engine().recognize_many(image_paths)
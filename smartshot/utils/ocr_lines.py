@@ -0,0 +1,160 @@
+"""Line-level OCR results: text, bounding box and confidence of each line.
+
+Tesseract reports every recognized word with its box and confidence
+(``image_to_data`` / the ``tsv`` output). Words are grouped into lines
+here, and the lines of a screenshot are stored as one compact binary
+record (see ``pack_lines``), so search hits can be highlighted on the
+image and unreliable lines can be left out of categorization and
+summarization.
+"""
+import struct
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Lines read with less confidence than this are left out of the text
+# given to the summarizer; they are mostly UI noise, icons and artifacts
+MIN_SUMMARY_CONFIDENCE = 0.6
+
+# Packed format: a header with the format version and the image size,
+# then per line its box, confidence in percent and UTF-8 text length,
+# followed by the text. The Node server decodes the same layout.
+PACK_VERSION = 1
+_HEADER = struct.Struct('<BII')
+_LINE = struct.Struct('<IIHHBH')
+
+# TSV columns of Tesseract's word-level output
+_TSV_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                'left', 'top', 'width', 'height', 'conf', 'text')
+_PAGE_LEVEL = 1
+_WORD_LEVEL = 5
+
+
+@dataclass(frozen=True)
+class OCRLine:
+    """One line of recognized text, in original image pixels."""
+    left: int
+    top: int
+    width: int
+    height: int
+    confidence: float  # 0-1
+    text: str
+
+
+@dataclass
+class OCRResult:
+    """Text of a screenshot with its lines and overall confidence."""
+    text: str
+    # Mean line confidence (0-1) weighted by line length; None if OCR failed
+    confidence: Optional[float] = None
+    lines: List[OCRLine] = field(default_factory=list)
+    # Size of the image the line boxes refer to
+    width: int = 0
+    height: int = 0
+
+    @classmethod
+    def from_lines(cls, lines: List[OCRLine], width: int, height: int) -> "OCRResult":
+        """Build a result whose text is the lines joined, top to bottom."""
+        text = "\n".join(line.text for line in lines)
+        if not text.strip():
+            return cls("[No text detected]", width=width, height=height)
+        return cls(text, mean_confidence(lines), lines, width, height)
+
+    @property
+    def ok(self) -> bool:
+        """Whether text was recognized (not an error or "no text" message)."""
+        return self.confidence is not None
+
+    def pack(self) -> Optional[bytes]:
+        """Packed lines for storage, or None if there are none."""
+        return pack_lines(self.lines, self.width, self.height) if self.lines else None
+
+
+def mean_confidence(lines: Iterable[OCRLine]) -> Optional[float]:
+    """Confidence of a page: the mean over its lines, weighted by their length."""
+    total = weight = 0.0
+    for line in lines:
+        total += line.confidence * len(line.text)
+        weight += len(line.text)
+    return total / weight if weight else None
+
+
+def confident_text(lines: Iterable[OCRLine], min_confidence: float = MIN_SUMMARY_CONFIDENCE) -> str:
+    """Text of the lines read with at least the given confidence."""
+    return "\n".join(line.text for line in lines if line.confidence >= min_confidence)
+
+
+def parse_tsv(tsv: str) -> List[Tuple[Tuple[int, int], List[OCRLine]]]:
+    """Group Tesseract's word-level TSV output into lines.
+
+    Args:
+        tsv: Output of ``image_to_data`` or ``tesseract ... tsv``, with
+            one page per input image
+
+    Returns:
+        ((width, height), lines) for each page, in page order. Boxes are
+        in the pixels of the image Tesseract was given.
+    """
+    pages: Dict[int, Tuple[int, int]] = {}
+    words: Dict[Tuple[int, int, int, int], List[Tuple[int, int, int, int, float, str]]] = {}
+    for row in tsv.splitlines():
+        values = row.split('\t')
+        if len(values) < len(_TSV_COLUMNS) - 1 or not values[0].isdigit():
+            continue  # Header or malformed row
+        level, page, block, par, line = (int(v) for v in values[:5])
+        left, top, width, height = (int(v) for v in values[6:10])
+        if level == _PAGE_LEVEL:
+            pages[page] = (width, height)
+            continue
+        text = values[11].strip() if len(values) > 11 else ''
+        conf = float(values[10])
+        if level != _WORD_LEVEL or not text or conf < 0:
+            continue
+        words.setdefault((page, block, par, line), []).append((left, top, width, height, conf, text))
+
+    lines_by_page: Dict[int, List[OCRLine]] = {page: [] for page in pages}
+    for (page, _, _, _), line_words in words.items():
+        left = min(w[0] for w in line_words)
+        top = min(w[1] for w in line_words)
+        right = max(w[0] + w[2] for w in line_words)
+        bottom = max(w[1] + w[3] for w in line_words)
+        text = " ".join(w[5] for w in line_words)
+        # Longer words say more about the line than single characters
+        chars = sum(len(w[5]) for w in line_words)
+        conf = sum(w[4] * len(w[5]) for w in line_words) / chars / 100
+        lines_by_page.setdefault(page, []).append(
+            OCRLine(left, top, right - left, bottom - top, min(max(conf, 0.0), 1.0), text)
+        )
+    return [(pages.get(page, (0, 0)), lines_by_page[page]) for page in sorted(lines_by_page)]
+
+
+def pack_lines(lines: Iterable[OCRLine], width: int, height: int) -> bytes:
+    """Encode lines compactly (about 15 bytes per line plus its text)."""
+    parts = [_HEADER.pack(PACK_VERSION, width, height)]
+    for line in lines:
+        text = line.text.encode('utf-8')[:0xFFFF]
+        parts.append(_LINE.pack(
+            max(line.left, 0), max(line.top, 0), min(line.width, 0xFFFF), min(line.height, 0xFFFF),
+            round(line.confidence * 100), len(text)
+        ))
+        parts.append(text)
+    return b''.join(parts)
+
+
+def unpack_lines(data: bytes) -> OCRResult:
+    """Decode lines packed by ``pack_lines``.
+
+    Returns:
+        Result with the lines, their joined text and the image size
+    """
+    version, width, height = _HEADER.unpack_from(data)
+    if version != PACK_VERSION:
+        raise ValueError(f"Unknown OCR line format version: {version}")
+    lines = []
+    offset = _HEADER.size
+    while offset < len(data):
+        left, top, line_width, line_height, conf, length = _LINE.unpack_from(data, offset)
+        offset += _LINE.size
+        text = bytes(data[offset:offset + length]).decode('utf-8', errors='replace')
+        offset += length
+        lines.append(OCRLine(left, top, line_width, line_height, conf / 100, text))
+    return OCRResult.from_lines(lines, width, height)
@@ -0,0 +1,186 @@
+"""Perceptual hashing and near-duplicate lookup for screenshots."""
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image, ImageChops
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+# 16x16 gradient grid = 256-bit hash. Screenshots share a lot of layout,
+# so the common 8x8 (64-bit) grid puts too many of them in the same
+# bucket; content changes within one layout are caught by images_match.
+HASH_SIZE = 16
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+# Default Hamming distance still treated as "the same screenshot"
+# (a blinking cursor or a changed clock flips only a handful of bits)
+DEFAULT_MAX_DISTANCE = 6
+
+
+def dhash(image_path: str | Path, hash_size: int = HASH_SIZE) -> int:
+    """Compute a difference hash (dHash) of an image.
+
+    The image is reduced to (hash_size + 1) x hash_size grayscale pixels
+    and each bit records whether a pixel is brighter than its right-hand
+    neighbour.
+
+    Args:
+        image_path: Path to the image file
+        hash_size: Grid size; the hash has hash_size**2 bits
+
+    Returns:
+        The hash as a non-negative integer
+    """
+    with Image.open(image_path) as image:
+        # Decode JPEGs at reduced size; the result is tiny anyway
+        image.draft('L', (hash_size * 8, hash_size * 8))
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def images_match(path_a: str | Path, path_b: str | Path,
+                 max_changed_fraction: float = 0.002, size: int = 1024) -> bool:
+    """Check that two images differ only in a tiny area.
+
+    A perceptual hash cannot tell two pages of text in the same window
+    layout apart, so a hash match is confirmed by comparing the images
+    themselves at reduced resolution: a blinking cursor or a clock
+    changes a few hundred pixels, a different page of text far more.
+
+    Args:
+        path_a: First image
+        path_b: Second image
+        max_changed_fraction: Largest fraction of pixels allowed to differ
+        size: Longest edge the images are reduced to before comparing
+
+    Returns:
+        True if the images have the same dimensions and nearly identical pixels
+    """
+    with Image.open(path_a) as a, Image.open(path_b) as b:
+        if a.size != b.size:
+            return False
+        scale = min(1.0, size / max(a.size))
+        reduced = (max(1, int(a.width * scale)), max(1, int(a.height * scale)))
+        a.draft('L', reduced)
+        b.draft('L', reduced)
+        a = a.convert('L').resize(reduced, Image.Resampling.BOX)
+        b = b.convert('L').resize(reduced, Image.Resampling.BOX)
+    # Ignore faint differences from compression or anti-aliasing
+    changed = ImageChops.difference(a, b).point(lambda v: 255 if v > 24 else 0)
+    changed_pixels = changed.histogram()[255]
+    return changed_pixels <= max_changed_fraction * reduced[0] * reduced[1]
+
+
+def to_hex(value: int, bits: int = HASH_BITS) -> str:
+    """Format a hash for storage."""
+    return f"{value:0{bits // 4}x}"
+
+
+def from_hex(text: str) -> int:
+    """Parse a stored hash."""
+    return int(text, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """Multi-index hash table for Hamming-distance lookups.
+
+    The hash is split into ``max_distance + 1`` bands. By the pigeonhole
+    principle, two hashes within ``max_distance`` bits of each other agree
+    exactly on at least one band, so a query only verifies the entries
+    that share a band with it instead of scanning every stored hash.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, bits: int = HASH_BITS):
+        """Initialize an empty index.
+
+        Args:
+            max_distance: Largest Hamming distance a query can ask for
+            bits: Number of bits in each hash
+        """
+        if max_distance < 0 or max_distance >= bits:
+            raise ValueError("max_distance must be between 0 and bits - 1")
+        self.max_distance = max_distance
+        self.bits = bits
+        band_count = max_distance + 1
+        # Spread bits as evenly as possible over the bands
+        base, extra = divmod(bits, band_count)
+        self._bands: List[Tuple[int, int]] = []  # (shift, mask)
+        shift = 0
+        for i in range(band_count):
+            width = base + (1 if i < extra else 0)
+            self._bands.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def add(self, item_id: int, value: int):
+        """Add (or replace) the hash of an item."""
+        if item_id in self._hashes:
+            self.remove(item_id)
+        self._hashes[item_id] = value
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            table.setdefault((value >> shift) & mask, []).append(item_id)
+
+    def remove(self, item_id: int):
+        """Remove an item from the index, if present."""
+        value = self._hashes.pop(item_id, None)
+        if value is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            key = (value >> shift) & mask
+            bucket = table.get(key)
+            if bucket:
+                bucket.remove(item_id)
+                if not bucket:
+                    del table[key]
+
+    def update(self, items: Iterable[Tuple[int, int]]):
+        """Add many (item_id, hash) pairs."""
+        for item_id, value in items:
+            self.add(item_id, value)
+
+    def query(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Find stored items within a Hamming distance of a hash.
+
+        Args:
+            value: Hash to look up
+            max_distance: Distance limit (default and maximum: the index's max_distance)
+
+        Returns:
+            (item_id, distance) pairs, closest first
+        """
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        seen = set()
+        matches = []
+        for table, (shift, mask) in zip(self._tables, self._bands):
+            for item_id in table.get((value >> shift) & mask, ()):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                distance = hamming(value, self._hashes[item_id])
+                if distance <= limit:
+                    matches.append((item_id, distance))
+        matches.sort(key=lambda m: (m[1], -m[0]))
+        return matches
+
+    def nearest(self, value: int, max_distance: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Return the closest (item_id, distance) within the limit, or None."""
+        matches = self.query(value, max_distance)
+        return matches[0] if matches else None
@@ -0,0 +1,363 @@
+"""Image preprocessing to make OCR faster on large screenshots.
+
+Screenshots from HiDPI displays are large and mostly empty UI chrome.
+Before OCR, images are downscaled to their logical resolution, converted
+to grayscale, binarized with an adaptive threshold, and cropped to the
+regions that actually contain text. The crops are stacked into one
+compact image so Tesseract still runs once per screenshot.
+
+Very tall captures (full-page scrolling screenshots) are split into
+horizontal tiles that are thresholded and OCRed one at a time, so the
+memory used by the threshold buffers and by Tesseract depends on the
+tile size rather than the image size.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image
+    HAS_PREPROCESS = True
+except ImportError:
+    HAS_PREPROCESS = False
+
+Box = Tuple[int, int, int, int]  # (left, top, right, bottom)
+
+# Blank rows between stacked text regions
+STACK_GAP = 16
+
+# Images taller than this after scaling are processed in tiles of this height
+TILE_HEIGHT = 4096
+# A tile boundary may move up by this many rows to land on a blank row, so
+# a line of text is not cut in half
+TILE_SEARCH = 256
+
+
+@dataclass(frozen=True)
+class PreprocessProfile:
+    """Settings for one preprocessing profile."""
+    name: str
+    # Downscale HiDPI captures towards this DPI (72 = 1x logical pixels)
+    target_dpi: int = 72
+    # Never scale below this factor, so small text stays legible
+    min_scale: float = 0.5
+    # Cap on the longest edge after scaling, within min_scale (0 = no cap)
+    max_dimension: int = 0
+    binarize: bool = True
+    # Adaptive threshold window (pixels) and sensitivity (0-1)
+    threshold_window: int = 31
+    threshold_offset: float = 0.15
+    crop_regions: bool = True
+    # Gaps (pixels) that still join rows/columns of ink into one region
+    row_gap: int = 24
+    col_gap: int = 48
+    # Rows with less ink than this fraction are treated as empty
+    min_row_ink: float = 0.002
+    padding: int = 8
+
+
+PROFILES: Dict[str, Optional[PreprocessProfile]] = {
+    # Raw image, no preprocessing
+    "none": None,
+    # Aggressive: logical resolution, small cap, tight crops
+    "fast": PreprocessProfile(
+        name="fast", target_dpi=72, min_scale=0.5, max_dimension=2560,
+        row_gap=16, col_gap=32,
+    ),
+    # Conservative: keep more resolution and crop with generous gaps
+    "accurate": PreprocessProfile(
+        name="accurate", target_dpi=96, min_scale=0.75, max_dimension=0,
+        threshold_window=41, row_gap=40, col_gap=96, padding=12,
+    ),
+}
+
+DEFAULT_PROFILE = "accurate"
+
+
+@dataclass
+class Layout:
+    """Where the pixels of a preprocessed image came from.
+
+    Used to map boxes reported by OCR on the preprocessed image back onto
+    the original screenshot.
+    """
+    # Original image (width, height)
+    size: Tuple[int, int]
+    # Preprocessed pixels per original pixel
+    scale: float = 1.0
+    # (top in the preprocessed image, box in the scaled tile) of each
+    # stacked region, top to bottom; empty if the image was not cropped
+    regions: List[Tuple[int, Box]] = field(default_factory=list)
+    # Rows of the scaled image above this tile (0 unless tiled)
+    offset: int = 0
+
+    def to_original(self, box: Box) -> Box:
+        """Map a (left, top, right, bottom) box onto the original image."""
+        left, top, right, bottom = box
+        dx, dy = 0, self.offset
+        # A box belongs to the last region starting at or above it
+        for y, (region_left, region_top, _, _) in self.regions:
+            if y > top:
+                break
+            dx, dy = region_left, region_top - y + self.offset
+        width, height = self.size
+        return (
+            min(int((left + dx) / self.scale), width), min(int((top + dy) / self.scale), height),
+            min(round((right + dx) / self.scale), width), min(round((bottom + dy) / self.scale), height),
+        )
+
+
+def get_profile(name: Optional[str]) -> Optional[PreprocessProfile]:
+    """Look up a profile by name (None or "none" disables preprocessing)."""
+    if name is None:
+        return None
+    if name not in PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {name}")
+    return PROFILES[name]
+
+
+def _scale_factor(image: "Image.Image", profile: PreprocessProfile) -> float:
+    """Pick a downscale factor from the image DPI and the profile's size cap."""
+    scale = 1.0
+    dpi = image.info.get('dpi')
+    if dpi:
+        image_dpi = float(dpi[0]) if isinstance(dpi, tuple) else float(dpi)
+        if image_dpi > profile.target_dpi:
+            scale = max(profile.target_dpi / image_dpi, profile.min_scale)
+    if profile.max_dimension:
+        longest = max(image.size) * scale
+        if longest > profile.max_dimension:
+            scale = max(profile.max_dimension / max(image.size), profile.min_scale)
+    return min(scale, 1.0)
+
+
+def to_grayscale(image: "Image.Image", size: Tuple[int, int]) -> "np.ndarray":
+    """Convert an image to a uint8 grayscale array of the given size."""
+    image = image.convert('L')
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.BOX)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def _box_sum(values: "np.ndarray", half: int, axis: int) -> "np.ndarray":
+    """Sum values over a sliding window of +/- half along one axis."""
+    n = values.shape[axis]
+    cumsum = np.cumsum(values, axis=axis, dtype=np.int32)
+    zero = np.zeros_like(np.take(cumsum, [0], axis=axis))
+    cumsum = np.concatenate((zero, cumsum), axis=axis)
+    hi = np.minimum(np.arange(n) + half + 1, n)
+    lo = np.maximum(np.arange(n) - half, 0)
+    return np.take(cumsum, hi, axis=axis) - np.take(cumsum, lo, axis=axis)
+
+
+def adaptive_threshold(gray: "np.ndarray", window: int, offset: float) -> "np.ndarray":
+    """Binarize with a local-mean (Bradley) threshold.
+
+    Args:
+        gray: uint8 grayscale image
+        window: Size of the local neighbourhood in pixels
+        offset: How much darker than the local mean a pixel must be to count as ink
+
+    Returns:
+        Boolean array, True where there is ink
+    """
+    # Dark themes: make text dark on light so "darker than the mean" means ink
+    if gray.mean() < 128:
+        gray = 255 - gray
+
+    h, w = gray.shape
+    half = max(1, window // 2)
+    # Separable box filter; int32 is enough for 255 * window^2
+    sums = _box_sum(_box_sum(gray, half, axis=0), half, axis=1)
+    counts = np.outer(
+        np.minimum(np.arange(h) + half + 1, h) - np.maximum(np.arange(h) - half, 0),
+        np.minimum(np.arange(w) + half + 1, w) - np.maximum(np.arange(w) - half, 0),
+    ).astype(np.float32)
+    return gray * counts < sums * np.float32(1.0 - offset)
+
+
+def _runs(mask: "np.ndarray", max_gap: int) -> List[Tuple[int, int]]:
+    """Find [start, end) runs of True values, joining runs separated by small gaps."""
+    if not mask.any():
+        return []
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = edges[0::2], edges[1::2]
+
+    runs = [[int(starts[0]), int(ends[0])]]
+    for start, end in zip(starts[1:], ends[1:]):
+        if start - runs[-1][1] <= max_gap:
+            runs[-1][1] = int(end)
+        else:
+            runs.append([int(start), int(end)])
+    return [(s, e) for s, e in runs]
+
+
+def find_text_regions(ink: "np.ndarray", profile: PreprocessProfile) -> List[Box]:
+    """Locate blocks of text in a binarized image.
+
+    Uses projection profiles: rows with ink are grouped into horizontal
+    bands, and each band is split into blocks at wide empty columns.
+
+    Args:
+        ink: Boolean ink mask from ``adaptive_threshold``
+        profile: Preprocessing profile
+
+    Returns:
+        Bounding boxes of text regions, top to bottom
+    """
+    h, w = ink.shape
+    row_ink = ink.mean(axis=1)
+    # Rows that are almost entirely ink are rules, borders or solid fills
+    text_rows = (row_ink > profile.min_row_ink) & (row_ink < 0.9)
+
+    boxes = []
+    for top, bottom in _runs(text_rows, profile.row_gap):
+        band = ink[top:bottom]
+        for left, right in _runs(band.any(axis=0), profile.col_gap):
+            # Shrink each block to its own rows; a block beside a tall one
+            # should not inherit the whole band's height
+            rows = np.flatnonzero(band[:, left:right].any(axis=1))
+            block_top, block_bottom = top + int(rows[0]), top + int(rows[-1]) + 1
+            # Ignore specks too small to hold a character
+            if right - left < 4 or block_bottom - block_top < 4:
+                continue
+            pad = profile.padding
+            boxes.append((max(0, left - pad), max(0, block_top - pad),
+                          min(w, right + pad), min(h, block_bottom + pad)))
+    return boxes
+
+
+def stack_regions(image: "np.ndarray", boxes: List[Box], gap: int = STACK_GAP) -> "np.ndarray":
+    """Stack cropped regions vertically into one image, separated by blank rows."""
+    crops = [image[top:bottom, left:right] for left, top, right, bottom in boxes]
+    width = max(c.shape[1] for c in crops)
+    height = sum(c.shape[0] for c in crops) + gap * (len(crops) - 1)
+    out = np.full((height, width), 255, dtype=np.uint8)
+    y = 0
+    for crop in crops:
+        out[y:y + crop.shape[0], :crop.shape[1]] = crop
+        y += crop.shape[0] + gap
+    return out
+
+
+def load_grayscale(image_path: str | Path, profile: PreprocessProfile) -> Tuple["np.ndarray", Layout]:
+    """Decode an image at its OCR scale as a uint8 grayscale array.
+
+    JPEGs are decoded directly at the reduced size and in grayscale. Other
+    formats are converted as soon as they are decoded, so the full-color
+    copy is freed before any further processing.
+
+    Returns:
+        The grayscale array and the layout of the whole image
+    """
+    with Image.open(image_path) as image:
+        layout = Layout(image.size)
+        scale = _scale_factor(image, profile)
+        size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+        # Lets JPEG decode directly at a reduced size, in grayscale
+        image.draft('L', size)
+        gray = to_grayscale(image, size)
+        layout.scale = size[0] / image.width
+    return gray, layout
+
+
+def tile_bounds(gray: "np.ndarray", tile_height: int = TILE_HEIGHT,
+                search: int = TILE_SEARCH) -> List[Tuple[int, int]]:
+    """Split an image into horizontal tiles, cutting at blank rows where possible.
+
+    Args:
+        gray: uint8 grayscale image
+        tile_height: Largest tile height in rows
+        search: Rows above each cut searched for a blank row
+
+    Returns:
+        [top, bottom) rows of each tile, top to bottom
+    """
+    height = gray.shape[0]
+    bounds = []
+    top = 0
+    while height - top > tile_height:
+        start = max(top + 1, top + tile_height - search)
+        window = gray[start:top + tile_height]
+        # The flattest row is background between lines; prefer the lowest one
+        spread = window.max(axis=1) - window.min(axis=1)
+        cut = start + int(np.flatnonzero(spread == spread.min())[-1])
+        bounds.append((top, cut))
+        top = cut
+    bounds.append((top, height))
+    return bounds
+
+
+def _finish(gray: "np.ndarray", ink: "np.ndarray", profile: PreprocessProfile,
+            layout: Layout) -> Tuple["Image.Image", Layout]:
+    """Binarize and crop a thresholded image, recording its regions in layout."""
+    # Black text on white background
+    out = np.where(ink, 0, 255).astype(np.uint8) if profile.binarize else gray
+
+    if profile.crop_regions:
+        boxes = find_text_regions(ink, profile)
+        if boxes:
+            out = stack_regions(out, boxes)
+            y = 0
+            for box in boxes:
+                layout.regions.append((y, box))
+                y += box[3] - box[1] + STACK_GAP
+    return Image.fromarray(out), layout
+
+
+def preprocess_image(image_path: str | Path, profile: PreprocessProfile) -> "Image.Image":
+    """Prepare a screenshot for OCR.
+
+    Args:
+        image_path: Path to the image file
+        profile: Preprocessing profile
+
+    Returns:
+        Grayscale or black-and-white image ready for Tesseract
+    """
+    return preprocess_with_layout(image_path, profile)[0]
+
+
+def preprocess_with_layout(image_path: str | Path,
+                           profile: PreprocessProfile) -> Tuple["Image.Image", Layout]:
+    """Prepare a screenshot for OCR, recording how to map boxes back.
+
+    Args:
+        image_path: Path to the image file
+        profile: Preprocessing profile
+
+    Returns:
+        The image for Tesseract (as from ``preprocess_image``) and its layout
+    """
+    gray, layout = load_grayscale(image_path, profile)
+    ink = adaptive_threshold(gray, profile.threshold_window, profile.threshold_offset)
+    return _finish(gray, ink, profile, layout)
+
+
+def preprocess_tiles(image_path: str | Path, profile: PreprocessProfile,
+                     tile_height: int = TILE_HEIGHT) -> Iterator[Tuple["Image.Image", Layout]]:
+    """Prepare a screenshot for OCR one horizontal tile at a time.
+
+    Images up to ``tile_height`` rows after scaling are a single tile, the
+    same as ``preprocess_with_layout``. Taller ones are thresholded tile by
+    tile, with ``threshold_window`` rows of context on each side so results
+    at the seams match a whole-image threshold, and tiles are produced
+    lazily so only one is held at a time.
+
+    Args:
+        image_path: Path to the image file
+        profile: Preprocessing profile
+        tile_height: Largest tile height in rows of the scaled image
+
+    Yields:
+        The image for Tesseract and its layout, for each tile top to bottom
+    """
+    gray, whole = load_grayscale(image_path, profile)
+    margin = profile.threshold_window
+    for top, bottom in tile_bounds(gray, tile_height):
+        start, end = max(0, top - margin), min(gray.shape[0], bottom + margin)
+        ink = adaptive_threshold(gray[start:end], profile.threshold_window, profile.threshold_offset)
+        yield _finish(gray[top:bottom], ink[top - start:bottom - start], profile,
+                      Layout(whole.size, whole.scale, offset=top))
@@ -0,0 +1,191 @@
+"""Content-addressed cache of analysis results (OCR text, summaries, categories)."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Default size limit of the cache file's stored values
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Stages results are stored for
+OCR = 'ocr'
+SUMMARY = 'summary'
+CATEGORY = 'category'
+PHASH = 'phash'
+
+# Reads refresh an entry's LRU timestamp at most this often (seconds), so
+# a burst of lookups does not turn into a burst of writes
+_TOUCH_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    version TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (content_hash, stage, version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used);
+"""
+
+
+def default_cache_path(db_path: str | Path) -> Path:
+    """Cache file stored next to the database, e.g. smartshot.cache.db."""
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}.cache{db_path.suffix or '.db'}")
+
+
+def config_version(*parts: Any) -> str:
+    """Short, stable fingerprint of the settings that produced a result."""
+    text = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ResultCache:
+    """Persistent cache of analysis results keyed by file content.
+
+    Entries are keyed on (content hash, stage, version), where the version
+    fingerprints the engine and settings that produced the result, so
+    changing e.g. the OCR profile or the summarizer backend never returns
+    a stale result. The cache lives in its own SQLite file and is bounded
+    by the total size of the stored values; the least recently used
+    entries are evicted first.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 read_only: bool = False):
+        """Open (or create) the cache.
+
+        Args:
+            path: Path to the cache file
+            max_bytes: Size limit of the stored values
+            read_only: Open for lookups only (used by backfill worker processes)
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+            self._total = 0
+        else:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False,
+                                         isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.executescript(_SCHEMA)
+            self._total = self._stored_bytes()
+
+    def get(self, content_hash: str, stage: str, version: str) -> Optional[Any]:
+        """Look up a result.
+
+        Args:
+            content_hash: Digest of the file content
+            stage: Pipeline stage (``OCR``, ``SUMMARY``, ``CATEGORY`` or ``PHASH``)
+            version: Fingerprint of the settings the result must have been made with
+
+        Returns:
+            The stored value, or None if there is none
+        """
+        if not content_hash:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, last_used FROM results "
+                    "WHERE content_hash = ? AND stage = ? AND version = ?",
+                    (content_hash, stage, version)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if not self.read_only and now - row[1] > _TOUCH_INTERVAL:
+                    self._conn.execute(
+                        "UPDATE results SET last_used = ? "
+                        "WHERE content_hash = ? AND stage = ? AND version = ?",
+                        (now, content_hash, stage, version)
+                    )
+            except sqlite3.Error as e:
+                print(f"Result cache lookup failed: {e}")
+                return None
+        return json.loads(row[0])
+
+    def put(self, content_hash: str, stage: str, version: str, value: Any):
+        """Store a result (see ``get``)."""
+        self.put_many([(content_hash, stage, version, value)])
+
+    def put_many(self, entries: Iterable[Tuple[str, str, str, Any]]):
+        """Store several (content_hash, stage, version, value) results in one transaction."""
+        if self.read_only:
+            raise RuntimeError("result cache is open read-only")
+        now = time.time()
+        rows = []
+        for content_hash, stage, version, value in entries:
+            if content_hash and value is not None:
+                encoded = json.dumps(value)
+                rows.append((content_hash, stage, version, encoded, len(encoded), now))
+        if not rows:
+            return
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                for row in rows:
+                    old = self._conn.execute(
+                        "SELECT size FROM results WHERE content_hash = ? AND stage = ? AND version = ?",
+                        row[:3]
+                    ).fetchone()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO results "
+                        "(content_hash, stage, version, value, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                        row
+                    )
+                    self._total += row[4] - (old[0] if old else 0)
+                if self._total > self.max_bytes:
+                    self._evict()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                self._total = self._stored_bytes()
+                print(f"Result cache write failed: {e}")
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is at 90% of its limit."""
+        target = int(self.max_bytes * 0.9)
+        # Another process (e.g. an index run) may have written too
+        self._total = self._stored_bytes()
+        cursor = self._conn.execute(
+            "SELECT content_hash, stage, version, size FROM results ORDER BY last_used"
+        )
+        doomed = []
+        for content_hash, stage, version, size in cursor:
+            if self._total <= target:
+                break
+            doomed.append((content_hash, stage, version))
+            self._total -= size
+        cursor.close()
+        self._conn.executemany(
+            "DELETE FROM results WHERE content_hash = ? AND stage = ? AND version = ?", doomed
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Number of entries and stored bytes."""
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return {'entries': count, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,26 +1,280 @@
 """Text summarization utilities for generating concise filenames."""
-from typing import Optional
+from typing import Callable, Dict, List, Optional, Tuple
+import gc
+import importlib.util
 import re
+import threading
 
-# Lazy load the summarizer to improve startup time
-_summarizer = None
-HAS_TRANSFORMERS = True
+from smartshot.utils.batching import MicroBatcher
+from smartshot.utils.metrics import METRICS
+from smartshot.utils.result_cache import config_version
 
-try:
-    from transformers import pipeline
-except ImportError:
-    HAS_TRANSFORMERS = False
-    print("Warning: transformers not available. Text summarization will use fallback method.")
+# transformers (and torch) take seconds to import, so only check that they
+# are installed here; they are imported when a model is first loaded
+HAS_TRANSFORMERS = importlib.util.find_spec("transformers") is not None
 
-def get_summarizer():
-    """Lazy load the summarizer model."""
-    global _summarizer
-    if _summarizer is None and HAS_TRANSFORMERS:
+# Texts this short are summarized extractively even with a model backend
+MIN_MODEL_WORDS = 10
+
+# Text passed to a model is cut to this many characters. Models truncate to
+# about 1,000 tokens anyway; this keeps the text of a full-page capture from
+# being tokenized (and held in each batch) in full
+MAX_MODEL_CHARS = 12000
+
+
+class SummarizerBackend:
+    """Interface for summarization backends."""
+    name = "base"
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the backend is ready without further loading."""
+        return True
+
+    def load(self):
+        """Load the model, if any. Called before the first summary and by warm-up."""
+
+    def unload(self):
+        """Release the model's memory. It is loaded again on next use."""
+
+    def summarize_many(self, texts: List[str], max_length: int, min_length: int) -> List[str]:
+        """Summarize several texts at once, returning one summary per text."""
+        raise NotImplementedError
+
+
+class ExtractiveBackend(SummarizerBackend):
+    """Zero-cost backend: keeps the first significant words."""
+    name = "extractive"
+
+    def summarize_many(self, texts: List[str], max_length: int, min_length: int) -> List[str]:
+        return [_extractive_summary(text, max_length) for text in texts]
+
+
+class TransformersBackend(SummarizerBackend):
+    """Abstractive summarization with a Hugging Face seq2seq model on CPU."""
+
+    def __init__(self, name: str, model: str, quantize: bool = False):
+        """Initialize the backend without loading the model.
+
+        Args:
+            name: Backend name
+            model: Hugging Face model id
+            quantize: Convert linear layers to int8 after loading (smaller and
+                faster on CPU, slightly less accurate)
+        """
+        self.name = name
+        self.model = model
+        self.quantize = quantize
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._pipeline is not None
+
+    def load(self):
+        with self._lock:
+            if self._pipeline is not None:
+                return
+            from transformers import pipeline
+            summarizer = pipeline("summarization", model=self.model, device=-1)
+            if self.quantize:
+                import torch
+                summarizer.model = torch.quantization.quantize_dynamic(
+                    summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            self._pipeline = summarizer
+
+    def unload(self):
+        with self._lock:
+            self._pipeline = None
+        gc.collect()
+
+    def summarize_many(self, texts: List[str], max_length: int, min_length: int) -> List[str]:
+        self.load()
+        summaries = self._pipeline(
+            texts,
+            max_length=max_length,
+            min_length=min_length,
+            do_sample=False,
+            truncation=True,
+            batch_size=len(texts)
+        )
+        return [s["summary_text"].strip() for s in summaries]
+
+
+# name -> factory; "distilbart" is about a third of the size of bart-large-cnn
+BACKENDS: Dict[str, Callable[[], SummarizerBackend]] = {
+    "extractive": ExtractiveBackend,
+    "distilbart": lambda: TransformersBackend("distilbart", "sshleifer/distilbart-cnn-6-6"),
+    "distilbart-int8": lambda: TransformersBackend(
+        "distilbart-int8", "sshleifer/distilbart-cnn-6-6", quantize=True
+    ),
+    "bart": lambda: TransformersBackend("bart", "facebook/bart-large-cnn"),
+}
+
+DEFAULT_BACKEND = "distilbart" if HAS_TRANSFORMERS else "extractive"
+
+# Seconds without a summary after which model memory is released
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+
+class Summarizer:
+    """Summarization session over a pluggable backend.
+
+    Summaries requested from several threads are grouped into micro-batches
+    and run as one model call. The model can be warmed up in the
+    background so the first screenshot does not wait for it to load, and
+    is unloaded after ``idle_timeout`` seconds without use. If the model
+    cannot be loaded or fails, the extractive backend is used instead.
+    """
+
+    def __init__(self, backend: str = DEFAULT_BACKEND, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 max_batch: int = 8, max_wait: float = 0.05):
+        """Initialize the summarizer without loading any model.
+
+        Args:
+            backend: Backend name (see ``BACKENDS``)
+            idle_timeout: Seconds of inactivity before the model is unloaded (0 = never)
+            max_batch: Maximum texts per model call
+            max_wait: Longest time (seconds) to wait for more texts to batch
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown summarizer backend: {backend}")
+        if backend != "extractive" and not HAS_TRANSFORMERS:
+            print(f"Warning: transformers not available. Using extractive summaries instead of {backend}.")
+            backend = "extractive"
+        self.backend = BACKENDS[backend]()
+        self.fallback = ExtractiveBackend()
+        self.idle_timeout = idle_timeout
+        self._failed = False
+        self._batcher = MicroBatcher(self._run_batch, max_batch=max_batch, max_wait=max_wait,
+                                     name="smartshot-summarizer")
+        self._idle_timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the backend producing summaries, for the result cache."""
+        name = 'extractive' if self._failed else self.backend.name
+        return config_version('summary', name, MIN_MODEL_WORDS)
+
+    def warm_up(self, background: bool = True):
+        """Load the model ahead of the first summary.
+
+        Args:
+            background: Load on a daemon thread instead of blocking
+        """
+        if self.backend.loaded:
+            return
+        if background:
+            threading.Thread(target=self._load, name="smartshot-summarizer-warmup", daemon=True).start()
+        else:
+            self._load()
+
+    def _load(self) -> bool:
+        if self._failed:
+            return False
         try:
-            _summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+            if not self.backend.loaded:
+                with METRICS.time('summarize_load'):
+                    self.backend.load()
         except Exception as e:
             print(f"Warning: Could not load summarization model: {e}")
-            _summarizer = False
+            self._failed = True
+            return False
+        self._schedule_unload()
+        return True
+
+    def summarize(self, text: str, max_length: int = 15, min_length: int = 5) -> str:
+        """Summarize one text, batched with concurrent requests from other threads.
+
+        Args:
+            text: Input text to summarize
+            max_length: Maximum length of the summary
+            min_length: Minimum length of the summary
+
+        Returns:
+            Concise summary of the input text
+        """
+        if not text.strip():
+            return ""
+        with METRICS.time('summarize'):
+            if self._failed or isinstance(self.backend, ExtractiveBackend) \
+                    or len(text.split()) <= MIN_MODEL_WORDS:
+                return _extractive_summary(text, max_length)
+            return self._batcher((text[:MAX_MODEL_CHARS], max_length, min_length))
+
+    def _run_batch(self, items: List[Tuple[str, int, int]]) -> List[str]:
+        """Summarize a micro-batch (runs on the batching thread)."""
+        results: List[Optional[str]] = [None] * len(items)
+        if self._load():
+            # One model call per distinct length setting
+            groups: Dict[Tuple[int, int], List[int]] = {}
+            for i, (_, max_length, min_length) in enumerate(items):
+                groups.setdefault((max_length, min_length), []).append(i)
+            for (max_length, min_length), indexes in groups.items():
+                try:
+                    summaries = self.backend.summarize_many(
+                        [items[i][0] for i in indexes], max_length, min_length
+                    )
+                    for i, summary in zip(indexes, summaries):
+                        results[i] = summary
+                except Exception as e:
+                    print(f"Summarization failed: {e}")
+                    METRICS.error('summarize')
+            self._schedule_unload()
+        return [
+            result if result is not None else _extractive_summary(text, max_length)
+            for result, (text, max_length, _) in zip(results, items)
+        ]
+
+    def _schedule_unload(self):
+        """Restart the idle timer."""
+        if not self.idle_timeout or isinstance(self.backend, ExtractiveBackend):
+            return
+        with self._timer_lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+            self._idle_timer = threading.Timer(self.idle_timeout, self.unload)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def unload(self):
+        """Release the model's memory; it is reloaded on the next summary."""
+        if self.backend.loaded:
+            self.backend.unload()
+            print(f"Unloaded idle summarization model ({self.backend.name})")
+
+    def close(self):
+        """Stop the batching thread and the idle timer."""
+        with self._timer_lock:
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+        self._batcher.close()
+
+
+# Shared summarizer used by summarize_text
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+def get_summarizer() -> Summarizer:
+    """Get the shared summarizer, creating it on first use."""
+    global _summarizer
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = Summarizer()
+    return _summarizer
+
+def configure_summarizer(**kwargs) -> Summarizer:
+    """Replace the shared summarizer with one built from the given Summarizer options."""
+    global _summarizer
+    with _summarizer_lock:
+        old, _summarizer = _summarizer, Summarizer(**kwargs)
+    if old is not None:
+        old.close()
     return _summarizer
 
 def summarize_text(text: str, max_length: int = 15, min_length: int = 5) -> str:
@@ -34,29 +288,7 @@ def summarize_text(text: str, max_length: int = 15, min_length: int = 5) -> str:
     Returns:
         Concise summary of the input text
     """
-    if not text.strip():
-        return ""
-    
-    # Use AI summarization if available
-    if HAS_TRANSFORMERS:
-        try:
-            summarizer = get_summarizer()
-            if summarizer:
-                # Only use summarizer for longer texts
-                if len(text.split()) > 10:
-                    summary = summarizer(
-                        text,
-                        max_length=max_length,
-                        min_length=min_length,
-                        do_sample=False,
-                        truncation=True
-                    )
-                    return summary[0]["summary_text"].strip()
-        except Exception as e:
-            print(f"Summarization failed: {e}")
-    
-    # Fallback to extractive approach
-    return _extractive_summary(text, max_length)
+    return get_summarizer().summarize(text, max_length, min_length)
 
 def _extractive_summary(text: str, max_words: int = 15) -> str:
     """Simple extractive summarization fallback."""
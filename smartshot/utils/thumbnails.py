@@ -0,0 +1,69 @@
+"""Small preview images of screenshots for the web UI."""
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    from PIL import Image, features
+    HAS_PIL = True
+    # WebP is about a third smaller than JPEG for UI screenshots
+    THUMBNAIL_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+except ImportError:
+    HAS_PIL = False
+    THUMBNAIL_FORMAT = 'JPEG'
+
+# Longest edge in pixels of each thumbnail size. "small" fills a 64px list
+# tile at 2x, "medium" the preview dialog.
+THUMBNAIL_SIZES: Dict[str, int] = {
+    'small': 128,
+    'medium': 640,
+}
+
+THUMBNAIL_QUALITY = 80
+
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+@dataclass
+class Thumbnail:
+    """One encoded thumbnail."""
+    size: str
+    data: bytes
+    mime: str
+    width: int
+    height: int
+
+
+def make_thumbnails(image_path: str | Path, sizes: Dict[str, int] = THUMBNAIL_SIZES,
+                    image_format: str = THUMBNAIL_FORMAT,
+                    quality: int = THUMBNAIL_QUALITY) -> List[Thumbnail]:
+    """Encode thumbnails of an image at several sizes.
+
+    The image is decoded once; each size is reduced from the next larger
+    one, so the full-resolution pixels are only resampled once.
+
+    Args:
+        image_path: Path to the image file
+        sizes: Size name -> longest edge in pixels
+        image_format: 'WEBP' or 'JPEG'
+        quality: Encoder quality (0-100)
+
+    Returns:
+        One thumbnail per size (never larger than the image itself)
+    """
+    thumbnails = []
+    options = {'method': 4} if image_format == 'WEBP' else {'optimize': True}
+    with Image.open(image_path) as image:
+        largest = max(sizes.values())
+        # Lets JPEG decode directly at a reduced size
+        image.draft('RGB', (largest, largest))
+        keep_alpha = image_format == 'WEBP' and image.mode in ('RGBA', 'LA', 'P')
+        current = image.convert('RGBA' if keep_alpha else 'RGB')
+    for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        current.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        buffer = io.BytesIO()
+        current.save(buffer, format=image_format, quality=quality, **options)
+        thumbnails.append(Thumbnail(name, buffer.getvalue(), MIME_TYPES[image_format],
+                                    current.width, current.height))
+    return thumbnails
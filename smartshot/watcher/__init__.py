@@ -1,13 +1,35 @@
+import threading
 from pathlib import Path
 from typing import Optional
 from watchdog.observers import Observer
+from smartshot.utils.hashing import DEFAULT_ALGORITHM
+from smartshot.utils.preprocess import DEFAULT_PROFILE
+from smartshot.utils.phash import DEFAULT_MAX_DISTANCE
+from smartshot.utils.summarize import DEFAULT_BACKEND, DEFAULT_IDLE_TIMEOUT
+from smartshot.utils.result_cache import DEFAULT_MAX_BYTES
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL
+from smartshot.utils.memory import DEFAULT_MEMORY_BUDGET
 from .event_handler import ScreenshotHandler
 
 class ScreenshotWatcher:
     """Watches a directory for new screenshots with OCR and context awareness."""
     
     def __init__(self, watch_path: str, enable_ocr: bool = True, enable_rename: bool = True, 
-                 enable_categorize: bool = True, db_path: str = None):
+                 enable_categorize: bool = True, db_path: str = None,
+                 workers: int = 2, queue_size: int = 32,
+                 hash_algorithm: str = DEFAULT_ALGORITHM,
+                 ocr_profile: str = DEFAULT_PROFILE,
+                 near_duplicate_distance: int = DEFAULT_MAX_DISTANCE,
+                 summarizer: str = DEFAULT_BACKEND, warm_up: bool = True,
+                 summarizer_idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 result_cache_bytes: int = DEFAULT_MAX_BYTES,
+                 semantic: bool = False,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+                 enable_thumbnails: bool = True,
+                 recursive: bool = False,
+                 categories_path: Optional[str] = None,
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 rescan: bool = True):
         """Initialize the watcher with the directory to watch.
         
         Args:
@@ -16,15 +38,49 @@ class ScreenshotWatcher:
             enable_rename: Whether to enable automatic file renaming
             enable_categorize: Whether to enable automatic categorization
             db_path: Path to the database file
+            workers: Number of worker threads for hashing, OCR and summarization
+            queue_size: Maximum number of screenshots in flight at once
+            hash_algorithm: Algorithm used to fingerprint files for dedupe
+            ocr_profile: Image preprocessing profile for OCR
+            near_duplicate_distance: Perceptual-hash distance for reusing the
+                analysis of a near-duplicate screenshot (0 disables)
+            summarizer: Summarization backend used for smart filenames
+            warm_up: Load the summarization model in the background at start
+            summarizer_idle_timeout: Seconds of inactivity before the model is unloaded
+            result_cache_bytes: Size limit of the result cache (0 disables it)
+            semantic: Embed each screenshot's text for semantic search
+            embedding_model: sentence-transformers model for the embeddings
+            enable_thumbnails: Whether to store previews for the web UI
+            recursive: Whether to also watch subdirectories (screenshots
+                moved into category folders are not processed again)
+            categories_path: JSON file of custom categories
+            memory_budget: Estimated bytes of decoded images in flight (0 disables)
+            rescan: Queue screenshots added while the watcher was stopped
         """
         self.watch_path = Path(watch_path).expanduser().absolute()
+        self.recursive = recursive
+        self.rescan = rescan
         self.observer = Observer()
         self.handler = ScreenshotHandler(
             self.watch_path,
             enable_ocr=enable_ocr,
             enable_rename=enable_rename,
             enable_categorize=enable_categorize,
-            db_path=db_path
+            db_path=db_path,
+            workers=workers,
+            queue_size=queue_size,
+            hash_algorithm=hash_algorithm,
+            ocr_profile=ocr_profile,
+            near_duplicate_distance=near_duplicate_distance,
+            summarizer=summarizer,
+            warm_up=warm_up,
+            summarizer_idle_timeout=summarizer_idle_timeout,
+            result_cache_bytes=result_cache_bytes,
+            semantic=semantic,
+            embedding_model=embedding_model,
+            enable_thumbnails=enable_thumbnails,
+            categories_path=categories_path,
+            memory_budget=memory_budget
         )
     
     def start(self):
@@ -34,12 +90,18 @@ class ScreenshotWatcher:
             print(f"Created directory: {self.watch_path}")
         
         print(f"Starting to watch: {self.watch_path}")
+        self.handler.start()
         self.observer.schedule(
             self.handler,
             str(self.watch_path),
-            recursive=False
+            recursive=self.recursive
         )
         self.observer.start()
+        # After the observer, so a file added meanwhile is seen by one or
+        # both; the handler queues it once
+        if self.rescan:
+            threading.Thread(target=self.handler.reconcile, args=(self.recursive,),
+                             name="smartshot-reconcile", daemon=True).start()
     
     def stop(self):
         """Stop watching the directory."""
@@ -47,5 +109,6 @@ class ScreenshotWatcher:
         print("Stopped watching directory")
     
     def join(self):
-        """Block until the observer thread is stopped."""
+        """Block until the observer thread is stopped and queued screenshots are processed."""
         self.observer.join()
+        self.handler.stop()
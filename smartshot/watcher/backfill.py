@@ -0,0 +1,434 @@
+"""Bulk indexing of screenshots that already exist on disk."""
+import base64
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from smartshot.db import Database
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL, Embedder, embedding_text
+from smartshot.utils.hashing import DEFAULT_ALGORITHM
+from smartshot.utils.preprocess import DEFAULT_PROFILE
+from smartshot.utils.phash import HASH_BITS, dhash, to_hex
+from smartshot.utils.result_cache import (
+    ResultCache, DEFAULT_MAX_BYTES, OCR, CATEGORY, PHASH, config_version, default_cache_path
+)
+from .event_handler import IMAGE_EXTENSIONS
+
+# Per-process state of pool workers, set up by _init_worker
+_worker = {}
+
+
+def _init_worker(db_path: str, enable_ocr: bool, enable_categorize: bool,
+                 hash_algorithm: str, ocr_profile: str, cache_path: Optional[str]):
+    """Set up a pool worker process."""
+    _worker['enable_ocr'] = enable_ocr
+    _worker['ocr_version'] = None
+    if enable_ocr:
+        from smartshot.utils.ocr import configure_engine
+        _worker['ocr_version'] = configure_engine(profile=ocr_profile).version
+    _worker['hash_algorithm'] = hash_algorithm
+    _worker['categorizer'] = None
+    if enable_categorize:
+        from smartshot.utils.categorize import ScreenshotCategorizer
+        _worker['categorizer'] = ScreenshotCategorizer()
+    # Read-only connection used to look up cached digests and to skip OCR
+    # for content that is already stored
+    try:
+        _worker['db'] = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        _worker['db'] = None
+    # Results are looked up here; new ones go back to the parent, which writes them
+    _worker['results'] = None
+    if cache_path:
+        try:
+            _worker['results'] = ResultCache(cache_path, read_only=True)
+        except Exception:
+            pass
+
+
+def _cached_result(file_hash: str, stage: str, version: str):
+    results = _worker.get('results')
+    return results.get(file_hash, stage, version) if results is not None else None
+
+
+def _is_known_hash(file_hash: str) -> bool:
+    conn = _worker.get('db')
+    if conn is None:
+        return False
+    try:
+        return conn.execute(
+            "SELECT 1 FROM screenshots WHERE file_hash = ? LIMIT 1", (file_hash,)
+        ).fetchone() is not None
+    except sqlite3.Error:
+        return False
+
+
+def _cached_hash(file_path: str, size: int, mtime_ns: int) -> Optional[str]:
+    conn = _worker.get('db')
+    if conn is None:
+        return None
+    try:
+        row = conn.execute(
+            "SELECT digest FROM file_hashes "
+            "WHERE file_path = ? AND file_size = ? AND mtime_ns = ? AND algorithm = ?",
+            (file_path, size, mtime_ns, _worker['hash_algorithm'])
+        ).fetchone()
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+def _line_confidences(packed: Optional[bytes]) -> Optional[List[Tuple[str, float]]]:
+    """(text, confidence) of each packed OCR line, for the categorizer."""
+    if not packed:
+        return None
+    from smartshot.utils.ocr_lines import unpack_lines
+    return [(line.text, line.confidence) for line in unpack_lines(packed).lines]
+
+
+def _analyze_files(files: List[Tuple[str, int, int]]) -> List[dict]:
+    """Hash, OCR and categorize a chunk of files inside a pool worker.
+
+    Args:
+        files: (path, size, mtime_ns) tuples
+
+    Returns:
+        One result dictionary per file
+    """
+    results = []
+    to_ocr = []
+    for file_path, size, mtime_ns in files:
+        result = {'file_path': file_path, 'duplicate': False, 'hash_cached': True,
+                  'cache_entries': []}
+        results.append(result)
+        file_hash = _cached_hash(file_path, size, mtime_ns)
+        if file_hash is None:
+            result['hash_cached'] = False
+            file_hash = Database._calculate_file_hash(file_path, _worker['hash_algorithm'])
+        result['file_hash'] = file_hash
+        if not file_hash:
+            result['error'] = "could not read file"
+        elif _is_known_hash(file_hash):
+            result['duplicate'] = True
+        else:
+            to_ocr.append(result)
+            # Stored so the watcher can recognize later near-duplicates
+            phash_version = config_version('dhash', HASH_BITS)
+            result['phash'] = _cached_result(file_hash, PHASH, phash_version)
+            if result['phash'] is None:
+                try:
+                    result['phash'] = to_hex(dhash(file_path))
+                    result['cache_entries'].append((file_hash, PHASH, phash_version, result['phash']))
+                except Exception:
+                    result['phash'] = None
+
+    if _worker['enable_ocr'] and to_ocr:
+        from smartshot.utils.ocr import recognize_images
+        version = _worker['ocr_version']
+        uncached = []
+        for result in to_ocr:
+            cached = _cached_result(result['file_hash'], OCR, version)
+            if cached is None:
+                uncached.append(result)
+            else:
+                result['ocr_text'], result['ocr_confidence'] = cached['text'], cached['confidence']
+                if cached.get('lines'):
+                    result['ocr_lines'] = base64.b64decode(cached['lines'])
+        # One OCR call per chunk amortizes tesseract startup
+        recognized = recognize_images([r['file_path'] for r in uncached]) if uncached else []
+        for result, ocr in zip(uncached, recognized):
+            result['ocr_text'], result['ocr_confidence'] = ocr.text, ocr.confidence
+            result['ocr_lines'] = ocr.pack()
+            if ocr.ok or ocr.text == "[No text detected]":
+                result['cache_entries'].append((result['file_hash'], OCR, version, {
+                    'text': ocr.text, 'confidence': ocr.confidence,
+                    'lines': base64.b64encode(result['ocr_lines']).decode('ascii')
+                    if result['ocr_lines'] else None,
+                }))
+
+    categorizer = _worker['categorizer']
+    if categorizer is not None:
+        version = categorizer.version
+        uncached = []
+        for result in to_ocr:
+            result['category'] = _cached_result(result['file_hash'], CATEGORY, version)
+            if result['category'] is None:
+                uncached.append(result)
+        categories = categorizer.categorize_batch(
+            (r.get('ocr_text') or '', None, None, _line_confidences(r.get('ocr_lines')))
+            for r in uncached
+        )
+        for result, (category, _) in zip(uncached, categories):
+            result['category'] = category
+            result['cache_entries'].append((result['file_hash'], CATEGORY, version, category))
+    return results
+
+
+@dataclass
+class IndexStats:
+    """Progress counters for an indexing run."""
+    total_files: int = 0
+    total_bytes: int = 0
+    processed: int = 0
+    processed_bytes: int = 0
+    indexed: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    errors: int = 0
+    interrupted: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return max(time.monotonic() - self.started_at, 1e-9)
+
+    @property
+    def files_per_second(self) -> float:
+        return self.processed / self.elapsed
+
+    @property
+    def mb_per_second(self) -> float:
+        return self.processed_bytes / self.elapsed / (1024 * 1024)
+
+
+class ScreenshotIndexer:
+    """Indexes an existing screenshot directory tree into the database.
+
+    Files are analyzed in a process pool and written in batched
+    transactions. Every committed batch is durable, and files whose
+    path, size and mtime are already recorded are skipped without being
+    read, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, db_path: str = "smartshot.db", workers: Optional[int] = None,
+                 batch_size: int = 200, chunk_size: int = 8, enable_ocr: bool = True,
+                 enable_categorize: bool = True,
+                 hash_algorithm: str = DEFAULT_ALGORITHM,
+                 ocr_profile: str = DEFAULT_PROFILE,
+                 result_cache_bytes: int = DEFAULT_MAX_BYTES,
+                 semantic: bool = False,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+                 on_progress: Optional[Callable[[IndexStats], None]] = None,
+                 progress_interval: float = 1.0):
+        """Initialize the indexer.
+
+        Args:
+            db_path: Path to the database file
+            workers: Number of worker processes (default: CPU count)
+            batch_size: Number of rows written per transaction
+            chunk_size: Number of files handed to a worker at once (OCR'd in one batch)
+            enable_ocr: Whether to perform OCR on indexed files
+            enable_categorize: Whether to categorize indexed files
+            hash_algorithm: Algorithm used to fingerprint files for dedupe
+            ocr_profile: Image preprocessing profile for OCR
+            result_cache_bytes: Size limit of the cache of OCR and category
+                results by file content (0 disables the cache)
+            semantic: Embed the text of indexed files for semantic search,
+                one model batch per written batch of rows
+            embedding_model: sentence-transformers model for the embeddings
+            on_progress: Called with the current stats while indexing
+            progress_interval: Minimum seconds between progress callbacks
+        """
+        self.db_path = db_path
+        self.db = Database(db_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.enable_ocr = enable_ocr
+        self.enable_categorize = enable_categorize
+        self.hash_algorithm = hash_algorithm
+        self.ocr_profile = ocr_profile
+        self.results = None
+        if result_cache_bytes > 0:
+            try:
+                self.results = ResultCache(default_cache_path(db_path), max_bytes=result_cache_bytes)
+            except Exception as e:
+                print(f"Result cache unavailable: {e}")
+        self.embedder = Embedder(embedding_model) if semantic else None
+        self.vectors = None
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+
+    def scan(self, root: Path) -> Tuple[List[Tuple[str, int, int]], int]:
+        """Find image files under root that are not yet recorded.
+
+        Args:
+            root: Directory to walk recursively
+
+        Returns:
+            Tuple of ([(path, size, mtime_ns), ...], number of unchanged files skipped)
+        """
+        known = self.db.get_file_states(root)
+        pending = []
+        unchanged = 0
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if not name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) == (st.st_size, st.st_mtime_ns):
+                    unchanged += 1
+                    continue
+                pending.append((path, st.st_size, st.st_mtime_ns))
+        return pending, unchanged
+
+    def run(self, root) -> IndexStats:
+        """Index every new or changed image under root.
+
+        Args:
+            root: Directory to index
+
+        Returns:
+            Final statistics for the run
+        """
+        root = Path(root).expanduser().absolute()
+        pending, unchanged = self.scan(root)
+
+        stats = IndexStats(
+            total_files=len(pending),
+            total_bytes=sum(size for _, size, _ in pending),
+            unchanged=unchanged
+        )
+        file_info: Dict[str, Tuple[int, int]] = {path: (size, mtime_ns) for path, size, mtime_ns in pending}
+        seen_hashes = set()
+        batch = []
+        hash_rows = []
+        ocr_rows = []
+        cache_entries = []
+        last_report = 0.0
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.db_path, self.enable_ocr, self.enable_categorize,
+                      self.hash_algorithm, self.ocr_profile,
+                      str(self.results.path) if self.results else None)
+        )
+        chunks = (pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size))
+        in_flight = set()
+        # Keep a couple of chunks per worker queued so workers never sit idle,
+        # without materializing a future for every file up front
+        max_in_flight = self.workers * 2
+        try:
+            while True:
+                for chunk in chunks:
+                    in_flight.add(executor.submit(_analyze_files, chunk))
+                    if len(in_flight) >= max_in_flight:
+                        break
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                results = [result for future in done for result in future.result()]
+                for result in results:
+                    size, mtime_ns = file_info.pop(result['file_path'])
+                    stats.processed += 1
+                    stats.processed_bytes += size
+
+                    cache_entries.extend(result.get('cache_entries', ()))
+                    if result.get('error'):
+                        stats.errors += 1
+                        continue
+                    if not result['hash_cached']:
+                        hash_rows.append({
+                            'file_path': result['file_path'],
+                            'file_size': size,
+                            'mtime_ns': mtime_ns,
+                            'algorithm': self.hash_algorithm,
+                            'digest': result['file_hash'],
+                        })
+                    if result['duplicate'] or result['file_hash'] in seen_hashes:
+                        stats.duplicates += 1
+                        continue
+                    seen_hashes.add(result['file_hash'])
+                    batch.append(self._make_row(result, size, mtime_ns))
+                    if result.get('ocr_lines'):
+                        ocr_rows.append({
+                            'file_hash': result['file_hash'],
+                            'line_count': len(_line_confidences(result['ocr_lines'])),
+                            'data': result['ocr_lines'],
+                        })
+
+                if len(batch) + len(hash_rows) >= self.batch_size:
+                    batch, hash_rows, ocr_rows, cache_entries = self._flush(
+                        batch, hash_rows, ocr_rows, cache_entries, stats
+                    )
+
+                now = time.monotonic()
+                if self.on_progress and now - last_report >= self.progress_interval:
+                    last_report = now
+                    self.on_progress(stats)
+        except KeyboardInterrupt:
+            stats.interrupted = True
+            for future in in_flight:
+                future.cancel()
+        finally:
+            executor.shutdown(wait=not stats.interrupted, cancel_futures=True)
+            # Keep everything analyzed so far; the next run picks up the rest
+            self._flush(batch, hash_rows, ocr_rows, cache_entries, stats)
+
+        if self.on_progress:
+            self.on_progress(stats)
+        return stats
+
+    def _flush(self, batch: List[dict], hash_rows: List[dict], ocr_rows: List[dict],
+               cache_entries: List[tuple],
+               stats: IndexStats) -> Tuple[List[dict], List[dict], List[dict], List[tuple]]:
+        """Write pending screenshot rows, digests, OCR lines and cached results, returning new empty lists."""
+        if batch and self.embedder is not None:
+            ids = self.db.write_batch(batch)
+            stats.indexed += len(ids)
+            self._embed(batch, ids)
+        elif batch:
+            stats.indexed += self.db.add_screenshots_bulk(batch)
+        # Cached digests let the next run skip re-reading files, including duplicates
+        self.db.store_file_hashes(hash_rows)
+        if ocr_rows:
+            self.db.store_ocr_lines(ocr_rows)
+        if self.results is not None and cache_entries:
+            self.results.put_many(cache_entries)
+        return [], [], [], []
+
+    def _embed(self, rows: List[dict], ids: Dict[str, int]):
+        """Embed the text of written rows and append the vectors to the semantic index."""
+        rows = [row for row in rows if row['file_path'] in ids]
+        try:
+            vectors = self.embedder.embed([
+                embedding_text(row['ocr_text'], row['window_title'], row['file_name']) for row in rows
+            ])
+            if self.vectors is None:
+                from smartshot.db.vectors import VectorIndex, default_vectors_path
+                self.vectors = VectorIndex(default_vectors_path(self.db_path), vectors.shape[1],
+                                           self.embedder.model)
+            self.vectors.add([ids[row['file_path']] for row in rows], vectors)
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+
+    @staticmethod
+    def _make_row(result: dict, size: int, mtime_ns: int) -> dict:
+        """Build a screenshot row from a worker result."""
+        path = Path(result['file_path'])
+        return {
+            'file_path': str(path),
+            'file_name': path.name,
+            'file_size': size,
+            'file_mtime_ns': mtime_ns,
+            'file_hash': result['file_hash'],
+            'category': result.get('category'),
+            'app_name': None,
+            'window_title': None,
+            'ocr_text': result.get('ocr_text'),
+            'ocr_confidence': result.get('ocr_confidence'),
+            'phash': result.get('phash'),
+            # Use the file's own timestamp so old screenshots sort correctly
+            'created_at': datetime.utcfromtimestamp(mtime_ns / 1e9),
+        }
@@ -0,0 +1,220 @@
+"""Coalescing of filesystem events into one dispatch per finished file."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# Seconds a file's size and mtime must stay unchanged before it is treated
+# as completely written
+STABLE_FOR = 0.3
+
+# Seconds between checks of pending files
+POLL_INTERVAL = 0.1
+
+# Seconds after which a file that keeps changing is dispatched anyway
+MAX_WAIT = 60.0
+
+# Recently handled files remembered to suppress repeated events
+RECENT_FILES = 4096
+
+
+def file_identity(stat: os.stat_result) -> Tuple[int, int, int, int]:
+    """Key for a file's content that survives renames.
+
+    Renames and moves within a filesystem keep the device, inode, size and
+    mtime, so a file keeps its identity when it is renamed; rewriting it
+    changes the identity.
+    """
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class RecentFiles:
+    """Bounded set of recently seen keys, evicting the least recently used."""
+
+    def __init__(self, maxsize: int = RECENT_FILES):
+        self.maxsize = maxsize
+        self._keys: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable) -> bool:
+        """Remember a key; returns False if it was already present."""
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.maxsize:
+                self._keys.popitem(last=False)
+            return True
+
+
+@dataclass
+class _Pending:
+    """A file that has had events but is not dispatched yet."""
+    data: Any
+    first_seen: float
+    changed_at: float
+    signature: Optional[Tuple[int, int]] = None
+    closed: bool = False
+
+
+class EventCoalescer:
+    """Turns bursts of created/modified/moved/closed events into one dispatch.
+
+    Screenshot tools write a file in several chunks, or write a temporary
+    file and rename it, so a single screenshot produces a burst of events
+    and the first one arrives before the file is complete. Each path with
+    events is kept pending until its size and mtime have not changed for
+    ``stable_for`` seconds (or for one check once a close-after-write
+    event, inotify only, says the writer is done), and is then passed to
+    ``dispatch`` exactly once from a background thread. A pending path
+    that is renamed is followed to its new name; one that is deleted is
+    dropped.
+    """
+
+    def __init__(self, dispatch: Callable[[Path, Any], None], stable_for: float = STABLE_FOR,
+                 poll_interval: float = POLL_INTERVAL, max_wait: float = MAX_WAIT,
+                 name: str = "smartshot-coalescer"):
+        """Initialize the coalescer.
+
+        Args:
+            dispatch: Called with (path, data) once a file is complete. It
+                may block (e.g. on a full pipeline); events are still
+                recorded meanwhile.
+            stable_for: Seconds size and mtime must stay unchanged
+            poll_interval: Seconds between checks of pending files
+            max_wait: Seconds after which a still-changing file is dispatched
+            name: Name of the background thread
+        """
+        self.dispatch = dispatch
+        self.stable_for = stable_for
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait
+        self.name = name
+        self._pending: Dict[Path, _Pending] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def __contains__(self, path: Path) -> bool:
+        with self._cond:
+            return Path(path) in self._pending
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def start(self):
+        """Start the background thread."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread; files still pending are dropped."""
+        with self._cond:
+            self._running = False
+            self._pending.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def touch(self, path: Path, data: Any = None, closed: bool = False):
+        """Record an event on a path.
+
+        Args:
+            path: File the event is about
+            data: Passed to ``dispatch``; only kept from the first event
+            closed: Whether the event says the writer closed the file (any
+                other event means it may be writing again)
+        """
+        now = time.monotonic()
+        with self._cond:
+            entry = self._pending.get(Path(path))
+            if entry is None:
+                entry = self._pending[Path(path)] = _Pending(data, now, now)
+            entry.changed_at = now
+            entry.closed = closed
+            self._cond.notify()
+
+    def move(self, src: Path, dest: Path) -> bool:
+        """Follow a pending file to its new name.
+
+        Returns:
+            False if src was not pending
+        """
+        with self._cond:
+            entry = self._pending.pop(Path(src), None)
+            if entry is None:
+                return False
+            entry.changed_at = time.monotonic()
+            self._pending[Path(dest)] = entry
+            self._cond.notify()
+            return True
+
+    def discard(self, path: Path):
+        """Forget a pending path (it was deleted)."""
+        with self._cond:
+            self._pending.pop(Path(path), None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending and self._running:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(self.poll_interval)
+                if not self._running:
+                    return
+                ready = self._collect_ready()
+            for path, data in ready:
+                try:
+                    self.dispatch(path, data)
+                except Exception as e:
+                    print(f"Dispatching {path} failed: {e}")
+
+    def _collect_ready(self):
+        """Remove and return the pending files that are complete (lock held)."""
+        now = time.monotonic()
+        ready = []
+        for path, entry in list(self._pending.items()):
+            try:
+                stat = path.stat()
+            except OSError:
+                # Gone without a delete event, e.g. renamed out of the watched tree
+                del self._pending[path]
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature != entry.signature:
+                entry.signature = signature
+                entry.changed_at = now
+                continue
+            if not stat.st_size:
+                # Created but nothing written yet
+                if now - entry.first_seen >= self.max_wait:
+                    del self._pending[path]
+                continue
+            # After a close, one unchanged check is enough; the wait still
+            # lets a tool rename its temporary file before it is dispatched
+            if (entry.closed or now - entry.changed_at >= self.stable_for
+                    or now - entry.first_seen >= self.max_wait):
+                del self._pending[path]
+                ready.append((path, entry.data))
+        return ready
@@ -1,7 +1,11 @@
+import base64
+import json
 import logging
+import os
 import re
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional
 
@@ -9,17 +13,48 @@ import shutil
 from watchdog.events import FileSystemEventHandler
 from pathlib import Path
 
-from smartshot.utils.ocr import extract_text_from_image
+from smartshot.utils.ocr import OCREngine
+from smartshot.utils.ocr_lines import MIN_SUMMARY_CONFIDENCE, confident_text, unpack_lines
+from smartshot.utils.preprocess import DEFAULT_PROFILE
 from smartshot.utils.context import get_active_window_info, get_simplified_app_name
-from smartshot.utils.summarize import summarize_text, clean_filename
+from smartshot.utils.summarize import (
+    Summarizer, clean_filename, DEFAULT_BACKEND, DEFAULT_IDLE_TIMEOUT
+)
 from smartshot.utils.categorize import ScreenshotCategorizer
-from smartshot.db import Database, Screenshot
+from smartshot.utils.hashing import HashCache, hash_file, DEFAULT_ALGORITHM
+from smartshot.utils.phash import (
+    NearDuplicateIndex, DEFAULT_MAX_DISTANCE, HASH_BITS, dhash, images_match, to_hex, from_hex
+)
+from smartshot.utils.result_cache import (
+    ResultCache, DEFAULT_MAX_BYTES, OCR, SUMMARY, CATEGORY, PHASH,
+    config_version, default_cache_path
+)
+from smartshot.utils.embeddings import DEFAULT_MODEL as DEFAULT_EMBEDDING_MODEL, Embedder, embedding_text
+from smartshot.utils.thumbnails import THUMBNAIL_SIZES, make_thumbnails
+from smartshot.utils.metrics import METRICS, MetricsExporter, default_metrics_path
+from smartshot.utils.memory import DEFAULT_MEMORY_BUDGET, MemoryBudget, peak_rss_bytes
+from smartshot.db import Database, Screenshot, PENDING, READY, FAILED, QUEUED, RUNNING, STORED, MOVING
+from smartshot.db.thumbnails import ThumbnailPack, default_pack_path
+from smartshot.db.writer import DatabaseWriter
+from .coalescer import EventCoalescer, RecentFiles, file_identity
+from .pipeline import ProcessingPipeline
+from .jobs import JobScheduler, MAX_ATTEMPTS, PRIORITY_BACKFILL, PRIORITY_NEW, retry_delay
+
+# File extensions treated as screenshots
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif')
 
 class ScreenshotHandler(FileSystemEventHandler):
     """Handles filesystem events for screenshot files with OCR and context awareness."""
     
     def __init__(self, watch_path, enable_ocr=True, enable_rename=True, 
-                 enable_categorize=True, db_path=None):
+                 enable_categorize=True, db_path=None, workers=2, queue_size=32,
+                 hash_algorithm=DEFAULT_ALGORITHM, ocr_profile=DEFAULT_PROFILE,
+                 near_duplicate_distance=DEFAULT_MAX_DISTANCE,
+                 summarizer=DEFAULT_BACKEND, warm_up=True,
+                 summarizer_idle_timeout=DEFAULT_IDLE_TIMEOUT,
+                 result_cache_bytes=DEFAULT_MAX_BYTES, semantic=False,
+                 embedding_model=DEFAULT_EMBEDDING_MODEL, enable_thumbnails=True,
+                 categories_path=None, memory_budget=DEFAULT_MEMORY_BUDGET):
         """Initialize the screenshot handler.
         
         Args:
@@ -28,17 +63,190 @@ class ScreenshotHandler(FileSystemEventHandler):
             enable_rename: Whether to automatically rename files
             enable_categorize: Whether to categorize screenshots
             db_path: Path to the SQLite database file
+            workers: Number of worker threads for OCR and summarization
+            queue_size: Maximum number of screenshot jobs in the pipeline
+            hash_algorithm: Algorithm used to fingerprint files for dedupe
+            ocr_profile: Image preprocessing profile for OCR ("fast", "accurate" or "none")
+            near_duplicate_distance: Largest perceptual-hash distance (in bits) at
+                which an earlier screenshot's OCR, summary and category are
+                reused (0 disables near-duplicate detection)
+            summarizer: Summarization backend used for smart filenames
+            warm_up: Load the summarization model in the background at start
+            summarizer_idle_timeout: Seconds without a summary before the model
+                is unloaded (0 keeps it loaded)
+            result_cache_bytes: Size limit of the cache of OCR, summary and
+                category results by file content (0 disables the cache)
+            semantic: Compute an embedding of each screenshot's text for
+                semantic search (needs sentence-transformers)
+            embedding_model: sentence-transformers model for the embeddings
+            enable_thumbnails: Store small previews for the web UI in the
+                thumbnail pack next to the database
+            categories_path: JSON file of custom categories (see
+                ``ScreenshotCategorizer``); the defaults if None
+            memory_budget: Estimated bytes of decoded images being analyzed
+                at once; larger screenshots wait for each other (0 disables)
         """
         self.watch_path = Path(watch_path)
         self.enable_ocr = enable_ocr
         self.enable_rename = enable_rename
         self.enable_categorize = enable_categorize
-        self.processed_files = set()  # Track processed files to avoid duplicates
+        # Files already dispatched, by identity rather than path, so the
+        # events caused by our own renames and moves are ignored
+        self.handled = RecentFiles()
+        # Set by stop, ending a reconcile scan still running
+        self._stopping = threading.Event()
         self.logger = self._setup_logging()
         
         # Initialize categorizer and database
-        self.categorizer = ScreenshotCategorizer()
-        self.db = Database(db_path or "smartshot.db")
+        self.categories_path = Path(categories_path) if categories_path else None
+        self.categorizer = ScreenshotCategorizer(self.categories_path)
+        self.ocr = OCREngine(profile=ocr_profile)
+        self.summarizer = Summarizer(summarizer, idle_timeout=summarizer_idle_timeout)
+        self.warm_up = warm_up
+        self.db_path = db_path or "smartshot.db"
+        self.db = Database(self.db_path)
+        self.hash_cache = HashCache(self.db, hash_algorithm)
+        self.writer = DatabaseWriter(self.db)
+        self.results = None
+        if result_cache_bytes > 0:
+            try:
+                self.results = ResultCache(
+                    default_cache_path(self.db_path), max_bytes=result_cache_bytes
+                )
+            except Exception as e:
+                print(f"Result cache unavailable: {e}")
+        
+        self.thumbnails = None
+        if enable_thumbnails:
+            try:
+                self.thumbnails = ThumbnailPack(default_pack_path(self.db_path))
+            except OSError as e:
+                print(f"Thumbnails unavailable: {e}")
+        
+        # Embeddings for semantic search; the vector file is opened once the
+        # first vector tells its size
+        self.embedder = None
+        self.vectors = None
+        if semantic:
+            try:
+                self.embedder = Embedder(embedding_model)
+            except Exception as e:
+                print(f"Semantic indexing unavailable: {e}")
+        
+        # Hashes of files being stored, so that two copies of the same image
+        # arriving together are not both stored
+        self._inflight_hashes = set()
+        self._hash_lock = threading.Lock()
+        
+        # Perceptual hashes of stored screenshots, for near-duplicate lookup
+        self.near_duplicates = None
+        self._phash_lock = threading.Lock()
+        if near_duplicate_distance > 0:
+            self.near_duplicates = NearDuplicateIndex(near_duplicate_distance)
+            try:
+                self.near_duplicates.update(
+                    (row_id, from_hex(value)) for row_id, value in self.db.get_perceptual_hashes()
+                )
+            except Exception as e:
+                print(f"Loading perceptual hashes failed: {e}")
+        
+        # Workers take a share of this before decoding a screenshot
+        self.memory = MemoryBudget(memory_budget)
+        
+        # New screenshots are stored at once (see enqueue); their analysis
+        # runs as jobs on a worker pool, and the rename, move and update of
+        # each are committed in order. Every finished job makes room for
+        # the next one.
+        self.pipeline = ProcessingPipeline(
+            self._analyze_screenshot,
+            self._commit_screenshot,
+            workers=workers,
+            queue_size=queue_size,
+            on_done=lambda: self.scheduler.wake()
+        )
+        self.scheduler = JobScheduler(self.db, self.pipeline)
+        
+        # Bursts of events per file become one dispatch once it is complete
+        self.coalescer = EventCoalescer(self._dispatch)
+        
+        # Stage timings and counters, written next to the database for
+        # `smartshot search stats --pipeline` and the web server
+        METRICS.gauge('queue_depth', lambda: self.pipeline.depth)
+        METRICS.gauge('jobs_queued', lambda: self.db.get_job_counts().get(QUEUED, 0))
+        METRICS.gauge('memory_reserved_bytes', lambda: self.memory.reserved)
+        METRICS.gauge('peak_rss_bytes', peak_rss_bytes)
+        METRICS.gauge('pending_files', lambda: len(self.coalescer))
+        self.metrics = MetricsExporter(default_metrics_path(self.db_path))
+    
+    def start(self):
+        """Start the processing pipeline."""
+        self._stopping.clear()
+        self.pipeline.start()
+        self.scheduler.start()
+        self.coalescer.start()
+        self.metrics.start()
+        if self.enable_rename and self.warm_up:
+            self.summarizer.warm_up()
+    
+    def stop(self, wait: bool = True):
+        """Stop the processing pipeline.
+        
+        Jobs not started yet stay queued in the database and run when the
+        watcher starts again.
+        
+        Args:
+            wait: Whether to finish the jobs already in the pipeline before returning
+        """
+        self._stopping.set()
+        self.coalescer.stop()
+        self.scheduler.stop()
+        self.pipeline.stop(wait=wait)
+        # Commits queued by the pipeline are written before returning
+        self.writer.close()
+        self.summarizer.close()
+        if self.embedder is not None:
+            self.embedder.close()
+        if self.thumbnails is not None:
+            self.thumbnails.close()
+        if self.results is not None:
+            self.results.close()
+        self.metrics.stop()
+    
+    def wait_for_jobs(self, timeout: Optional[float] = None, poll: float = 0.1) -> bool:
+        """Block until no job is running or due (retries still waiting are not waited for).
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+            poll: Seconds between checks
+            
+        Returns:
+            True once idle, False if the timeout expired first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.writer.flush()
+            counts = self.db.get_job_counts(due_before=datetime.utcnow())
+            if not counts.get(QUEUED) and not counts.get(RUNNING) and self.pipeline.depth == 0:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll)
+    
+    def reload_categories(self) -> ScreenshotCategorizer:
+        """Re-read the categories file; screenshots from now on use the new categories.
+        
+        Returns:
+            The new categorizer
+        """
+        if self.categories_path is not None:
+            # A broken file is reported and the current categories kept,
+            # rather than falling back to the defaults
+            json.loads(self.categories_path.read_text(encoding='utf-8'))
+        # Replaced in one assignment, so a worker categorizing right now
+        # uses either the old or the new categories, never a mix
+        self.categorizer = ScreenshotCategorizer(self.categories_path)
+        print(f"Reloaded {len(self.categorizer.categories)} categories")
+        return self.categorizer
     
     def _setup_logging(self):
         """Configure logging to file."""
@@ -53,52 +261,150 @@ class ScreenshotHandler(FileSystemEventHandler):
     
     def on_created(self, event):
         """Called when a file or directory is created."""
+        if not event.is_directory and self._is_image(event.src_path):
+            self._track(Path(event.src_path))
+    
+    def on_modified(self, event):
+        """Called when a file is written to; delays a pending screenshot."""
+        if not event.is_directory and Path(event.src_path) in self.coalescer:
+            self.coalescer.touch(Path(event.src_path))
+    
+    def on_closed(self, event):
+        """Called when a file opened for writing is closed (inotify only)."""
+        if not event.is_directory and Path(event.src_path) in self.coalescer:
+            self.coalescer.touch(Path(event.src_path), closed=True)
+    
+    def on_moved(self, event):
+        """Called when a file is renamed, e.g. a tool's temporary file to its final name."""
         if event.is_directory:
             return
-            
-        file_path = Path(event.src_path)
+        src, dest = Path(event.src_path), Path(event.dest_path)
+        if self.coalescer.move(src, dest):
+            if not self._is_image(dest):
+                self.coalescer.discard(dest)
+        elif self._is_image(dest):
+            self._track(dest)
+    
+    def on_deleted(self, event):
+        """Called when a file is deleted."""
+        if not event.is_directory:
+            self.coalescer.discard(Path(event.src_path))
+    
+    @staticmethod
+    def _is_image(path: str | Path) -> bool:
+        return Path(path).suffix.lower() in IMAGE_EXTENSIONS
+    
+    def _track(self, file_path: Path):
+        """Start waiting for a new file to be complete."""
+        if file_path in self.coalescer:
+            self.coalescer.touch(file_path)
+            return
+        # Capture the window context now; by the time the file is complete
+        # and a worker picks it up, the user may have switched windows
+        try:
+            context = get_active_window_info()
+        except Exception as e:
+            print(f"Context detection failed: {e}")
+            context = {"title": "Unknown", "app": "Unknown"}
+        self.coalescer.touch(file_path, context)
+    
+    def _dispatch(self, file_path: Path, context: dict):
+        """Queue a completely written file for processing (runs on the coalescer thread)."""
+        if file_path.name.startswith('.'):
+            # A tool's temporary file; it is tracked again once renamed
+            return
+        try:
+            identity = file_identity(file_path.stat())
+        except OSError:
+            return
+        # Renaming or moving a screenshot (ours, or the user's) keeps its
+        # identity, so it is not processed again under the new name
+        if not self.handled.add(identity):
+            return
+        self.enqueue(file_path, context)
+    
+    def reconcile(self, recursive: bool = False) -> int:
+        """Queue the screenshots that appeared while the watcher was not running.
         
-        # Check if it's an image file and we haven't processed it yet
-        if (file_path.suffix.lower() in ('.png', '.jpg', '.jpeg', '.bmp', '.tiff', '.gif') and 
-            str(file_path) not in self.processed_files):
-            
-            # Add small delay to ensure file is fully written
-            time.sleep(0.5)
+        The watch directory is compared with the recorded size and mtime of
+        every file under it, stored or skipped as a duplicate (range queries
+        on the path indexes), so only new or changed files are hashed; a
+        folder of 100k screenshots is a directory listing and a dictionary
+        lookup per file.
+        
+        Args:
+            recursive: Whether to also scan subdirectories
             
-            # Check if file still exists (might have been moved/deleted)
-            if not file_path.exists():
-                return
-                
-            self.processed_files.add(str(file_path))
-            self._process_screenshot(file_path)
+        Returns:
+            Number of screenshots queued
+        """
+        queued = 0
+        with METRICS.time('reconcile'):
+            try:
+                known = self.db.get_file_states(self.watch_path)
+            except Exception as e:
+                print(f"Reconciling {self.watch_path} failed: {e}")
+                return 0
+            for dirpath, dirnames, filenames in os.walk(self.watch_path):
+                if not recursive:
+                    dirnames.clear()
+                for name in filenames:
+                    if self._stopping.is_set():
+                        return queued
+                    if name.startswith('.') or not self._is_image(name):
+                        continue
+                    file_path = Path(dirpath) / name
+                    try:
+                        stat = file_path.stat()
+                    except OSError:
+                        continue
+                    state = known.get(str(file_path))
+                    # Rows from before mtimes were recorded count as unchanged
+                    if state is not None and (state[1] is None or state == (stat.st_size, stat.st_mtime_ns)):
+                        continue
+                    # Being written, or already queued by an event since the start
+                    if file_path in self.coalescer or not self.handled.add(file_identity(stat)):
+                        continue
+                    if self.enqueue(file_path, {"title": "Unknown", "app": "Unknown"},
+                                    priority=PRIORITY_BACKFILL,
+                                    captured=datetime.utcfromtimestamp(stat.st_mtime)):
+                        queued += 1
+        if queued:
+            print(f"Queued {queued} screenshots added while the watcher was stopped")
+        return queued
     
-    def _generate_smart_filename(self, file_path: Path, context: dict, ocr_text: str = None) -> str:
+    def _generate_smart_filename(self, file_path: Path, context: dict, ocr_text: str = None,
+                                 ocr_summary: str = None, captured: Optional[datetime] = None) -> str:
         """Generate a smart filename based on context and OCR content.
         
         Args:
             file_path: Path to the screenshot file
             context: Dictionary containing window/app context
             ocr_text: Optional pre-extracted OCR text
+            ocr_summary: Optional pre-computed summary of the OCR text
+            captured: Local time the screenshot was taken (now if None)
             
         Returns:
             New filename (without extension)
         """
         # Get base parts
         app_name = get_simplified_app_name(context)
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        timestamp = (captured or datetime.now()).strftime("%Y-%m-%d_%H-%M-%S")
         
         # Get OCR content if enabled and not already provided
         ocr_content = ""
         if self.enable_ocr and ocr_text is None:
             try:
-                ocr_text = extract_text_from_image(file_path)
+                ocr_text = self.ocr.extract(file_path)
             except Exception as e:
                 print(f"OCR failed for {file_path}: {e}")
                 ocr_text = "[OCR failed]"
             
-        if ocr_text and isinstance(ocr_text, str) and not ocr_text.startswith("["):
+        if ocr_summary:
+            ocr_content = clean_filename(ocr_summary)
+        elif ocr_text and isinstance(ocr_text, str) and not ocr_text.startswith("["):
             try:
-                ocr_summary = summarize_text(ocr_text)
+                ocr_summary = self.summarizer.summarize(ocr_text)
                 ocr_content = clean_filename(ocr_summary)
             except Exception as e:
                 print(f"Summarization failed: {e}")
@@ -133,69 +439,333 @@ class ScreenshotHandler(FileSystemEventHandler):
         
         return filename
 
-    def _process_screenshot(self, file_path: Path):
-        """Process a new screenshot file with OCR, context awareness, and categorization."""
+    def enqueue(self, file_path: Path, context: Optional[dict] = None,
+                priority: int = PRIORITY_NEW, captured: Optional[datetime] = None) -> bool:
+        """Store a new screenshot right away and queue a job to analyze it.
+        
+        The row (path, hash, size, time and window context) is searchable
+        as soon as it is written, with status ``pending``. OCR, summary,
+        category, rename and move follow when the job runs.
+        
+        Args:
+            file_path: Path to the screenshot file
+            context: Window context captured when the file appeared (looked
+                up now if None)
+            priority: Job priority; higher runs first (see ``smartshot.watcher.jobs``)
+            captured: UTC capture time (now if None)
+            
+        Returns:
+            True if the screenshot was stored, False if it was skipped
+        """
+        file_hash = ""
+        started = time.perf_counter()
         try:
-            # Check if file still exists
+            # Check if file still exists (might have been moved/deleted)
             if not file_path.exists():
                 print(f"File no longer exists: {file_path}")
-                return
+                METRICS.count('screenshots', 'missing')
+                return False
                 
             # Get file info
-            file_size = file_path.stat().st_size
+            stat = file_path.stat()
+            file_size = stat.st_size
             
-            # Skip very small files (likely incomplete)
-            if file_size < 1024:  # Less than 1KB
-                print(f"Skipping small file: {file_path} ({file_size} bytes)")
-                return
-                
-            timestamp = datetime.fromtimestamp(file_path.stat().st_mtime)
+            # The coalescer only dispatches files that have stopped changing,
+            # but one can still be truncated before it is stored
+            if file_size == 0:
+                print(f"Skipping empty file: {file_path}")
+                METRICS.count('screenshots', 'empty')
+                return False
             
             # Check for duplicates using file hash
             try:
-                file_hash = self.db._calculate_file_hash(str(file_path))
-                if file_hash and self.db.get_screenshot_by_hash(file_hash):
-                    print(f"Duplicate file detected, skipping: {file_path}")
-                    return
+                # Hash once here; the digest is stored with the row
+                with METRICS.time('hash'):
+                    file_hash = (
+                        self.hash_cache.get(file_path, file_size, stat.st_mtime_ns)
+                        or hash_file(file_path, self.hash_cache.algorithm)
+                    )
+                if file_hash:
+                    with self._hash_lock:
+                        duplicate = file_hash in self._inflight_hashes
+                        self._inflight_hashes.add(file_hash)
+                    if duplicate or self.db.get_screenshot_by_hash(file_hash):
+                        print(f"Duplicate file detected, skipping: {file_path}")
+                        METRICS.count('screenshots', 'duplicate')
+                        self._publish('duplicate', 'warning', 'Duplicate screenshot skipped',
+                                      file_name=file_path.name)
+                        if not duplicate:
+                            self._release_hash(file_hash)
+                        # A duplicate left in place is not read again by later rescans
+                        self.writer.store_file_hash({
+                            'file_path': str(file_path),
+                            'file_size': file_size,
+                            'mtime_ns': stat.st_mtime_ns,
+                            'algorithm': self.hash_cache.algorithm,
+                            'digest': file_hash,
+                        })
+                        return False
             except Exception as e:
                 print(f"Hash calculation failed: {e}")
                 file_hash = ""
             
-            # Get window/app context
-            try:
-                context = get_active_window_info()
-            except Exception as e:
-                print(f"Context detection failed: {e}")
-                context = {"title": "Unknown", "app": "Unknown"}
-                
-            app_name = context.get('app', 'Unknown')
-            window_title = context.get('title', 'Unknown')
+            if context is None:
+                try:
+                    context = get_active_window_info()
+                except Exception as e:
+                    print(f"Context detection failed: {e}")
+                    context = {"title": "Unknown", "app": "Unknown"}
+            
+            # The job is written in the same transaction as the row, and
+            # finds it by path
+            saved = self.writer.add_screenshot({
+                'file_path': str(file_path),
+                'file_name': file_path.name,
+                'file_size': file_size,
+                'file_mtime_ns': stat.st_mtime_ns,
+                'file_hash': file_hash,
+                'app_name': context.get('app', 'Unknown'),
+                'window_title': context.get('title', 'Unknown'),
+                'status': PENDING,
+                'created_at': captured or datetime.utcnow(),
+            })
+            # A new file at the path of an older one starts a fresh job
+            self.writer.store_job({
+                'file_path': str(file_path), 'priority': priority, 'state': QUEUED, 'attempts': 0,
+                'next_attempt_at': datetime.utcnow(), 'last_error': None, 'stage': STORED,
+                'moved_to': None,
+            })
+            if file_hash:
+                self.writer.store_file_hash({
+                    'file_path': str(file_path),
+                    'file_size': file_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'algorithm': self.hash_cache.algorithm,
+                    'digest': file_hash,
+                })
+            self._publish('queued', 'info', 'Screenshot queued', file_name=file_path.name,
+                          file_path=file_path)
+            saved.add_done_callback(lambda future: self._on_stored(future, file_hash, started))
+            return True
+        except Exception as e:
+            self._release_hash(file_hash)
+            METRICS.count('screenshots', 'failed')
+            error_msg = f"Error storing {file_path}: {str(e)}"
+            self.logger.error(error_msg)
+            print(f"ERROR: {error_msg}")
+            self._publish('error', 'error', 'Storing screenshot failed', file_name=file_path.name,
+                          details=str(e))
+            return False
+
+    def _on_stored(self, future, file_hash: str, started: float):
+        """Handle a new screenshot's row and job being written (runs on the writer thread)."""
+        try:
+            if future.result() is not None:
+                # From the file being complete to it being searchable
+                METRICS.observe('store', time.perf_counter() - started)
+                self.scheduler.wake()
+        except Exception as e:
+            print(f"Database save failed: {e}")
+            METRICS.count('screenshots', 'failed')
+        finally:
+            # Further copies are now found in the database
+            self._release_hash(file_hash)
+
+    def _analyze_screenshot(self, job: dict) -> dict:
+        """OCR, summarize and categorize a stored screenshot (runs on a pipeline worker).
+        
+        Args:
+            job: Job claimed by the scheduler (see ``Database.claim_jobs``)
+            
+        Returns:
+            Dictionary of results for ``_commit_screenshot``; on failure, the
+            job and its error
+        """
+        file_path = Path(job['file_path'])
+        # Interrupted after moving the file, before updating its row
+        if not file_path.exists() and job.get('moved_to') and Path(job['moved_to']).exists():
+            file_path = Path(job['moved_to'])
+        # Waits while other large screenshots are being decoded
+        with self.memory.admit(file_path):
+            return self._analyze(job, file_path)
+
+    def _analyze(self, job: dict, file_path: Path) -> dict:
+        """Body of ``_analyze_screenshot``, run within the memory budget."""
+        file_hash = job['file_hash']
+        file_size = job['file_size']
+        app_name = job['app_name']
+        window_title = job['window_title']
+        context = {'app': app_name, 'title': window_title}
+        # Names carry the local time the screenshot was taken, not analyzed
+        captured = job['created_at'].replace(tzinfo=timezone.utc).astimezone()
+        started = time.perf_counter()
+        try:
+            # Moved or deleted since it was stored: retrying will not help
+            if not file_path.exists():
+                print(f"File no longer exists: {file_path}")
+                METRICS.count('screenshots', 'missing')
+                return {'job': job, 'error': "File no longer exists", 'retry': False}
+            
+            # Identical content seen before (e.g. restored from a backup)
+            # reuses the cached results of each stage below
+            cached_ocr = self._cache_get(file_hash, OCR, self.ocr.version) if self.enable_ocr else None
+            phash = self._perceptual_hash(file_path, file_hash)
+            
+            # A near-duplicate of a stored screenshot (same window, a cursor
+            # blink or clock tick apart) reuses its OCR, summary and category
+            original = self._find_near_duplicate(file_path, phash) if cached_ocr is None else None
+            if original is not None:
+                print(f"Near-duplicate of {original.file_name}, reusing its analysis")
+                METRICS.count('reused', 'near_duplicate')
+                new_name = None
+                if self.enable_rename:
+                    try:
+                        new_name = self._generate_smart_filename(
+                            file_path, context, original.ocr_text, ocr_summary=original.summary,
+                            captured=captured
+                        )
+                    except Exception as e:
+                        print(f"Filename generation failed: {e}")
+                return {
+                    'job': job,
+                    'status': READY,
+                    'file_path': file_path,
+                    'file_size': file_size,
+                    'file_hash': file_hash,
+                    'phash': phash,
+                    'app_name': app_name,
+                    'window_title': window_title,
+                    'ocr_text': original.ocr_text,
+                    'ocr_confidence': original.ocr_confidence,
+                    # Nearly identical pixels: the lines are where they were
+                    'ocr_lines': self.db.get_ocr_lines(original.file_hash),
+                    'summary': original.summary,
+                    'category': original.category if self.enable_categorize else None,
+                    'new_name': new_name,
+                    'embedding': self._embed(original.ocr_text, window_title, file_path.name),
+                    'thumbnails': self._make_thumbnails(file_path, file_hash),
+                    'started': started,
+                }
             
             # Extract text using OCR if enabled
             ocr_text = None
             ocr_confidence = None
-            if self.enable_ocr:
+            # Packed lines (see smartshot.utils.ocr_lines) and the decoded lines
+            ocr_lines = None
+            lines = []
+            if cached_ocr is not None:
+                ocr_text, ocr_confidence = cached_ocr['text'], cached_ocr['confidence']
+                if cached_ocr.get('lines'):
+                    ocr_lines = base64.b64decode(cached_ocr['lines'])
+                    lines = unpack_lines(ocr_lines).lines
+            elif self.enable_ocr:
                 try:
-                    ocr_text = extract_text_from_image(file_path)
-                    if ocr_text and not ocr_text.startswith('['):  # Skip error messages
-                        ocr_confidence = 0.9  # Placeholder confidence value
+                    result = self.ocr.recognize(file_path)
+                    ocr_text, ocr_confidence = result.text, result.confidence
+                    lines, ocr_lines = result.lines, result.pack()
+                    # Failures are retried next time; only real results are cached
+                    if result.ok or ocr_text == "[No text detected]":
+                        self._cache_put(file_hash, OCR, self.ocr.version, {
+                            'text': ocr_text, 'confidence': ocr_confidence,
+                            'lines': base64.b64encode(ocr_lines).decode('ascii') if ocr_lines else None,
+                        })
                 except Exception as e:
                     print(f"OCR processing failed: {e}")
+                    METRICS.error('ocr')
                     ocr_text = f"[OCR Error: {str(e)}]"
+            # Tesseract crashing or timing out is usually temporary: try again
+            # later, and on the last attempt store what the other stages found
+            ocr_failed = bool(ocr_text) and ocr_text.startswith("[OCR Error")
+            if ocr_failed and job['attempts'] < MAX_ATTEMPTS:
+                return {'job': job, 'error': ocr_text}
+            if ocr_confidence is not None:
+                self._publish('ocr_completed', 'success', 'Text extracted', file_name=file_path.name,
+                              details=f"{len(lines)} lines, {ocr_confidence:.0%} confidence")
             
             # Categorize the screenshot
             category = None
             if self.enable_categorize:
+                # One categorizer throughout, even if the categories are reloaded meanwhile
+                categorizer = self.categorizer
+                category = self._cache_get(file_hash, CATEGORY, categorizer.version)
+                if category is None:
+                    try:
+                        with METRICS.time('categorize'):
+                            category, confidence = categorizer.categorize(
+                                ocr_text or '',
+                                app_name=app_name,
+                                window_title=window_title,
+                                lines=[(line.text, line.confidence) for line in lines]
+                            )
+                        self._cache_put(file_hash, CATEGORY, categorizer.version, category)
+                    except Exception as e:
+                        print(f"Categorization failed: {e}")
+                        category = "Uncategorized"
+            
+            # Summarize and generate the new filename here so they run in parallel;
+            # the summary is stored so near-duplicates can reuse it
+            summary = None
+            new_name = None
+            if self.enable_rename:
+                if ocr_confidence is not None:
+                    # Low-confidence lines are mostly noise; leaving them out
+                    # gives the summarizer less (and better) text to read
+                    summary_version = config_version(self.summarizer.version, MIN_SUMMARY_CONFIDENCE)
+                    summary = self._cache_get(file_hash, SUMMARY, summary_version)
+                    if summary is None:
+                        try:
+                            summary = self.summarizer.summarize(confident_text(lines) or ocr_text)
+                            self._cache_put(file_hash, SUMMARY, summary_version, summary)
+                        except Exception as e:
+                            print(f"Summarization failed: {e}")
                 try:
-                    category, confidence = self.categorizer.categorize(
-                        ocr_text or '',
-                        app_name=app_name,
-                        window_title=window_title
+                    new_name = self._generate_smart_filename(
+                        file_path, context, ocr_text, ocr_summary=summary, captured=captured
                     )
                 except Exception as e:
-                    print(f"Categorization failed: {e}")
-                    category = "Uncategorized"
+                    print(f"Filename generation failed: {e}")
+            
+            return {
+                'job': job,
+                'status': FAILED if ocr_failed else READY,
+                'file_path': file_path,
+                'file_size': file_size,
+                'file_hash': file_hash,
+                'phash': phash,
+                'app_name': app_name,
+                'window_title': window_title,
+                'ocr_text': ocr_text,
+                'ocr_confidence': ocr_confidence,
+                'ocr_lines': ocr_lines,
+                'summary': summary,
+                'category': category,
+                'new_name': new_name,
+                'embedding': self._embed(ocr_text, window_title, file_path.name),
+                'thumbnails': self._make_thumbnails(file_path, file_hash),
+                'started': started,
+            }
             
+        except Exception as e:
+            error_msg = f"Error processing {file_path}: {str(e)}"
+            self.logger.error(error_msg)
+            print(f"ERROR: {error_msg}")
+            import traceback
+            traceback.print_exc()
+            return {'job': job, 'error': str(e)}
+
+    def _commit_screenshot(self, result: dict):
+        """Rename and move an analyzed screenshot and update its row (runs on the committer thread)."""
+        job = result['job']
+        if 'error' in result:
+            self._job_failed(job, result['error'], retry=result.get('retry', True))
+            return
+        file_path = result['file_path']
+        file_size = result['file_size']
+        app_name = result['app_name']
+        window_title = result['window_title']
+        category = result['category']
+        new_name = result['new_name']
+        try:
             # Log the event
             log_message = (
                 f"New screenshot: {file_path.name}\n"
@@ -209,67 +779,97 @@ class ScreenshotHandler(FileSystemEventHandler):
             print("\n" + "="*50)
             print(log_message)
             
-            # Generate new filename if renaming is enabled
-            new_path = file_path
-            if self.enable_rename:
-                try:
-                    new_name = self._generate_smart_filename(file_path, context, ocr_text)
-                    if new_name and new_name != file_path.stem:
-                        new_path = file_path.with_name(f"{new_name}{file_path.suffix}")
-                        
-                        # Handle name conflicts
-                        counter = 1
-                        original_new_path = new_path
-                        while new_path.exists() and new_path != file_path:
-                            new_path = original_new_path.with_stem(f"{original_new_path.stem}_{counter}")
-                            counter += 1
-                        
-                        # Rename the file if the new name is different
-                        if new_path != file_path:
-                            file_path.rename(new_path)
-                            rename_msg = f"Renamed to: {new_path.name}"
-                            self.logger.info(rename_msg)
-                            print(rename_msg)
-                except Exception as e:
-                    print(f"File renaming failed: {e}")
-                    new_path = file_path
+            if not file_path.exists():
+                self._job_failed(job, "File no longer exists", retry=False)
+                return
             
-            # Categorize and move to category folder if enabled
+            # The final name and folder are worked out first, so the file is
+            # moved once, with its destination on record before it moves
+            new_path = file_path
+            if self.enable_rename and new_name and new_name != file_path.stem:
+                new_path = file_path.with_name(f"{new_name}{file_path.suffix}")
             if self.enable_categorize and category and category != 'Uncategorized':
+                new_path = self.watch_path / category / new_path.name
+            
+            # Handle name conflicts
+            counter = 1
+            original_new_path = new_path
+            while new_path.exists() and new_path != file_path:
+                new_path = original_new_path.with_stem(f"{original_new_path.stem}_{counter}")
+                counter += 1
+            
+            if new_path != file_path:
+                stage = 'move' if new_path.parent != file_path.parent else 'rename'
                 try:
-                    category_dir = self.watch_path / category
-                    category_dir.mkdir(exist_ok=True)
-                    
-                    target_path = category_dir / new_path.name
-                    if target_path != new_path:  # Avoid moving to the same location
-                        # Handle conflicts in category directory
-                        counter = 1
-                        original_target = target_path
-                        while target_path.exists():
-                            target_path = original_target.with_stem(f"{original_target.stem}_{counter}")
-                            counter += 1
-                            
-                        shutil.move(str(new_path), str(target_path))
-                        new_path = target_path
+                    # Written before the move, so a job interrupted from here
+                    # on finds the file at one of its two paths
+                    self.db.store_jobs([{'screenshot_id': job['screenshot_id'], 'stage': MOVING,
+                                         'moved_to': str(new_path)}])
+                    new_path.parent.mkdir(exist_ok=True)
+                    with METRICS.time(stage):
+                        shutil.move(str(file_path), str(new_path))
+                    if new_path.name != file_path.name:
+                        rename_msg = f"Renamed to: {new_path.name}"
+                        self.logger.info(rename_msg)
+                        print(rename_msg)
+                    if stage == 'move':
                         print(f"Moved to category: {category}")
                 except Exception as e:
-                    print(f"Category organization failed: {e}")
+                    print(f"Moving {file_path.name} failed: {e}")
+                    METRICS.error(stage)
+                    new_path = file_path
             
-            # Store in database if enabled
+            # Update the stored row. The writer thread groups rows into batched
+            # transactions; a screenshot set to ready has its job deleted
+            # in the same one.
             try:
                 if self.db:
-                    self.db.add_screenshot(
-                        file_path=str(new_path),
-                        file_name=new_path.name,
-                        file_size=file_size,
-                        category=category,
-                        app_name=app_name,
-                        window_title=window_title,
-                        ocr_text=ocr_text
+                    mtime_ns = new_path.stat().st_mtime_ns
+                    phash = result.get('phash')
+                    embedding = result.get('embedding')
+                    saved = self.writer.update_screenshot({
+                        'id': job['screenshot_id'],
+                        'file_path': str(new_path),
+                        'file_name': new_path.name,
+                        'file_mtime_ns': mtime_ns,
+                        'category': category,
+                        'ocr_text': result['ocr_text'],
+                        'ocr_confidence': result.get('ocr_confidence'),
+                        'summary': result.get('summary'),
+                        'phash': to_hex(phash) if phash is not None else None,
+                        'status': result['status'],
+                    })
+                    if result['status'] == FAILED:
+                        self.writer.store_job({'screenshot_id': job['screenshot_id'], 'state': FAILED,
+                                               'last_error': result['ocr_text']})
+                    started = result.get('started')
+                    saved.add_done_callback(
+                        lambda future: self._on_saved(future, phash, embedding, started)
                     )
-                    print("Saved to database")
+                    # Queued after the row, so it is written with (or after) it and gets its id
+                    self._publish('screenshot_processed', 'success', 'New screenshot processed',
+                                  file_name=new_path.name, details=category or 'Uncategorized',
+                                  file_path=new_path)
+                    if result.get('thumbnails'):
+                        self._store_thumbnails(result['file_hash'], result['thumbnails'])
+                    if result.get('ocr_lines') and result['file_hash']:
+                        self.writer.store_ocr_lines({
+                            'file_hash': result['file_hash'],
+                            'line_count': len(unpack_lines(result['ocr_lines']).lines),
+                            'data': result['ocr_lines'],
+                        })
+                    if result['file_hash']:
+                        # Renames and moves keep size and mtime, so rescans can reuse the digest
+                        self.writer.store_file_hash({
+                            'file_path': str(new_path),
+                            'file_size': file_size,
+                            'mtime_ns': mtime_ns,
+                            'algorithm': self.hash_cache.algorithm,
+                            'digest': result['file_hash'],
+                        })
             except Exception as e:
                 print(f"Database save failed: {e}")
+                METRICS.count('screenshots', 'failed')
             
             print("="*50 + "\n")
             
@@ -279,7 +879,201 @@ class ScreenshotHandler(FileSystemEventHandler):
             print(f"ERROR: {error_msg}")
             import traceback
             traceback.print_exc()
-        finally:
-            # Clean up processed files set to prevent memory leaks
-            if len(self.processed_files) > 1000:
-                self.processed_files.clear()
+            self._job_failed(job, str(e))
+
+    def _job_failed(self, job: dict, error: str, retry: bool = True):
+        """Schedule a retry of a failed job, or give up on it (runs on the committer thread).
+        
+        Args:
+            job: The failed job
+            error: What went wrong, kept on the job
+            retry: Whether another attempt could succeed
+        """
+        file_name = Path(job['file_path']).name
+        try:
+            if retry and job['attempts'] < MAX_ATTEMPTS:
+                delay = retry_delay(job['attempts'])
+                print(f"Analysis of {file_name} failed ({error}), retrying in {delay:.0f}s")
+                METRICS.count('jobs', 'retried')
+                self.writer.store_job({
+                    'screenshot_id': job['screenshot_id'],
+                    'state': QUEUED,
+                    'last_error': error,
+                    'next_attempt_at': datetime.utcnow() + timedelta(seconds=delay),
+                })
+                self._publish('retry', 'warning', 'Analysis failed, will retry', file_name=file_name,
+                              details=error, file_path=job['file_path'])
+                return
+            print(f"Giving up on {file_name}: {error}")
+            METRICS.count('screenshots', 'failed')
+            # The row keeps its metadata, so the screenshot can still be found
+            self.writer.update_screenshot({'id': job['screenshot_id'], 'status': FAILED})
+            self.writer.store_job({'screenshot_id': job['screenshot_id'], 'state': FAILED,
+                                   'last_error': error})
+            self._publish('error', 'error', 'Processing failed', file_name=file_name, details=error,
+                          file_path=job['file_path'])
+        except Exception as e:
+            print(f"Recording job failure failed: {e}")
+
+    def _on_saved(self, future, phash: Optional[int], embedding=None,
+                  started: Optional[float] = None):
+        """Handle an analyzed screenshot's row being updated (runs on the writer thread)."""
+        try:
+            screenshot_id = future.result()
+            if screenshot_id is None:
+                return
+            METRICS.completed()
+            if started is not None:
+                # From a worker picking the file up to its row being committed
+                METRICS.observe('total', time.perf_counter() - started)
+            if phash is not None and self.near_duplicates is not None:
+                with self._phash_lock:
+                    self.near_duplicates.add(screenshot_id, phash)
+            if embedding is not None:
+                self._store_embedding(screenshot_id, embedding)
+            print("Saved to database")
+        except Exception as e:
+            print(f"Database save failed: {e}")
+            METRICS.count('screenshots', 'failed')
+    
+    def _publish(self, type: str, status: str, message: str, file_name: Optional[str] = None,
+                 details: Optional[str] = None, file_path: Optional[Path] = None):
+        """Append an event to the change log the Node server relays to the dashboards.
+        
+        Args:
+            type: Event type (queued, duplicate, ocr_completed, screenshot_processed,
+                retry or error)
+            status: info, success, warning or error
+            message: Short description shown in the activity feed
+            file_name: Name of the screenshot
+            details: Extra text, e.g. the category
+            file_path: Stored path of the screenshot, to look up its row id
+        """
+        try:
+            self.writer.add_event({
+                'type': type, 'status': status, 'message': message, 'details': details,
+                'file_name': file_name, 'file_path': str(file_path) if file_path else None,
+                'created_at': datetime.utcnow(),
+            })
+        except Exception as e:
+            print(f"Publishing event failed: {e}")
+    
+    def _make_thumbnails(self, file_path: Path, file_hash: str):
+        """Encode the thumbnails of a screenshot unless its content already has them."""
+        if self.thumbnails is None or not file_hash:
+            return None
+        try:
+            if self.db.has_thumbnails(file_hash, THUMBNAIL_SIZES):
+                return None
+            with METRICS.time('thumbnails'):
+                return make_thumbnails(file_path)
+        except Exception as e:
+            print(f"Thumbnail generation failed: {e}")
+            return None
+    
+    def _store_thumbnails(self, file_hash: str, thumbnails):
+        """Append thumbnails to the pack and queue their locations (committer thread)."""
+        try:
+            locations = self.thumbnails.append([thumb.data for thumb in thumbnails])
+            for thumb, (offset, length) in zip(thumbnails, locations):
+                self.writer.store_thumbnail({
+                    'file_hash': file_hash,
+                    'size': thumb.size,
+                    'offset': offset,
+                    'length': length,
+                    'mime': thumb.mime,
+                    'width': thumb.width,
+                    'height': thumb.height,
+                })
+        except Exception as e:
+            print(f"Storing thumbnails failed: {e}")
+    
+    def _embed(self, ocr_text: Optional[str], window_title: Optional[str], file_name: str):
+        """Embed a screenshot's text for semantic search, or return None.
+        
+        Runs on the worker threads; concurrent calls share one model batch.
+        """
+        if self.embedder is None:
+            return None
+        try:
+            with METRICS.time('embed'):
+                return self.embedder.submit(embedding_text(ocr_text, window_title, file_name)).result()
+        except Exception as e:
+            print(f"Embedding failed: {e}")
+            return None
+    
+    def _store_embedding(self, screenshot_id: int, embedding):
+        """Append a stored screenshot's vector to the semantic index."""
+        try:
+            if self.vectors is None:
+                from smartshot.db.vectors import VectorIndex, default_vectors_path
+                self.vectors = VectorIndex(default_vectors_path(self.db_path), len(embedding),
+                                           self.embedder.model)
+            self.vectors.add([screenshot_id], embedding[None, :])
+        except Exception as e:
+            print(f"Storing embedding failed: {e}")
+    
+    def _cache_get(self, file_hash: str, stage: str, version: str):
+        """Look up a cached result for this content, or None."""
+        if self.results is None or not file_hash:
+            return None
+        value = self.results.get(file_hash, stage, version)
+        if value is not None:
+            METRICS.count('cache_hits', stage)
+        return value
+    
+    def _cache_put(self, file_hash: str, stage: str, version: str, value):
+        """Store a result for this content, if caching is enabled."""
+        if self.results is not None and file_hash:
+            self.results.put(file_hash, stage, version, value)
+    
+    def _perceptual_hash(self, file_path: Path, file_hash: str) -> Optional[int]:
+        """Perceptual hash of a file (None if near-duplicate detection is off or it fails)."""
+        if self.near_duplicates is None:
+            return None
+        version = config_version('dhash', HASH_BITS)
+        cached = self._cache_get(file_hash, PHASH, version)
+        if cached is not None:
+            return from_hex(cached)
+        try:
+            with METRICS.time('phash'):
+                phash = dhash(file_path)
+        except Exception as e:
+            print(f"Perceptual hash failed: {e}")
+            return None
+        self._cache_put(file_hash, PHASH, version, to_hex(phash))
+        return phash
+    
+    def _find_near_duplicate(self, file_path: Path, phash: Optional[int]) -> Optional[Screenshot]:
+        """Look up a stored screenshot that is a near-duplicate of a file.
+        
+        Args:
+            file_path: Path to the screenshot file
+            phash: Perceptual hash of the file
+            
+        Returns:
+            The matching Screenshot, or None
+        """
+        if self.near_duplicates is None or phash is None:
+            return None
+        
+        with self._phash_lock:
+            matches = self.near_duplicates.query(phash)
+        for screenshot_id, _ in matches:
+            original = self.db.get_screenshot(screenshot_id)
+            if original is None or not Path(original.file_path).exists():
+                continue
+            # Different text in the same window layout can hash alike, so
+            # confirm against the pixels before reusing anything
+            try:
+                if images_match(file_path, original.file_path):
+                    return original
+            except Exception as e:
+                print(f"Near-duplicate check failed: {e}")
+        return None
+
+    def _release_hash(self, file_hash: str):
+        """Forget that a file with this hash is in the pipeline."""
+        if file_hash:
+            with self._hash_lock:
+                self._inflight_hashes.discard(file_hash)
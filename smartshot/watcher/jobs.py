@@ -0,0 +1,92 @@
+"""Scheduling of deferred screenshot analysis from the persistent job queue."""
+import threading
+from typing import Optional
+
+from .pipeline import ProcessingPipeline
+
+# New screenshots go ahead of older work, such as files found by a rescan
+PRIORITY_NEW = 10
+PRIORITY_BACKFILL = 0
+
+# Attempts before a job is given up. Failed attempts are retried after
+# RETRY_DELAY seconds, doubling each time up to MAX_RETRY_DELAY
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = 3600.0
+
+# Seconds between checks for jobs whose retry became due; new jobs and
+# finished ones wake the scheduler right away
+POLL_INTERVAL = 2.0
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that failed its nth attempt."""
+    return min(RETRY_DELAY * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+
+
+class JobScheduler:
+    """Feeds queued jobs to the processing pipeline, highest priority first.
+
+    Jobs are claimed from the database only as workers free up (two per
+    worker, so none sits idle), rather than filling the pipeline's whole
+    queue. A screenshot captured during a long backlog therefore waits for
+    the few jobs already running, not for the backlog.
+    """
+
+    def __init__(self, db, pipeline: ProcessingPipeline, poll_interval: float = POLL_INTERVAL):
+        """Initialize the scheduler without starting it.
+
+        Args:
+            db: Database holding the jobs
+            pipeline: Pipeline the claimed jobs are submitted to
+            poll_interval: Seconds between checks for retries that became due
+        """
+        self.db = db
+        self.pipeline = pipeline
+        self.poll_interval = poll_interval
+        self.max_in_flight = min(pipeline.workers * 2, pipeline.queue_size)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Requeue jobs interrupted by an unclean exit and start scheduling."""
+        if self._thread is not None:
+            return
+        try:
+            requeued = self.db.requeue_running_jobs()
+            if requeued:
+                print(f"Resuming {requeued} interrupted jobs")
+        except Exception as e:
+            print(f"Requeuing jobs failed: {e}")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="smartshot-scheduler", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Check for jobs now, e.g. after one was queued or finished."""
+        self._wake.set()
+
+    def stop(self):
+        """Stop claiming jobs; those already claimed still finish in the pipeline."""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Cleared before claiming, so a wake-up during the claim is not lost
+            self._wake.clear()
+            free = self.max_in_flight - self.pipeline.depth
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = self.db.claim_jobs(free)
+                except Exception as e:
+                    print(f"Claiming jobs failed: {e}")
+            for job in jobs:
+                self.pipeline.submit(job)
+            self._wake.wait(self.poll_interval)
@@ -0,0 +1,151 @@
+"""Concurrent processing pipeline for new screenshots."""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger('screenshot_watcher')
+
+# Sentinel telling the committer thread to exit
+_STOP = object()
+
+
+class ProcessingPipeline:
+    """Runs screenshot analysis in a worker pool and commits results in order.
+
+    Items flow through two stages:
+
+    1. ``analyze`` (OCR, summarization, categorization) runs concurrently
+       on a pool of ``workers`` threads.
+    2. ``commit`` (rename, move, database write) runs on a single committer
+       thread, in the order the items were submitted.
+
+    At most ``queue_size`` items are in flight at any time. ``submit`` blocks
+    while the pipeline is full, which pushes back on the producer instead of
+    letting work pile up without bound.
+    """
+
+    def __init__(self, analyze: Callable[[Any], Any], commit: Callable[[Any], None],
+                 workers: int = 2, queue_size: int = 32, name: str = "smartshot",
+                 on_done: Optional[Callable[[], None]] = None):
+        """Initialize the pipeline.
+
+        Args:
+            analyze: Function run on a worker thread for each item. Returning
+                None drops the item without committing it.
+            commit: Function run on the committer thread with each analysis result
+            workers: Number of analysis worker threads
+            queue_size: Maximum number of items in flight (queued or being processed)
+            name: Prefix used for thread names
+            on_done: Called on the committer thread after each item is
+                finished and its slot is free
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self._analyze = analyze
+        self._commit = commit
+        self._on_done = on_done
+        self._name = name
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._pending = queue.Queue()
+        self._executor = None
+        self._committer = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+    @property
+    def depth(self) -> int:
+        """Number of items submitted but not yet committed."""
+        with self._lock:
+            return self._in_flight
+
+    def start(self):
+        """Start the worker pool and the committer thread."""
+        if self._running:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix=f"{self._name}-worker"
+        )
+        self._committer = threading.Thread(
+            target=self._commit_loop,
+            name=f"{self._name}-committer",
+            daemon=True
+        )
+        self._running = True
+        self._committer.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Queue an item for processing.
+
+        Blocks while ``queue_size`` items are already in flight.
+
+        Args:
+            item: Work item passed to ``analyze``
+            timeout: Maximum seconds to wait for a free slot (None waits forever)
+
+        Returns:
+            True if the item was queued, False if the timeout expired
+        """
+        if not self._running:
+            raise RuntimeError("Pipeline is not running")
+
+        if not self._slots.acquire(timeout=timeout):
+            return False
+
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(self._analyze, item)
+        self._pending.put((item, future))
+        return True
+
+    def join(self):
+        """Block until every submitted item has been committed."""
+        self._pending.join()
+
+    def stop(self, wait: bool = True):
+        """Stop the pipeline.
+
+        Args:
+            wait: Whether to finish the items already in flight before returning
+        """
+        if not self._running:
+            return
+        self._running = False
+        if wait:
+            self._pending.join()
+        self._pending.put(_STOP)
+        self._committer.join()
+        self._executor.shutdown(wait=wait)
+
+    def _commit_loop(self):
+        """Commit analysis results one at a time, in submission order."""
+        while True:
+            entry = self._pending.get()
+            if entry is _STOP:
+                self._pending.task_done()
+                break
+
+            item, future = entry
+            try:
+                result = future.result()
+                if result is not None:
+                    self._commit(result)
+            except Exception as e:
+                error_msg = f"Pipeline failed for {item}: {e}"
+                logger.error(error_msg)
+                print(f"ERROR: {error_msg}")
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                self._slots.release()
+                self._pending.task_done()
+                if self._on_done is not None:
+                    self._on_done()
@@ -0,0 +1,150 @@
+"""Long-running watcher controlled through its control socket."""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+from smartshot.db import DEFAULT_SEARCH_FIELDS, PREVIEW_CHARS
+from smartshot.utils.control import ControlError, ControlServer, default_pid_path, default_socket_path
+from smartshot.utils.metrics import METRICS
+from . import ScreenshotWatcher
+
+
+class WatcherService:
+    """Runs a watcher and answers commands on its control socket.
+
+    Commands (see ``smartshot.utils.control``):
+
+    - ``ping``: check that the watcher is up
+    - ``status``: queue depth, throughput, counters and loaded models
+    - ``stop``: finish queued screenshots and exit
+    - ``reload-categories``: re-read the categories file
+    - ``search`` / ``semantic``: run a query with the watcher's open
+      database and, for semantic search, its loaded embedding model
+    """
+
+    def __init__(self, watcher: ScreenshotWatcher):
+        """Initialize the service without starting the watcher.
+
+        Args:
+            watcher: Watcher to run; the socket and PID file are placed
+                next to its database
+        """
+        self.watcher = watcher
+        self.handler = watcher.handler
+        self.started = time.time()
+        self.stopping = threading.Event()
+        self.pid_path = default_pid_path(self.handler.db_path)
+        self.server = ControlServer(default_socket_path(self.handler.db_path), {
+            'ping': self.ping,
+            'status': self.status,
+            'stop': self.stop,
+            'reload-categories': self.reload_categories,
+            'search': self.search,
+            'semantic': self.semantic,
+        })
+
+    def run(self):
+        """Start watching and serve commands until ``stop`` (blocks).
+
+        Raises:
+            ControlError: If a watcher is already running on the same database
+        """
+        self.server.start()
+        self.pid_path.write_text(str(os.getpid()))
+        try:
+            self.watcher.start()
+            self.stopping.wait()
+        finally:
+            self.server.close()
+            print("\nStopping watcher...")
+            self.watcher.stop()
+            self.watcher.join()
+            # Removed last: `smartshot stop` waits for it to disappear
+            self.pid_path.unlink(missing_ok=True)
+
+    def ping(self) -> dict:
+        return {'pid': os.getpid()}
+
+    def stop(self) -> dict:
+        """Ask the service to exit once queued screenshots are processed."""
+        self.stopping.set()
+        return {'pid': os.getpid()}
+
+    def status(self) -> dict:
+        from smartshot import __version__
+        snapshot = METRICS.snapshot()
+        embedder = self.handler.embedder
+        return {
+            'pid': os.getpid(),
+            'version': __version__,
+            'uptime': time.time() - self.started,
+            'watch_path': str(self.watcher.watch_path),
+            'db_path': str(Path(self.handler.db_path).absolute()),
+            'queue_depth': snapshot['gauges'].get('queue_depth'),
+            'pending_files': snapshot['gauges'].get('pending_files'),
+            'peak_rss_bytes': snapshot['gauges'].get('peak_rss_bytes'),
+            'jobs': self.handler.db.get_job_counts(),
+            'throughput_per_minute': snapshot['throughput']['per_minute'],
+            'counters': snapshot['counters'],
+            'categories': len(self.handler.categorizer.categories),
+            'models': {
+                'ocr': self.handler.ocr.available if self.handler.enable_ocr else None,
+                'summarizer': {
+                    'backend': self.handler.summarizer.backend.name,
+                    'loaded': self.handler.summarizer.backend.loaded,
+                } if self.handler.enable_rename else None,
+                'embedder': {
+                    'model': embedder.model,
+                    'loaded': embedder.loaded,
+                } if embedder is not None else None,
+            },
+        }
+
+    def reload_categories(self) -> dict:
+        categorizer = self.handler.reload_categories()
+        return {'categories': sorted(categorizer.categories)}
+
+    def search(self, query: Optional[str] = None, category: Optional[str] = None,
+               app: Optional[str] = None, days: Optional[int] = None, limit: int = 20,
+               cursor: Optional[str] = None, fields: Optional[List[str]] = None,
+               count: str = 'none') -> dict:
+        """Keyword search, as ``Database.search_page``."""
+        page = self.handler.db.search_page(
+            query=query,
+            category=category,
+            app_name=app,
+            min_date=datetime.now() - timedelta(days=days) if days else None,
+            limit=limit,
+            cursor=cursor,
+            fields=fields or DEFAULT_SEARCH_FIELDS,
+            count=count
+        )
+        return {
+            'results': page.results,
+            'next_cursor': page.next_cursor,
+            'total': page.total,
+            'total_is_estimate': page.total_is_estimate,
+        }
+
+    def semantic(self, query: str, category: Optional[str] = None, app: Optional[str] = None,
+                 days: Optional[int] = None, limit: int = 20) -> List[dict]:
+        """Semantic search with the watcher's loaded embedding model."""
+        from smartshot.db.vectors import VectorIndex, default_vectors_path, match_to_dict, semantic_search
+        embedder = self.handler.embedder
+        if embedder is None:
+            raise ControlError("The watcher was not started with --semantic")
+        index = self.handler.vectors
+        if index is None:
+            header = VectorIndex.read_header(default_vectors_path(self.handler.db_path))
+            if header is None:
+                raise ControlError("No semantic index yet")
+            index = VectorIndex(default_vectors_path(self.handler.db_path), *header)
+        matches = semantic_search(
+            self.handler.db, index, embedder.embed([query])[0], limit=limit,
+            category=category, app_name=app,
+            min_date=datetime.now() - timedelta(days=days) if days else None
+        )
+        return [match_to_dict(screenshot, score, PREVIEW_CHARS) for screenshot, score in matches]
@@ -19,11 +19,12 @@ import QuickStats from './QuickStats'
 const Dashboard = () => {
   const { stats, recentActivity, isConnected } = useWebSocket()
   const [watcherStatus, setWatcherStatus] = useState('inactive')
+  const pipeline = stats?.pipeline
 
   useEffect(() => {
-    // Simulate watcher status based on connection
-    setWatcherStatus(isConnected ? 'active' : 'inactive')
-  }, [isConnected])
+    // The watcher's metrics snapshots say whether it is running
+    setWatcherStatus(isConnected && pipeline?.running ? 'active' : 'inactive')
+  }, [isConnected, pipeline?.running])
 
   const statusCards = [
     {
@@ -31,7 +32,9 @@ const Dashboard = () => {
       value: watcherStatus === 'active' ? 'Active' : 'Inactive',
       icon: Activity,
       color: watcherStatus === 'active' ? 'green' : 'red',
-      description: watcherStatus === 'active' ? 'Monitoring screenshots' : 'Not monitoring'
+      description: watcherStatus === 'active'
+        ? `${pipeline.throughputPerMinute}/min, ${pipeline.queueDepth} queued`
+        : 'Not monitoring'
     },
     {
       title: 'Total Screenshots',
@@ -1,6 +1,32 @@
 import React, { useState, useEffect } from 'react'
 import { Eye, Download, Tag, Clock, FileText } from 'lucide-react'
 
+// ?v= makes the URL change with the file content, so the server can let
+// the browser cache it forever
+const thumbnailUrl = (screenshot, size) =>
+  `/api/thumbnails/${screenshot.id}?size=${size}&v=${screenshot.file_hash}`
+
+// Falls back to the fallback element if the screenshot has no thumbnail yet
+const Thumbnail = ({ screenshot, size, className, fallback }) => {
+  const [failed, setFailed] = useState(false)
+
+  useEffect(() => {
+    setFailed(false)
+  }, [screenshot.id, screenshot.file_hash])
+
+  if (failed || !screenshot.file_hash) return fallback
+  return (
+    <img
+      src={thumbnailUrl(screenshot, size)}
+      alt={screenshot.file_name}
+      loading="lazy"
+      decoding="async"
+      className={className}
+      onError={() => setFailed(true)}
+    />
+  )
+}
+
 const RecentScreenshots = () => {
   const [screenshots, setScreenshots] = useState([])
   const [loading, setLoading] = useState(true)
@@ -123,10 +149,17 @@ const RecentScreenshots = () => {
               className="flex items-center space-x-4 p-3 rounded-lg hover:bg-gray-50 transition-colors cursor-pointer"
               onClick={() => setSelectedImage(screenshot)}
             >
-              {/* Thumbnail placeholder */}
-              <div className="w-16 h-16 bg-gradient-to-br from-gray-100 to-gray-200 rounded-lg flex items-center justify-center">
-                <FileText className="w-6 h-6 text-gray-400" />
-              </div>
+              {/* Thumbnail */}
+              <Thumbnail
+                screenshot={screenshot}
+                size="small"
+                className="w-16 h-16 rounded-lg object-cover bg-gray-100 flex-shrink-0"
+                fallback={
+                  <div className="w-16 h-16 bg-gradient-to-br from-gray-100 to-gray-200 rounded-lg flex items-center justify-center">
+                    <FileText className="w-6 h-6 text-gray-400" />
+                  </div>
+                }
+              />
 
               {/* Screenshot info */}
               <div className="flex-1 min-w-0">
@@ -185,10 +218,17 @@ const RecentScreenshots = () => {
               </div>
               
               <div className="space-y-4">
-                <div className="bg-gray-100 rounded-lg p-8 text-center">
-                  <FileText className="w-16 h-16 text-gray-400 mx-auto mb-4" />
-                  <p className="text-gray-500">Image preview not available</p>
-                </div>
+                <Thumbnail
+                  screenshot={selectedImage}
+                  size="medium"
+                  className="mx-auto rounded-lg bg-gray-100"
+                  fallback={
+                    <div className="bg-gray-100 rounded-lg p-8 text-center">
+                      <FileText className="w-16 h-16 text-gray-400 mx-auto mb-4" />
+                      <p className="text-gray-500">Image preview not available</p>
+                    </div>
+                  }
+                />
                 
                 {selectedImage.ocr_text && (
                   <div>
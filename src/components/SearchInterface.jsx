@@ -7,12 +7,17 @@ const SearchInterface = () => {
     category: '',
     app: '',
     dateRange: '',
-    hasOcr: false
+    hasOcr: false,
+    semantic: false
   })
   const [results, setResults] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [total, setTotal] = useState(null)
   const [loading, setLoading] = useState(false)
   const [categories, setCategories] = useState([])
   const [apps, setApps] = useState([])
+  // Screenshot shown in the preview, with its OCR lines once loaded
+  const [preview, setPreview] = useState(null)
 
   useEffect(() => {
     fetchFilters()
@@ -35,7 +40,21 @@ const SearchInterface = () => {
     }
   }
 
-  const performSearch = async () => {
+  // Opens the preview of a result and highlights the lines matching the query
+  const openPreview = async (result) => {
+    setPreview({ result, lines: null })
+    try {
+      const params = new URLSearchParams({ query })
+      const response = await fetch(`/api/screenshots/${result.id}/lines?${params}`)
+      const data = response.ok ? await response.json() : null
+      setPreview(prev => prev && prev.result.id === result.id ? { result, lines: data } : prev)
+    } catch (error) {
+      console.error('Failed to fetch OCR lines:', error)
+    }
+  }
+
+  // Fetches the first page, or the page after `cursor` when loading more
+  const performSearch = async (cursor = null) => {
     setLoading(true)
     try {
       const params = new URLSearchParams()
@@ -43,10 +62,22 @@ const SearchInterface = () => {
       if (filters.category) params.append('category', filters.category)
       if (filters.app) params.append('app', filters.app)
       if (filters.dateRange) params.append('days', filters.dateRange)
+      if (filters.semantic && query) params.append('mode', 'semantic')
+      params.append('fields', 'id,file_path,file_name,file_size,category,app_name,created_at,snippet')
+      params.append('limit', '50')
+      if (cursor) {
+        params.append('cursor', cursor)
+      } else {
+        params.append('count', 'estimate')
+      }
       
       const response = await fetch(`/api/search?${params}`)
       const data = await response.json()
-      setResults(data.results || [])
+      setResults(prev => cursor ? [...prev, ...(data.results || [])] : (data.results || []))
+      setNextCursor(data.nextCursor || null)
+      if (!cursor) {
+        setTotal(data.total == null ? null : `${data.total}${data.totalIsEstimate ? '+' : ''}`)
+      }
     } catch (error) {
       console.error('Search failed:', error)
       // Mock results
@@ -96,6 +127,16 @@ const SearchInterface = () => {
     return `${Math.floor(diffInMinutes / 1440)}d ago`
   }
 
+  // Snippets mark matched terms with <mark>...</mark>; render those parts
+  // as elements instead of injecting the OCR text as HTML
+  const renderSnippet = (snippet) => {
+    return snippet.split(/(<mark>.*?<\/mark>)/g).map((part, i) => (
+      part.startsWith('<mark>')
+        ? <mark key={i} className="bg-yellow-100 text-gray-900">{part.slice(6, -7)}</mark>
+        : part
+    ))
+  }
+
   const getCategoryColor = (category) => {
     const colors = {
       'Code': 'bg-blue-100 text-blue-800',
@@ -197,6 +238,15 @@ const SearchInterface = () => {
               />
               <span className="ml-2 text-sm text-gray-700">Has OCR text</span>
             </label>
+            <label className="flex items-center mt-2">
+              <input
+                type="checkbox"
+                checked={filters.semantic}
+                onChange={(e) => setFilters({...filters, semantic: e.target.checked})}
+                className="rounded border-gray-300 text-primary-600 focus:ring-primary-500"
+              />
+              <span className="ml-2 text-sm text-gray-700">Match meaning</span>
+            </label>
           </div>
         </div>
       </div>
@@ -205,7 +255,7 @@ const SearchInterface = () => {
       <div className="card">
         <div className="flex items-center justify-between mb-6">
           <h2 className="text-lg font-semibold text-gray-900">
-            Search Results {results.length > 0 && `(${results.length})`}
+            Search Results {results.length > 0 && `(${total || results.length})`}
           </h2>
           {results.length > 0 && (
             <div className="flex items-center space-x-2">
@@ -216,7 +266,7 @@ const SearchInterface = () => {
           )}
         </div>
 
-        {loading ? (
+        {loading && results.length === 0 ? (
           <div className="space-y-4">
             {[...Array(3)].map((_, i) => (
               <div key={i} className="animate-pulse">
@@ -268,7 +318,11 @@ const SearchInterface = () => {
                     <span>{formatFileSize(result.file_size)}</span>
                   </div>
 
-                  {result.ocr_text && (
+                  {result.snippet ? (
+                    <p className="text-sm text-gray-600 line-clamp-2">
+                      {renderSnippet(result.snippet)}
+                    </p>
+                  ) : result.ocr_text && (
                     <p className="text-sm text-gray-600 line-clamp-2">
                       {result.ocr_text}
                     </p>
@@ -277,7 +331,10 @@ const SearchInterface = () => {
 
                 {/* Actions */}
                 <div className="flex items-center space-x-2 flex-shrink-0">
-                  <button className="p-2 text-gray-400 hover:text-primary-600 rounded-lg hover:bg-primary-50 transition-colors">
+                  <button
+                    className="p-2 text-gray-400 hover:text-primary-600 rounded-lg hover:bg-primary-50 transition-colors"
+                    onClick={() => openPreview(result)}
+                  >
                     <Eye className="w-4 h-4" />
                   </button>
                   <button className="p-2 text-gray-400 hover:text-primary-600 rounded-lg hover:bg-primary-50 transition-colors">
@@ -286,9 +343,57 @@ const SearchInterface = () => {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <div className="text-center">
+                <button
+                  className="btn-secondary text-sm"
+                  disabled={loading}
+                  onClick={() => performSearch(nextCursor)}
+                >
+                  {loading ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
+
+      {/* Preview with the matching OCR lines highlighted */}
+      {preview && (
+        <div
+          className="fixed inset-0 bg-black bg-opacity-50 flex items-center justify-center z-50 p-4"
+          onClick={() => setPreview(null)}
+        >
+          <div className="card max-w-4xl w-full" onClick={(e) => e.stopPropagation()}>
+            <h3 className="text-sm font-medium text-gray-900 truncate mb-4">
+              {preview.result.file_name}
+            </h3>
+            <div className="relative">
+              <img
+                src={`/api/thumbnails/${preview.result.id}?size=medium`}
+                alt={preview.result.file_name}
+                className="w-full rounded-lg"
+              />
+              {/* Boxes are in original image pixels; the thumbnail keeps the aspect ratio */}
+              {preview.lines && preview.lines.width > 0 && preview.lines.lines
+                .filter(line => line.match)
+                .map((line, i) => (
+                  <div
+                    key={i}
+                    className="absolute border-2 border-yellow-400 bg-yellow-200 bg-opacity-40 rounded-sm"
+                    title={`${line.text} (${Math.round(line.confidence * 100)}%)`}
+                    style={{
+                      left: `${(line.left / preview.lines.width) * 100}%`,
+                      top: `${(line.top / preview.lines.height) * 100}%`,
+                      width: `${(line.width / preview.lines.width) * 100}%`,
+                      height: `${(line.height / preview.lines.height) * 100}%`
+                    }}
+                  />
+                ))}
+            </div>
+          </div>
+        </div>
+      )}
     </div>
   )
 }
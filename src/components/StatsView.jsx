@@ -1,10 +1,30 @@
 import React, { useState, useEffect } from 'react'
 import { BarChart3, TrendingUp, Calendar, Folder, Monitor, FileText, Activity } from 'lucide-react'
+import { useWebSocket } from '../contexts/WebSocketContext'
+
+// Pipeline stages in processing order, with their labels
+const PIPELINE_STAGES = [
+  ['hash', 'Hashing'],
+  ['phash', 'Perceptual hash'],
+  ['preprocess', 'Preprocessing'],
+  ['ocr', 'OCR'],
+  ['categorize', 'Categorization'],
+  ['summarize_load', 'Model loading'],
+  ['summarize', 'Summarization'],
+  ['thumbnails', 'Thumbnails'],
+  ['embed', 'Embedding'],
+  ['rename', 'Rename'],
+  ['move', 'Move'],
+  ['db_commit', 'Database commit'],
+  ['total', 'End to end']
+]
 
 const StatsView = () => {
   const [stats, setStats] = useState(null)
   const [loading, setLoading] = useState(true)
   const [timeRange, setTimeRange] = useState('30')
+  // Live pipeline metrics arrive with every stats_update broadcast
+  const pipeline = useWebSocket().stats?.pipeline
 
   useEffect(() => {
     fetchStats()
@@ -278,6 +298,44 @@ const StatsView = () => {
           </div>
         </div>
       </div>
+
+      {/* Processing Pipeline */}
+      {pipeline?.stages && (
+        <div className="card">
+          <div className="flex items-center justify-between mb-6">
+            <h3 className="text-lg font-semibold text-gray-900">Processing Pipeline</h3>
+            <span className="text-sm text-gray-500">
+              {pipeline.running ? `${pipeline.throughputPerMinute}/min, ${pipeline.queueDepth} queued` : 'Watcher not running'}
+              {pipeline.errors > 0 && `, ${pipeline.errors} errors`}
+            </span>
+          </div>
+          <table className="w-full text-sm">
+            <thead>
+              <tr className="text-left text-gray-500">
+                <th className="font-medium pb-2">Stage</th>
+                <th className="font-medium pb-2 text-right">Runs</th>
+                <th className="font-medium pb-2 text-right">p50</th>
+                <th className="font-medium pb-2 text-right">p95</th>
+                <th className="font-medium pb-2 text-right">p99</th>
+              </tr>
+            </thead>
+            <tbody>
+              {PIPELINE_STAGES.filter(([name]) => pipeline.stages[name]).map(([name, label]) => {
+                const stage = pipeline.stages[name]
+                return (
+                  <tr key={name} className="border-t border-gray-100">
+                    <td className="py-1.5 text-gray-900">{label}</td>
+                    <td className="py-1.5 text-right text-gray-600">{stage.count}</td>
+                    <td className="py-1.5 text-right text-gray-600">{stage.p50} ms</td>
+                    <td className="py-1.5 text-right text-gray-600">{stage.p95} ms</td>
+                    <td className="py-1.5 text-right text-gray-600">{stage.p99} ms</td>
+                  </tr>
+                )
+              })}
+            </tbody>
+          </table>
+        </div>
+      )}
     </div>
   )
 }